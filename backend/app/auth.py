@@ -1,20 +1,32 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import os
+import logging
+import time
 
-from .database import get_db
+from .cache import TTLCache
+from .database import get_db, get_async_db
 from .models import User
 from .schemas import TokenData
+from .timestamps import utcnow
 
 # パスワードハッシュ化の設定
+# BCRYPT_ROUNDSを変更すると、既存のハッシュはログイン時に新しいコストで再ハッシュされる
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 pwd_context = CryptContext(
     schemes=["bcrypt"],
-    deprecated="auto"
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
 )
 
 # JWT設定
@@ -25,6 +37,40 @@ ACCESS_TOKEN_EXPIRE_HOURS = 24
 # HTTPベアラートークン認証
 security = HTTPBearer()
 
+logger = logging.getLogger(__name__)
+
+# 認証済みユーザーのキャッシュ（トークン -> (トークンの有効期限, CurrentUser)）
+# 変更・削除による破棄は同じプロセス内だけのため、他のワーカープロセスではTTLの間は古い情報が使われる
+user_cache = TTLCache(
+    max_size=int(os.getenv("AUTH_USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_USER_CACHE_TTL", "10"))
+)
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """
+    認証済みユーザーの軽量なスナップショット
+
+    ルーターはこのオブジェクトを受け取るため、認証のたびにusersテーブルを読む必要がない。
+    """
+    id: int
+    email: str
+    name: str
+    created_at: datetime
+
+
+def invalidate_user(user_id: int):
+    """ユーザーのキャッシュを破棄する（ユーザーの変更・削除時。そのユーザーの全てのトークンが対象）"""
+    user_cache.invalidate_where(lambda token, entry: entry[1].id == user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user_on_change(mapper, connection, target):
+    """ORM経由でユーザーが変更・削除されたらキャッシュを破棄する"""
+    invalidate_user(target.id)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -51,20 +97,28 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(truncated_password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    ハッシュのコストが設定（BCRYPT_ROUNDS）と異なるか判定する
+    """
+    return pwd_context.needs_update(hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     JWTアクセストークンを生成する
     """
     to_encode = data.copy()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
+        expire = utcnow() + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
 
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    print(f"DEBUG: Created token with data: {data}")
-    print(f"DEBUG: Token: {encoded_jwt[:50]}...")
+    # トークン自体は記録しない
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("アクセストークンを発行しました", extra={"user_id": data.get("sub"), "expires_at": expire.isoformat()})
     return encoded_jwt
 
 
@@ -80,21 +134,21 @@ def decode_access_token(token: str) -> TokenData:
 
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        print(f"DEBUG: Decoded payload: {payload}")
         user_id = payload.get("sub")
-        print(f"DEBUG: Extracted user_id: {user_id}, type: {type(user_id)}")
         if user_id is None:
-            print("DEBUG: user_id is None, raising exception")
+            logger.info("トークンにユーザーIDがありません")
             raise credentials_exception
         # 整数に変換
         user_id = int(user_id)
-        token_data = TokenData(user_id=user_id)
-        print(f"DEBUG: TokenData created: {token_data}")
+        token_data = TokenData(user_id=user_id, expires_at=payload.get("exp"))
+    except HTTPException:
+        raise
     except JWTError as e:
-        print(f"DEBUG: JWTError occurred: {e}")
+        # 期限切れ・署名の不一致など（トークンは記録しない）
+        logger.info("トークンを検証できませんでした", extra={"reason": type(e).__name__})
         raise credentials_exception
     except Exception as e:
-        print(f"DEBUG: Unexpected error: {e}")
+        logger.warning("トークンの検証中にエラーが発生しました", extra={"reason": type(e).__name__})
         raise credentials_exception
 
     return token_data
@@ -103,16 +157,17 @@ def decode_access_token(token: str) -> TokenData:
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
+) -> CurrentUser:
     """
     現在のログインユーザーを取得する（依存性注入用）
+
+    トークンがキャッシュにあれば、デコードもusersテーブルの参照もしない。
     """
-    print(f"DEBUG: Received credentials: {credentials}")
-    token = credentials.credentials
-    print(f"DEBUG: Token received: {token[:50] if token else 'None'}...")
-    token_data = decode_access_token(token)
-    print(f"DEBUG: Decoded user_id: {token_data.user_id}")
+    current_user = _cached_current_user(credentials.credentials)
+    if current_user is not None:
+        return current_user
 
+    token_data = decode_access_token(credentials.credentials)
     user = db.query(User).filter(User.id == token_data.user_id).first()
     if user is None:
         raise HTTPException(
@@ -121,17 +176,51 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    print(f"DEBUG: Found user: {user.email}")
-    return user
+    return _cache_current_user(credentials.credentials, token_data, user)
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
     """
-    ユーザー認証を行う
+    現在のログインユーザーを取得する（非同期モードの依存性注入用）
     """
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
+    current_user = _cached_current_user(credentials.credentials)
+    if current_user is not None:
+        return current_user
+
+    token_data = decode_access_token(credentials.credentials)
+    user = await db.get(User, token_data.user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="ユーザーが見つかりません",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return _cache_current_user(credentials.credentials, token_data, user)
+
+
+def _cached_current_user(token: str) -> Optional[CurrentUser]:
+    """キャッシュ済みのトークンのユーザーを返す（ないか、トークンの有効期限が過ぎていればNone）"""
+    entry = user_cache.get(token)
+    if entry is None:
         return None
-    if not verify_password(password, user.hashed_password):
+    expires_at, current_user = entry
+    if expires_at is not None and expires_at <= time.time():
+        user_cache.invalidate(token)
         return None
-    return user
+    return current_user
+
+
+def _cache_current_user(token: str, token_data: TokenData, user: User) -> CurrentUser:
+    """ユーザーのスナップショットを作成し、トークンをキーにキャッシュする"""
+    current_user = CurrentUser(
+        id=user.id,
+        email=user.email,
+        name=user.name,
+        created_at=user.created_at
+    )
+    user_cache.set(token, (token_data.expires_at, current_user))
+    return current_user
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+import os
+import time
+
+
+class TTLCache:
+    """
+    プロセス内のLRU + TTLキャッシュ（スレッドセーフ）
+
+    max_size件を超えると最も長く使われていないエントリを追い出し、
+    ttl秒を過ぎたエントリは期限切れとして扱う。
+    versionを指定して保存したエントリは、取得時のversionと一致しなければ破棄する。
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, version, value)
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale = 0
+
+    def get(self, key: Hashable, version: Optional[Hashable] = None) -> Optional[Any]:
+        """値を取得する（存在しない・期限切れ・versionが古い場合はNone）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, entry_version, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if entry_version != version:
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, version: Optional[Hashable] = None):
+        """値を保存する"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """値を削除する"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """条件（キー, 値）に一致する値を全て削除し、削除した件数を返す"""
+        with self._lock:
+            keys = [key for key, (_, _, value) in self._entries.items() if predicate(key, value)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        """全ての値を削除する"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット率などの統計情報を返す（キャッシュサイズの調整用）"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "stale": self.stale
+            }
+
+
+# ダッシュボードのレスポンスキャッシュ（project_id -> レスポンス、versionは集計行のversion）
+dashboard_cache = TTLCache(
+    max_size=int(os.getenv("DASHBOARD_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("DASHBOARD_CACHE_TTL", "300"))
+)
@@ -1,8 +1,10 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
+from .db_pool import pool_options, set_sqlite_pragmas
+
 # データベースのURL（環境変数から取得、なければSQLiteを使用）
 SQLALCHEMY_DATABASE_URL = os.getenv(
     "DATABASE_URL",
@@ -13,19 +15,57 @@ SQLALCHEMY_DATABASE_URL = os.getenv(
 if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
     SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# エンジンの作成
+# エンジンの作成（接続プールの設定はDB_POOL_*環境変数で調整）
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
 connect_args = {}
-if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+if IS_SQLITE:
     connect_args = {"check_same_thread": False}  # SQLite用の設定
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args=connect_args
+    connect_args=connect_args,
+    **pool_options(SQLALCHEMY_DATABASE_URL)
 )
 
+# SQLiteはWAL・synchronous=NORMAL等のPRAGMAを接続ごとに設定
+if IS_SQLITE:
+    event.listen(engine, "connect", set_sqlite_pragmas)
+
 # セッションローカルの作成
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 非同期モード（DB_ASYNC=trueの場合、ルーターはAsyncSessionを使う）
+# PostgreSQLはasyncpg、SQLiteはaiosqliteで接続する
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+
+
+def get_async_database_url(url: str) -> str:
+    """同期用のURLを非同期ドライバのURLに変換する"""
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(
+        get_async_database_url(SQLALCHEMY_DATABASE_URL),
+        **pool_options(SQLALCHEMY_DATABASE_URL, async_mode=True)
+    )
+    if IS_SQLITE:
+        event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+    # コミット後もレスポンスの組み立てに使えるよう、属性を期限切れにしない
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
 # ベースクラスの作成
 Base = declarative_base()
 
@@ -36,3 +76,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# 非同期DBセッションの依存性注入用
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
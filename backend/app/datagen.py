@@ -0,0 +1,404 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from typing import Callable, Dict, Iterator, List, Optional
+import csv
+import io
+import math
+import os
+import random
+import uuid
+
+from . import models
+from .auth import get_password_hash
+from .migrations import create_missing_indexes
+from .rollups import rebuild_rollups
+from .timeline import rebuild_timelines
+from .timestamps import as_utc, utcnow
+
+# 1回の一括登録（SQLiteはINSERT、PostgreSQLはCOPY）で書き込む行数
+DATAGEN_BATCH_SIZE = int(os.getenv("DATAGEN_BATCH_SIZE", "50000"))
+
+# 集計テーブルの再構築で1回に読み込むスコア数の目安（メモリ使用量を抑える）
+REBUILD_SCORES_PER_BATCH = 1000000
+
+# スコアの推移のパターン（mixedはメンバーごとに他のパターンから選ぶ）
+DRIFT_PATTERNS = ("flat", "rising", "falling", "random_walk", "seasonal", "mixed")
+
+# seasonal: 周期（日）と振れ幅
+SEASONAL_PERIOD_DAYS = 28
+SEASONAL_AMPLITUDE = 10.0
+
+# 生成したユーザーのパスワード（ログインして画面を確認する用）
+DEFAULT_PASSWORD = "password123"
+
+# 名前・コメントの候補
+SURNAMES = ("山田", "佐藤", "鈴木", "田中", "高橋", "伊藤", "渡辺", "中村", "小林", "加藤", "吉田", "山口")
+GIVEN_NAMES = ("太郎", "花子", "一郎", "美咲", "健太", "誠", "優子", "大輔", "あかり", "雄介", "麻衣", "拓也")
+COMMENTS = (
+    "目標を達成",
+    "チームへの貢献が大きい",
+    "レビューが丁寧",
+    "進捗に遅れあり",
+    "コミュニケーションが良好",
+    "新しい技術の習得が早い",
+)
+# コメントを付けるスコアの割合
+COMMENT_RATE = 0.2
+
+
+def score_series(rng: random.Random, pattern: str, count: int, days: float, noise: float) -> List[int]:
+    """
+    1メンバー分のスコア（0〜100、古い順）をcount件生成する
+
+    - flat: 一定の値の周りでばらつく
+    - rising / falling: 期間の初めから終わりにかけて上昇 / 下降する
+    - random_walk: 前回の値から少しずつ変化する
+    - seasonal: SEASONAL_PERIOD_DAYS 周期で上下する
+    """
+    if pattern == "mixed":
+        pattern = rng.choice(DRIFT_PATTERNS[:-1])
+
+    if pattern == "rising":
+        start = rng.uniform(40, 70)
+        end = start + rng.uniform(15, 30)
+    elif pattern == "falling":
+        start = rng.uniform(70, 95)
+        end = start - rng.uniform(15, 30)
+    else:
+        start = end = rng.uniform(50, 90)
+    cycles = days / SEASONAL_PERIOD_DAYS
+
+    values = []
+    walk = start
+    for k in range(count):
+        position = k / (count - 1) if count > 1 else 1.0
+        if pattern == "random_walk":
+            walk = min(100.0, max(0.0, walk + rng.gauss(0, noise)))
+            value = walk
+        else:
+            value = start + (end - start) * position + rng.gauss(0, noise)
+            if pattern == "seasonal":
+                value += SEASONAL_AMPLITUDE * math.sin(2 * math.pi * cycles * position)
+        values.append(min(100, max(0, round(value))))
+    return values
+
+
+class _BulkWriter:
+    """
+    行を batch_size 件ずつまとめて書き込む
+
+    SQLiteはCoreのinsert（executemany）、PostgreSQLはCOPY ... FROM STDIN で書き込む。
+    1回の書き込みごとにコミットするため、途中で失敗した場合はそれまでの行が残る。
+    """
+
+    def __init__(self, engine: Engine, table, columns: List[str], batch_size: int,
+                 progress: Optional[Callable[[str, int], None]] = None):
+        self.engine = engine
+        self.table = table
+        self.columns = columns
+        self.batch_size = batch_size
+        self.progress = progress
+        self.rows = []
+        self.written = 0
+
+    def add(self, row: Dict):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        with self.engine.begin() as conn:
+            if self.engine.dialect.name == "postgresql":
+                self._copy(conn)
+            else:
+                conn.execute(insert(self.table), self.rows)
+        self.written += len(self.rows)
+        self.rows = []
+        if self.progress is not None:
+            self.progress(self.table.name, self.written)
+
+    def _copy(self, conn):
+        """PostgreSQL: CSVにしてCOPYで書き込む（Noneは空欄 = NULL）"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([row[column] for column in self.columns] for row in self.rows)
+        buffer.seek(0)
+        cursor = conn.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {self.table.name} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+
+def _member_role(index: int) -> str:
+    """プロジェクトごとにPL・PMが1人ずつ、残りはMember"""
+    return ("PL", "PM")[index] if index < 2 else "Member"
+
+
+def _score_rows(rng: random.Random, member_id: int, drift: str, scores_per_member: int,
+                days: float, noise: float, start: datetime) -> Iterator[Dict]:
+    """1メンバー分のスコアの行（古い順に均等な間隔、揺らぎあり）"""
+    step = timedelta(days=days) / max(scores_per_member, 1)
+    values = score_series(rng, drift, scores_per_member, days, noise)
+    for k, value in enumerate(values):
+        yield {
+            "member_id": member_id,
+            "score": value,
+            "comment": rng.choice(COMMENTS) if rng.random() < COMMENT_RATE else None,
+            "created_at": start + step * (k + rng.random())
+        }
+
+
+def _next_id(engine: Engine, table) -> int:
+    """次に使う主キー（既存の最大値 + 1。generate_data 専用で、同時に書き込みがあると重複する）"""
+    with engine.connect() as conn:
+        return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def _reset_sequence(engine: Engine, table):
+    """PostgreSQL: 主キーを指定して登録した後、シーケンスを最大値に合わせる"""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+        ))
+
+
+def generate_data(
+    engine: Engine,
+    users: int,
+    projects_per_user: int,
+    members_per_project: int,
+    scores_per_member: int,
+    days: float = 90,
+    drift: str = "mixed",
+    noise: float = 3.0,
+    end: Optional[datetime] = None,
+    seed: int = 0,
+    password: str = DEFAULT_PASSWORD,
+    batch_size: int = DATAGEN_BATCH_SIZE,
+    defer_indexes: bool = False,
+    rebuild: bool = True,
+    progress: Optional[Callable[[str, int], None]] = None
+) -> Dict:
+    """
+    合成データ（ユーザー・プロジェクト・メンバー・スコア履歴）を一括登録する
+
+    スコアは end までの days 日間に、メンバーごとに古い順で均等な間隔（揺らぎあり）で登録し、
+    値は drift のパターンに従って推移させる。既存のデータには追加するだけで変更しない。
+    ユーザー・プロジェクト・メンバーは主キーを指定して登録するため、
+    他の書き込みがない状態（サーバーを止めた状態）で実行すること（稼働中は generate_demo_data を使う）。
+
+    defer_indexes=True の場合はscoresのインデックスを削除してから登録し、最後に作り直す
+    （件数が多い場合はこちらの方が速い）。
+    rebuild=True の場合は、登録したプロジェクトの集計テーブルと日次タイムラインを作り直す。
+    """
+    if drift not in DRIFT_PATTERNS:
+        raise ValueError(f"不明なパターン: {drift}")
+
+    rng = random.Random(seed)
+    end = as_utc(end) if end is not None else utcnow()
+    start = end - timedelta(days=days)
+
+    users_table = models.User.__table__
+    projects_table = models.Project.__table__
+    members_table = models.Member.__table__
+    scores_table = models.Score.__table__
+
+    # ユーザー（パスワードのハッシュは全員同じものを使う）
+    first_user_id = _next_id(engine, users_table)
+    user_ids = list(range(first_user_id, first_user_id + users))
+    hashed_password = get_password_hash(password)
+    writer = _BulkWriter(engine, users_table, ["id", "email", "hashed_password", "name", "created_at"],
+                         batch_size, progress)
+    for user_id in user_ids:
+        writer.add({
+            "id": user_id,
+            "email": f"datagen{user_id}@example.com",
+            "hashed_password": hashed_password,
+            "name": f"ユーザー{user_id}",
+            # users.created_at はタイムゾーンなし（UTC）
+            "created_at": start.replace(tzinfo=None)
+        })
+    writer.flush()
+    _reset_sequence(engine, users_table)
+
+    # プロジェクト
+    first_project_id = _next_id(engine, projects_table)
+    project_ids = []
+    writer = _BulkWriter(engine, projects_table, ["id", "name", "document_url", "user_id", "created_at"],
+                         batch_size, progress)
+    for user_id in user_ids:
+        for index in range(projects_per_user):
+            project_id = first_project_id + len(project_ids)
+            project_ids.append(project_id)
+            writer.add({
+                "id": project_id,
+                "name": f"プロジェクト{project_id}",
+                "document_url": f"https://docs.example.com/projects/{project_id}",
+                "user_id": user_id,
+                "created_at": start + timedelta(minutes=index)
+            })
+    writer.flush()
+    _reset_sequence(engine, projects_table)
+
+    # メンバー（プロジェクトごとにPL・PMが1人ずつ、残りはMember）
+    first_member_id = _next_id(engine, members_table)
+    member_ids = []
+    writer = _BulkWriter(engine, members_table, ["id", "project_id", "name", "role", "email", "created_at"],
+                         batch_size, progress)
+    for project_id in project_ids:
+        for index in range(members_per_project):
+            member_id = first_member_id + len(member_ids)
+            member_ids.append(member_id)
+            writer.add({
+                "id": member_id,
+                "project_id": project_id,
+                "name": rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES),
+                "role": _member_role(index),
+                "email": f"member{member_id}@example.com",
+                "created_at": start
+            })
+    writer.flush()
+    _reset_sequence(engine, members_table)
+
+    if defer_indexes:
+        for index in scores_table.indexes:
+            index.drop(bind=engine, checkfirst=True)
+
+    # スコア（主キーはデータベースで採番）
+    writer = _BulkWriter(engine, scores_table, ["member_id", "score", "comment", "created_at"],
+                         batch_size, progress)
+    for member_id in member_ids:
+        for row in _score_rows(rng, member_id, drift, scores_per_member, days, noise, start):
+            writer.add(row)
+    writer.flush()
+
+    if defer_indexes:
+        create_missing_indexes(engine)
+
+    result = {
+        "users": len(user_ids),
+        "projects": len(project_ids),
+        "members": len(member_ids),
+        "scores": writer.written,
+        "user_ids": user_ids,
+        "project_ids": project_ids,
+        "timeline_rows": 0
+    }
+    if not rebuild or not project_ids:
+        return result
+
+    # 1回に読み込むスコアが REBUILD_SCORES_PER_BATCH 件程度になるようにプロジェクトを分ける
+    rebuild_batch_size = max(1, REBUILD_SCORES_PER_BATCH // max(1, members_per_project * scores_per_member))
+    with Session(engine) as db:
+        for start_index in range(0, len(project_ids), rebuild_batch_size):
+            batch = project_ids[start_index:start_index + rebuild_batch_size]
+            rebuild_rollups(db, project_ids=batch)
+            result["timeline_rows"] += rebuild_timelines(db, project_ids=batch)
+            db.commit()
+            db.expunge_all()
+            if progress is not None:
+                progress("project_rollups", min(start_index + rebuild_batch_size, len(project_ids)))
+    return result
+
+
+def generate_demo_data(
+    db: Session,
+    users: int,
+    projects_per_user: int,
+    members_per_project: int,
+    scores_per_member: int,
+    days: float = 90,
+    drift: str = "mixed",
+    noise: float = 3.0,
+    seed: int = 0,
+    password: str = DEFAULT_PASSWORD
+) -> Dict:
+    """
+    少量の合成データをセッションで登録する（管理用APIのデモデータ用）
+
+    generate_data と同じ形のデータを作るが、主キーはデータベースで採番するため稼働中のサーバーでも使える。
+    集計テーブルと日次タイムラインも同じトランザクションで作り直す。コミットは呼び出し側で行う。
+    """
+    if drift not in DRIFT_PATTERNS:
+        raise ValueError(f"不明なパターン: {drift}")
+
+    rng = random.Random(seed)
+    end = utcnow()
+    start = end - timedelta(days=days)
+    hashed_password = get_password_hash(password)
+
+    # ユーザー・プロジェクト・メンバーを登録してIDを採番させ、IDを含む名前・メールアドレスを付け直す
+    new_users = [
+        models.User(
+            email=f"datagen-{uuid.uuid4().hex}@example.com",
+            hashed_password=hashed_password,
+            name="",
+            # users.created_at はタイムゾーンなし（UTC）
+            created_at=start.replace(tzinfo=None)
+        )
+        for _ in range(users)
+    ]
+    db.add_all(new_users)
+    db.flush()
+
+    projects = []
+    for user in new_users:
+        user.email = f"datagen{user.id}@example.com"
+        user.name = f"ユーザー{user.id}"
+        projects.extend(
+            models.Project(name="", document_url="", user_id=user.id, created_at=start + timedelta(minutes=index))
+            for index in range(projects_per_user)
+        )
+    db.add_all(projects)
+    db.flush()
+
+    members = []
+    for project in projects:
+        project.name = f"プロジェクト{project.id}"
+        project.document_url = f"https://docs.example.com/projects/{project.id}"
+        members.extend(
+            models.Member(
+                project_id=project.id,
+                name=rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES),
+                role=_member_role(index),
+                created_at=start
+            )
+            for index in range(members_per_project)
+        )
+    db.add_all(members)
+    db.flush()
+
+    score_rows = []
+    for member in members:
+        member.email = f"member{member.id}@example.com"
+        score_rows.extend(_score_rows(rng, member.id, drift, scores_per_member, days, noise, start))
+    if score_rows:
+        db.execute(insert(models.Score), score_rows)
+    db.flush()
+
+    project_ids = [project.id for project in projects]
+    timeline_rows = 0
+    if project_ids:
+        rebuild_rollups(db, project_ids=project_ids)
+        timeline_rows = rebuild_timelines(db, project_ids=project_ids)
+
+    return {
+        "users": len(new_users),
+        "projects": len(projects),
+        "members": len(members),
+        "scores": len(score_rows),
+        "user_ids": [user.id for user in new_users],
+        "project_ids": project_ids,
+        "timeline_rows": timeline_rows
+    }
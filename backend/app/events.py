@@ -0,0 +1,183 @@
+from sqlalchemy.orm import Session
+from threading import Lock
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import os
+
+from . import models, schemas
+from .models import ROLE_WEIGHTS
+from .rollups import rollup_weighted_average
+from .timeline import reflected_from
+
+# ダッシュボードのストリーム（SSE）で、1クライアントあたりに溜めておけるイベント数
+# 超えた場合（遅いクライアント）は溜まったイベントを捨て、スナップショットを送り直す
+DASHBOARD_STREAM_QUEUE_SIZE = int(os.getenv("DASHBOARD_STREAM_QUEUE_SIZE", "16"))
+# イベントがない間に接続を維持するためのコメントを送る間隔（秒）
+DASHBOARD_STREAM_HEARTBEAT = float(os.getenv("DASHBOARD_STREAM_HEARTBEAT", "15"))
+# 切断時にクライアント（EventSource）が再接続するまでの時間（ミリ秒）
+DASHBOARD_STREAM_RETRY_MS = 3000
+
+# スナップショットを送り直すイベント（メンバーの一括登録・遅いクライアント）
+RESYNC = "resync"
+
+# (集計行のversion, イベント名, JSON)
+Event = Tuple[int, str, Optional[str]]
+
+
+class Subscription:
+    """1つのストリームが受け取るイベントのキュー（上限あり）"""
+
+    def __init__(self, project_id: int, queue_size: int):
+        self.project_id = project_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+
+class DashboardBroker:
+    """
+    プロジェクトごとのダッシュボードの変更をストリームに配信する（プロセス内のpub/sub）
+
+    subscribe・配信はイベントループのスレッドで行う。publishはどのスレッドからでも呼べる
+    （スレッドプールで実行される同期版のルーターからはイベントループに渡して配信する）。
+    購読していないプロジェクトへのpublishは何もしない。
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = Lock()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, project_id: int) -> Subscription:
+        """プロジェクトの変更の購読を始める（イベントループ内で呼ぶ）"""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(project_id, self.queue_size)
+        self._subscriptions.setdefault(project_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """購読をやめる"""
+        subscriptions = self._subscriptions.get(subscription.project_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.project_id]
+
+    def has_subscribers(self, project_id: int) -> bool:
+        """プロジェクトを購読しているストリームがあるか（なければイベントを作らなくてよい）"""
+        return project_id in self._subscriptions
+
+    def publish(self, project_id: int, event: Event):
+        """イベントを配信する（どのスレッドからでも呼べる）"""
+        loop = self._loop
+        if loop is None or not self.has_subscribers(project_id):
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is loop:
+            self._deliver(project_id, event)
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, project_id, event)
+
+    def _deliver(self, project_id: int, event: Event):
+        with self._lock:
+            self.published += 1
+        for subscription in list(self._subscriptions.get(project_id, ())):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # 遅いクライアント: 溜まったイベントを捨て、次にスナップショットを送り直す
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait((0, RESYNC, None))
+                with self._lock:
+                    self.dropped += 1
+
+    def stats(self) -> Dict[str, int]:
+        """購読数などの統計情報を返す"""
+        subscriptions = list(self._subscriptions.values())
+        with self._lock:
+            return {
+                "projects": len(subscriptions),
+                "subscribers": sum(len(project_subscriptions) for project_subscriptions in subscriptions),
+                "queue_size": self.queue_size,
+                "published": self.published,
+                "dropped": self.dropped
+            }
+
+
+dashboard_broker = DashboardBroker(DASHBOARD_STREAM_QUEUE_SIZE)
+
+
+def _member_summary(member_id: int, name: str, role: str, score: Optional[Dict] = None) -> Dict:
+    return {
+        "id": member_id,
+        "name": name,
+        "role": role,
+        "weight": ROLE_WEIGHTS.get(role, 1),
+        "latest_score": score["score"] if score is not None else None,
+        "latest_comment": score["comment"] if score is not None else None,
+        "latest_score_at": score["created_at"] if score is not None else None
+    }
+
+
+def publish_dashboard_delta(db: Session, project_id: int, members: List[Dict], timeline_date: Optional[str] = None):
+    """
+    コミット後の集計値と変更があったメンバーを差分として配信する
+
+    timeline_date を指定した場合は、その日のタイムライン（現在の加重平均）も含める。
+    """
+    rollup = db.get(models.ProjectRollup, project_id)
+    if rollup is None:
+        return
+    weighted_average = rollup_weighted_average(rollup)
+    timeline = []
+    if timeline_date is not None and rollup.total_weight > 0:
+        timeline.append({"date": timeline_date, "weighted_average": weighted_average})
+
+    delta = schemas.DashboardDelta(
+        weighted_average=weighted_average,
+        last_updated=rollup.last_updated,
+        members=members,
+        timeline=timeline
+    )
+    dashboard_broker.publish(project_id, (rollup.version, "delta", delta.model_dump_json()))
+
+
+def publish_scores(db: Session, project_id: int, scores: List[Dict]):
+    """スコアの登録を配信する（scoresは登録した順の {"member_id", "score", "comment", "created_at"}）"""
+    if not scores or not dashboard_broker.has_subscribers(project_id):
+        return
+    latest = {}
+    for score in scores:
+        latest[score["member_id"]] = score
+    members = db.query(models.Member.id, models.Member.name, models.Member.role)\
+        .filter(models.Member.id.in_(list(latest)))\
+        .all()
+    last_created_at = max(score["created_at"] for score in scores)
+    # 23:59:59を過ぎたスコアはその日のタイムラインの値に含めない（rollups.apply_scoresで作り直される）
+    timeline_date = None
+    if reflected_from(last_created_at) == last_created_at.date():
+        timeline_date = last_created_at.date().isoformat()
+    publish_dashboard_delta(
+        db,
+        project_id,
+        [_member_summary(member.id, member.name, member.role, latest[member.id]) for member in members],
+        timeline_date=timeline_date
+    )
+
+
+def publish_member(db: Session, member: models.Member):
+    """メンバーの追加を配信する"""
+    if not dashboard_broker.has_subscribers(member.project_id):
+        return
+    publish_dashboard_delta(db, member.project_id, [_member_summary(member.id, member.name, member.role)])
+
+
+def publish_resync(project_id: int):
+    """差分にしない変更（メンバーの一括登録等）の後に、スナップショットを送り直させる"""
+    dashboard_broker.publish(project_id, (0, RESYNC, None))
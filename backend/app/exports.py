@@ -0,0 +1,69 @@
+from sqlalchemy import select
+from typing import Iterator, Optional
+import csv
+import io
+import json
+import os
+
+from . import models
+from .database import SessionLocal
+from .timestamps import to_api_timestamp
+
+# サーバー側カーソルから1回に取り出す行数（レスポンスもこの行数ごとに送る）
+SCORE_EXPORT_BATCH_SIZE = int(os.getenv("SCORE_EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8"
+}
+EXPORT_COLUMNS = ("score_id", "member_id", "member_name", "member_role", "score", "comment", "created_at")
+
+
+def iter_score_export(project_id: int, file_format: str, batch_size: Optional[int] = None) -> Iterator[str]:
+    """
+    プロジェクトの全スコア履歴をメンバー名・役職付きで少しずつ出力する
+
+    並び順はメンバーごとの登録順。members(project_id) と scores(member_id, created_at, id) の
+    インデックスを順に辿るだけでソートが不要なため、最初の行からすぐに送り始められる。
+    yield_perでサーバー側カーソルから batch_size（省略時は SCORE_EXPORT_BATCH_SIZE）行ずつ読み、読んだ分だけ文字列にして返すため、
+    行数に関係なくメモリ使用量は一定。StreamingResponseに渡すこと。
+    レスポンスの送信中もDB接続を使うため、リクエストのセッションとは別にセッションを開く。
+    所有権の確認は呼び出し側で行うこと。
+    """
+    if file_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        # 先頭行はすぐに送る
+        yield buffer.getvalue()
+
+    stmt = select(
+        models.Score.id,
+        models.Score.member_id,
+        models.Member.name,
+        models.Member.role,
+        models.Score.score,
+        models.Score.comment,
+        models.Score.created_at
+    )\
+        .join(models.Member, models.Member.id == models.Score.member_id)\
+        .where(models.Member.project_id == project_id)\
+        .order_by(models.Member.id.asc(), models.Score.created_at.asc(), models.Score.id.asc())\
+        .execution_options(yield_per=batch_size or SCORE_EXPORT_BATCH_SIZE)
+
+    with SessionLocal() as db:
+        result = db.execute(stmt)
+        for rows in result.partitions():
+            # 日時は他のAPIと同じ形式の文字列にする
+            rows = [(*row[:-1], to_api_timestamp(row[-1])) for row in rows]
+            if file_format == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n"
+                    for row in rows
+                )
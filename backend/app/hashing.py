@@ -0,0 +1,115 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from typing import Any, Callable, Dict, Optional
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import os
+
+from .auth import get_password_hash, verify_password, password_needs_rehash
+from .models import User
+
+# パスワードハッシュ専用のワーカー数（0の場合は専用プールを使わず通常のスレッドプールで実行）
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# ワーカーが埋まっているときに待機できるリクエスト数（超えた分は503）
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+
+
+class PasswordHashExecutor:
+    """
+    bcryptの計算を専用のスレッドプールで実行する
+
+    bcryptはGILを解放するためスレッドで並列に計算できる。
+    同時に受け付ける数を workers + queue_size に制限し、超えた場合はすぐに503を返す。
+    ログインが集中してもFastAPIのスレッドプールを占有しないため、他のAPIが詰まらない。
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash") if workers > 0 else None
+        self._slots = BoundedSemaphore(workers + queue_size) if workers > 0 else None
+        self._lock = Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def run(self, func: Callable, *args) -> Any:
+        """funcをワーカーで実行し、結果を返す"""
+        if self._executor is None:
+            return await run_in_threadpool(func, *args)
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="混み合っています。しばらくしてから再度お試しください",
+                headers={"Retry-After": "1"},
+            )
+
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return await asyncio.wrap_future(self._executor.submit(func, *args))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """実行中・待機中の数などの統計情報を返す"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "in_flight": self.in_flight,
+                "queued": max(self.in_flight - self.workers, 0),
+                "rejected": self.rejected
+            }
+
+
+password_hasher = PasswordHashExecutor(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE)
+
+
+async def hash_password_async(password: str) -> str:
+    """パスワードを専用ワーカーでハッシュ化する"""
+    return await password_hasher.run(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """パスワードを専用ワーカーで検証する"""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+async def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+    """
+    ユーザー認証を行う
+
+    DBアクセスは通常のスレッドプール、bcryptは専用ワーカーで実行する。
+    コストが変更されたハッシュは新しいコストで再ハッシュして保存する。
+    """
+    def load_user():
+        user = db.query(User).filter(User.email == email).first()
+        if user is not None:
+            db.expunge(user)
+        # bcryptの計算中にDB接続を保持しないよう、トランザクションを終えておく
+        db.rollback()
+        return user
+
+    user = await run_in_threadpool(load_user)
+    if not user:
+        return None
+    if not await verify_password_async(password, user.hashed_password):
+        return None
+
+    if password_needs_rehash(user.hashed_password):
+        new_hash = await hash_password_async(password)
+
+        def save_hash():
+            db.query(User).filter(User.id == user.id).update({User.hashed_password: new_hash})
+            db.commit()
+
+        await run_in_threadpool(save_hash)
+        user.hashed_password = new_hash
+    return user
@@ -0,0 +1,255 @@
+from typing import AsyncIterator, Dict, Iterator, List, NamedTuple, Optional, TextIO
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+import anyio.from_thread
+import csv
+import io
+import json
+import logging
+import os
+
+from . import models, schemas
+from .cache import dashboard_cache
+from .events import publish_resync
+from .rollups import get_project_rollup, apply_member, commit_rollup_write
+
+# 1トランザクションで登録する行数
+MEMBER_IMPORT_CHUNK_SIZE = int(os.getenv("MEMBER_IMPORT_CHUNK_SIZE", "500"))
+# レスポンスに含める行ごとのエラーの上限（超えた分は件数のみ数える）
+MEMBER_IMPORT_MAX_ERRORS = int(os.getenv("MEMBER_IMPORT_MAX_ERRORS", "1000"))
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+logger = logging.getLogger(__name__)
+
+
+def detect_format(content_type: Optional[str]) -> str:
+    """Content-Typeから形式を判定する（判定できない場合はCSV）"""
+    if content_type and ("ndjson" in content_type or "jsonl" in content_type):
+        return "ndjson"
+    return "csv"
+
+
+class _StreamReader(io.RawIOBase):
+    """
+    リクエストボディ（非同期ストリーム）を同期のファイルとして読めるようにする
+
+    ワーカースレッドから anyio.from_thread でイベントループ上のストリームを少しずつ読むため、
+    ボディ全体をメモリに載せない。run_in_threadpool の中で使うこと。
+    """
+
+    def __init__(self, stream: AsyncIterator[bytes]):
+        self._stream = stream
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def _next_chunk(self) -> bytes:
+        try:
+            return anyio.from_thread.run(self._stream.__anext__)
+        except StopAsyncIteration:
+            return b""
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = self._next_chunk()
+            if not chunk:
+                return 0
+            self._pending = chunk
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def open_stream(stream: AsyncIterator[bytes]) -> TextIO:
+    """
+    リクエストボディをUTF-8（BOM付きも可）のテキストファイルとして開く
+
+    UTF-8として不正なバイトは読み込みを止めずにサロゲート文字として残し、その行をエラーにする。
+    """
+    return io.TextIOWrapper(
+        io.BufferedReader(_StreamReader(stream)),
+        encoding="utf-8-sig",
+        errors="surrogateescape",
+        newline=""
+    )
+
+
+class ImportRecord(NamedTuple):
+    """読み込んだ1行（recordかerrorのどちらか）。abortedがTrueなら、それ以降は読み込めない"""
+    line: int
+    record: Optional[Dict]
+    error: Optional[str]
+    aborted: bool = False
+
+
+INVALID_UTF8_DETAIL = "UTF-8として読み込めません"
+
+
+def _is_valid_utf8(*values: Optional[str]) -> bool:
+    """不正なバイト（surrogateescapeで読み込んだサロゲート文字）を含まないか"""
+    try:
+        for value in values:
+            if value:
+                value.encode("utf-8")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def iter_csv_records(text_file: TextIO) -> Iterator[ImportRecord]:
+    """
+    CSVを1行ずつ読み、ImportRecordを返す
+
+    1行目はヘッダー（name, role, email）。emailが空の場合はNoneとして扱う。
+    CSVとして解析できない場合（大きすぎるフィールド等）は、解析位置が信頼できないためその行で読み込みを止める。
+    """
+    reader = csv.DictReader(text_file)
+    try:
+        if reader.fieldnames is None:
+            return
+        if not _is_valid_utf8(*reader.fieldnames):
+            yield ImportRecord(1, None, INVALID_UTF8_DETAIL, aborted=True)
+            return
+        missing = {"name", "role"} - {field.strip() for field in reader.fieldnames}
+        if missing:
+            yield ImportRecord(1, None, f"ヘッダーに必要な列がありません: {', '.join(sorted(missing))}", aborted=True)
+            return
+
+        for row in reader:
+            record = {key.strip(): value for key, value in row.items() if key is not None}
+            if not _is_valid_utf8(*(value for value in record.values() if isinstance(value, str))):
+                yield ImportRecord(reader.line_num, None, INVALID_UTF8_DETAIL)
+                continue
+            if not record.get("email"):
+                record["email"] = None
+            yield ImportRecord(reader.line_num, record, None)
+    except csv.Error as e:
+        # 解析に失敗した行はline_numに数えられない
+        yield ImportRecord(reader.line_num + 1, None, f"CSVとして読み込めません: {e}", aborted=True)
+    except UnicodeDecodeError:
+        # surrogateescapeで開いていないファイル（呼び出し側で開いたもの）の場合
+        yield ImportRecord(reader.line_num + 1, None, INVALID_UTF8_DETAIL, aborted=True)
+
+
+def iter_ndjson_records(text_file: TextIO) -> Iterator[ImportRecord]:
+    """NDJSONを1行ずつ読み、ImportRecordを返す（空行は読み飛ばす）"""
+    line_number = 0
+    try:
+        for line in text_file:
+            line_number += 1
+            if not line.strip():
+                continue
+            if not _is_valid_utf8(line):
+                yield ImportRecord(line_number, None, INVALID_UTF8_DETAIL)
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield ImportRecord(line_number, None, f"JSONとして読み込めません: {e.msg}")
+                continue
+            if not isinstance(record, dict):
+                yield ImportRecord(line_number, None, "JSONオブジェクトではありません")
+                continue
+            yield ImportRecord(line_number, record, None)
+    except UnicodeDecodeError:
+        # surrogateescapeで開いていないファイル（呼び出し側で開いたもの）の場合
+        yield ImportRecord(line_number + 1, None, INVALID_UTF8_DETAIL, aborted=True)
+
+
+def _validation_detail(error: ValidationError) -> str:
+    """pydanticの検証エラーを1行のメッセージにまとめる"""
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in item['loc'])}: {item['msg']}" if item["loc"] else item["msg"]
+        for item in error.errors()
+    )
+
+
+def _insert_members(db: Session, project_id: int, rows: List[Dict]):
+    """メンバーをまとめて登録し、集計値を同じトランザクションで更新する"""
+    def write():
+        # 同じプロジェクトへの同時登録に備えて集計行をロック
+        rollup = get_project_rollup(db, project_id, for_update=True)
+        db.execute(insert(models.Member), rows)
+        apply_member(rollup, len(rows))
+
+    commit_rollup_write(db, write)
+
+
+def import_members(
+    db: Session,
+    project_id: int,
+    text_file: TextIO,
+    file_format: str = "csv",
+    chunk_size: int = MEMBER_IMPORT_CHUNK_SIZE
+) -> Dict:
+    """
+    CSV / NDJSONからメンバーを一括登録する
+
+    1行ずつ読みながらMemberCreateで検証し、chunk_size行ごとに1トランザクションで登録する。
+    不正な行は登録せずにエラーとして返す。それ以降を読み込めないエラーの場合は、その行までの
+    正しい行を登録して中断する（abortedがTrue、importedは中断までに登録した行数）。
+    プロジェクトの所有権は呼び出し側で確認すること。
+    """
+    records = iter_csv_records(text_file) if file_format == "csv" else iter_ndjson_records(text_file)
+
+    imported = 0
+    failed = 0
+    aborted = False
+    errors = []
+    chunk = []
+
+    for line_number, record, error, aborted in records:
+        if error is None:
+            try:
+                member = schemas.MemberCreate(**record)
+            except ValidationError as e:
+                error = _validation_detail(e)
+
+        if error is not None:
+            failed += 1
+            if len(errors) < MEMBER_IMPORT_MAX_ERRORS:
+                errors.append({"line": line_number, "detail": error})
+            continue
+
+        chunk.append({
+            "project_id": project_id,
+            "name": member.name,
+            "role": member.role,
+            "email": member.email
+        })
+        if len(chunk) >= chunk_size:
+            _insert_members(db, project_id, chunk)
+            imported += len(chunk)
+            chunk = []
+
+    if chunk:
+        _insert_members(db, project_id, chunk)
+        imported += len(chunk)
+
+    if imported:
+        # このプロセスのダッシュボードキャッシュを破棄（他のプロセスはversionの不一致で検出する）
+        dashboard_cache.invalidate(project_id)
+        # ダッシュボードのストリームにはメンバーの差分ではなくスナップショットを送り直させる
+        publish_resync(project_id)
+
+    logger.info(
+        "メンバーを一括登録しました",
+        extra={
+            "project_id": project_id,
+            "imported": imported,
+            "failed": failed,
+            "aborted": aborted,
+            "format": file_format
+        }
+    )
+    return {
+        "imported": imported,
+        "failed": failed,
+        "aborted": aborted,
+        "errors": errors,
+        "errors_truncated": failed > len(errors)
+    }
@@ -0,0 +1,195 @@
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from starlette.datastructures import MutableHeaders
+from typing import Any, Optional
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import uuid
+
+# ログの設定（環境変数で調整）
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json / text
+
+# リクエストIDのヘッダー（受け取った値が正しい形式ならそのまま使う）
+REQUEST_ID_HEADER = "X-Request-ID"
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# マスクする値（JWT・Bearerトークン）とキー
+TOKEN_PATTERN = re.compile(r"eyJ[A-Za-z0-9_-]*\.[A-Za-z0-9_-]*\.[A-Za-z0-9_-]*|(?i:bearer)\s+[A-Za-z0-9._~+/=-]+")
+SECRET_KEYS = ("token", "password", "authorization", "secret", "credentials")
+REDACTED = "[REDACTED]"
+
+# LogRecordの標準の属性（これ以外の属性はextraで渡された項目としてJSONに含める）
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+# 処理中のリクエストのID（リクエスト外の処理ではNone）
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+
+def redact(value: Any) -> Any:
+    """トークン・パスワード等をマスクする（dict・listは中まで）"""
+    if isinstance(value, str):
+        return TOKEN_PATTERN.sub(REDACTED, value)
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if any(secret in str(key).lower() for secret in SECRET_KEYS) else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+class RequestIdFilter(logging.Filter):
+    """ログにリクエストIDを付ける（ログを出したスレッドで実行されるQueueHandlerに設定する）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    """キューに入れる前にメッセージを確定する（例外のトレースバックはメッセージに含めず別の項目にする）"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exception = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    1行のJSONに整形する
+
+    extraで渡した項目もそのまま含める。整形はQueueListenerのスレッドで行うため、
+    トークンのマスクもリクエストの処理には影響しない。
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None)
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(redact(entry), ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """開発用の読みやすい形式（トークンはマスクする）"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        text = super().format(record)
+        if getattr(record, "exception", None):
+            text += "\n" + record.exception
+        return redact(text)
+
+
+def setup_logging():
+    """
+    アプリ（"app"）のログをQueueHandler経由で標準エラー出力に出す
+
+    リクエストを処理するスレッドはキューに入れるだけで、整形と書き込みはQueueListenerのスレッドで行う。
+    レベル未満のログは logger.debug(...) の呼び出し時点で捨てられる。何度呼んでもよい。
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = _QueueHandler(log_queue)
+    _queue_handler.addFilter(RequestIdFilter())
+
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.addHandler(_queue_handler)
+    app_logger.propagate = False
+    # SQLAlchemyが接続プール（app.db_pool のクラス）の接続の取得・返却ごとに出すログは出さない（警告以上のみ）
+    logging.getLogger("app.db_pool").setLevel(max(app_logger.level, logging.WARNING))
+
+    _listener = QueueListener(log_queue, stream_handler)
+    _listener.start()
+    # 終了時にキューに残ったログを書き出す（登録は1回だけ）
+    atexit.unregister(stop_logging)
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """
+    QueueListenerを止め、"app" ロガーからQueueHandlerを外す（キューに残ったログは書き出してから止まる）
+
+    止めた後にsetup_loggingを呼ぶと、新しいキューとハンドラーで設定し直す。
+    """
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger("app").removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """
+    リクエストIDを決めてログとレスポンスヘッダー（X-Request-ID）に付ける
+
+    X-Request-IDヘッダーが正しい形式（英数字と ._- で64文字以内）ならその値を使い、なければ生成する。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                value = value.decode("latin-1")
+                if REQUEST_ID_PATTERN.match(value):
+                    request_id = value
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+            await send(message)
+
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _request_id.reset(token)
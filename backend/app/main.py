@@ -1,24 +1,78 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
-from .routers import projects, members, scores, dashboard, auth
+from .database import engine, async_engine, DB_ASYNC
+from .db_pool import pool_stats
+from .migrations import SCHEMA_VERSION, get_schema_version, upgrade_schema
+from . import routers
+from .cache import dashboard_cache
+from .events import dashboard_broker
+from .auth import get_current_user, get_current_user_async, user_cache
+from .hashing import password_hasher
+from .metrics import METRICS_CONTENT_TYPE, METRICS_ENABLED, MetricsMiddleware, render_metrics
+from .logging_config import RequestIdMiddleware, setup_logging, stop_logging
+from .query_stats import QUERY_STATS_ENABLED, QueryStatsMiddleware, instrument_engine
+from .responses import DefaultResponse
+import logging
 import os
 
-# データベーステーブルの作成
-# RESET_DB=trueの場合、既存テーブルを削除して再作成（マイグレーション用）
-if os.getenv("RESET_DB", "false").lower() == "true":
-    print("⚠️  RESET_DB=true detected. Dropping all tables and recreating...")
-    Base.metadata.drop_all(bind=engine)
-    print("✅ All tables dropped.")
+# アプリのログ（JSON、リクエストID付き）を別スレッドで標準エラー出力に出す
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# 起動時にスキーマが古い場合、自動で移行するか（falseの場合は起動しない。migrate_db.pyで移行する）
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() == "true"
+
+# /stats（キャッシュ・接続プール等の統計情報）を公開するか
+STATS_ENABLED = os.getenv("STATS_ENABLED", "false").lower() == "true"
+
+
+def check_schema():
+    """
+    スキーマのバージョンを確認し、古い場合は移行する（AUTO_MIGRATE=false の場合は起動を中止する）
+
+    最新の場合はバージョンを1回読むだけで、テーブルの作成・移行は行わない。
+    """
+    if os.getenv("RESET_DB", "false").lower() == "true":
+        logger.warning("RESET_DB は起動時には使われません。python migrate_db.py --reset を実行してください")
+
+    version = get_schema_version(engine)
+    if version is not None and version >= SCHEMA_VERSION:
+        if version > SCHEMA_VERSION:
+            logger.warning("データベースのスキーマがアプリより新しいバージョンです",
+                           extra={"schema_version": version, "app_schema_version": SCHEMA_VERSION})
+        return
+    if not AUTO_MIGRATE:
+        raise RuntimeError(
+            f"データベースのスキーマが古いです（{version if version is not None else 'なし'} → {SCHEMA_VERSION}）。"
+            "python migrate_db.py を実行してください"
+        )
+    upgrade_schema(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """起動時: スキーマの確認（import時にはデータベースに接続しない） / 終了時: 接続とログの後片付け"""
+    setup_logging()
+    check_schema()
+    logger.info("データベースのスキーマを確認しました", extra={"schema_version": SCHEMA_VERSION})
+    yield
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+    # キューに残ったログを書き出してからQueueListenerを止める
+    stop_logging()
 
-Base.metadata.create_all(bind=engine)
-print("✅ Database tables created/verified.")
 
 # FastAPIアプリケーションの初期化
 app = FastAPI(
     title="Project Transparency API",
     description="プロジェクトの透明性を可視化する%スコアリングシステム",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # レスポンスはorjsonでエンコードする（ダッシュボード等は組み立て済みのJSONを直接返す）
+    default_response_class=DefaultResponse
 )
 
 # CORS設定
@@ -31,12 +85,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# リクエストごとのSQLの実行回数・DB時間（Server-Timingヘッダーとログ）
+if QUERY_STATS_ENABLED:
+    instrument_engine(engine)
+    if async_engine is not None:
+        instrument_engine(async_engine.sync_engine)
+    app.add_middleware(QueryStatsMiddleware)
+
+# ルートごとのリクエスト数・処理時間（/metrics）
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# リクエストID（全てのログとX-Request-IDヘッダーに付けるため、最も外側に置く）
+app.add_middleware(RequestIdMiddleware)
+
 # ルーターの登録
-app.include_router(auth.router, prefix="/api", tags=["auth"])
-app.include_router(projects.router, prefix="/api", tags=["projects"])
-app.include_router(members.router, prefix="/api", tags=["members"])
-app.include_router(scores.router, prefix="/api", tags=["scores"])
-app.include_router(dashboard.router, prefix="/api", tags=["dashboard"])
+# DB_ASYNC=trueの場合はAsyncSessionを使う非同期版のルーターを使う
+if DB_ASYNC:
+    from .routers import aio as routers_mod
+else:
+    routers_mod = routers
+
+app.include_router(routers_mod.auth.router, prefix="/api", tags=["auth"])
+app.include_router(routers_mod.projects.router, prefix="/api", tags=["projects"])
+app.include_router(routers_mod.members.router, prefix="/api", tags=["members"])
+app.include_router(routers_mod.scores.router, prefix="/api", tags=["scores"])
+app.include_router(routers_mod.dashboard.router, prefix="/api", tags=["dashboard"])
 
 # ヘルスチェック
 @app.get("/")
@@ -46,3 +120,23 @@ def read_root():
         "status": "running",
         "docs": "/docs"
     }
+
+
+# キャッシュ・ワーカー・接続プールの統計情報（サイズ調整用。内部の状態を返すため、有効にした場合も要認証）
+if STATS_ENABLED:
+    @app.get("/stats", dependencies=[Depends(get_current_user_async if DB_ASYNC else get_current_user)])
+    def read_stats():
+        return {
+            "dashboard_cache": dashboard_cache.stats(),
+            "auth_user_cache": user_cache.stats(),
+            "password_hasher": password_hasher.stats(),
+            "dashboard_stream": dashboard_broker.stats(),
+            "db_pool": pool_stats(async_engine if DB_ASYNC else engine)
+        }
+
+
+# Prometheus形式のメトリクス（容量計画・アラート用）
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics():
+        return Response(render_metrics(async_engine if DB_ASYNC else engine), media_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,228 @@
+from sqlalchemy.pool import QueuePool
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+import math
+import os
+import time
+
+from .auth import user_cache
+from .cache import dashboard_cache
+from .db_pool import WAIT_BUCKETS
+from .events import dashboard_broker
+from .hashing import password_hasher
+
+# /metrics（Prometheus形式）を有効にするか
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Prometheusのテキスト形式のContent-Type
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# リクエスト処理時間のヒストグラムの区切り（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# ルートに一致しなかったリクエストのラベル（ラベルの種類を増やさないよう、パスは使わない）
+UNMATCHED_ROUTE = "<unmatched>"
+
+# ヒット率を出力するキャッシュ
+CACHES = {
+    "dashboard": dashboard_cache,
+    "auth_user": user_cache
+}
+
+
+class RequestMetrics:
+    """ルート（"/api/projects/{project_id}/dashboard" 等のテンプレート）ごとのリクエスト数・処理時間"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, str], int] = {}  # (method, route, status) -> 件数
+        self.latency: Dict[Tuple[str, str], List] = {}  # (method, route) -> [区切りごとの件数, 合計秒, 件数]
+
+    def start(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finish(self, method: str, route: str, status: int, seconds: float):
+        with self._lock:
+            self.in_flight -= 1
+            key = (method, route, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            histogram = self.latency.get((method, route))
+            if histogram is None:
+                histogram = self.latency[(method, route)] = [[0] * len(LATENCY_BUCKETS), 0.0, 0]
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram[0][index] += 1
+                    break
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def snapshot(self) -> Tuple[int, Dict, Dict]:
+        with self._lock:
+            return (
+                self.in_flight,
+                dict(self.requests),
+                {key: [list(buckets), total, count] for key, (buckets, total, count) in self.latency.items()}
+            )
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """リクエスト数・処理時間（レスポンスの送信完了まで）・処理中の数を記録する"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_metrics.start()
+        started = time.perf_counter()
+        # 例外でレスポンスを返せなかった場合は500として数える
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # ルーティング後のscopeにはルート（FastAPIのAPIRoute）が入る
+            route = scope.get("route")
+            request_metrics.finish(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status_code,
+                time.perf_counter() - started
+            )
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value: Optional[float]) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Writer:
+    """Prometheusのテキスト形式で出力する"""
+
+    def __init__(self):
+        self.lines = []
+
+    def header(self, name: str, metric_type: str, help_text: str):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {metric_type}")
+
+    def sample(self, name: str, value: Optional[float], labels: Optional[Dict[str, str]] = None):
+        if labels:
+            label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+            self.lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+        else:
+            self.lines.append(f"{name} {_format_value(value)}")
+
+    def histogram(self, name: str, bounds, counts: List[int], total: float, count: int,
+                  labels: Optional[Dict[str, str]] = None):
+        """countsは区切りごとの件数（累積ではない。最後の区切りを超えた分は count から求める）"""
+        labels = labels or {}
+        cumulative = 0
+        for bound, bucket_count in zip(bounds, counts):
+            cumulative += bucket_count
+            self.sample(f"{name}_bucket", cumulative, {**labels, "le": repr(float(bound))})
+        self.sample(f"{name}_bucket", count, {**labels, "le": "+Inf"})
+        self.sample(f"{name}_sum", total, labels)
+        self.sample(f"{name}_count", count, labels)
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def render_metrics(engine) -> str:
+    """/metrics のレスポンス（Prometheusのテキスト形式）"""
+    writer = _Writer()
+
+    # リクエスト
+    in_flight, requests, latency = request_metrics.snapshot()
+    writer.header("http_requests_in_flight", "gauge", "処理中のリクエスト数")
+    writer.sample("http_requests_in_flight", in_flight)
+
+    writer.header("http_requests_total", "counter", "ルート・ステータスコードごとのリクエスト数")
+    for (method, route, status), count in sorted(requests.items()):
+        writer.sample("http_requests_total", count, {"method": method, "route": route, "status": status})
+
+    writer.header("http_request_duration_seconds", "histogram", "ルートごとのリクエスト処理時間（秒）")
+    for (method, route), (buckets, total, count) in sorted(latency.items()):
+        writer.histogram(
+            "http_request_duration_seconds", LATENCY_BUCKETS, buckets, total, count,
+            {"method": method, "route": route}
+        )
+
+    # DB接続プール
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        writer.header("db_pool_size", "gauge", "接続プールのサイズ")
+        writer.sample("db_pool_size", pool.size())
+        writer.header("db_pool_max_overflow", "gauge", "プールのサイズを超えて作成できる接続数")
+        writer.sample("db_pool_max_overflow", pool._max_overflow)
+        writer.header("db_pool_checked_out", "gauge", "使用中の接続数")
+        writer.sample("db_pool_checked_out", pool.checkedout())
+        writer.header("db_pool_overflow", "gauge", "プールのサイズを超えて作成した接続数")
+        writer.sample("db_pool_overflow", max(pool.overflow(), 0))
+
+        metrics = getattr(pool, "metrics", None)
+        if metrics is not None:
+            with metrics._lock:
+                buckets = list(metrics.wait_buckets)
+                total, count, timeouts = metrics.wait_seconds_total, metrics.checkouts, metrics.timeouts
+            writer.header("db_pool_checkout_timeouts_total", "counter", "接続の取得がタイムアウトした回数")
+            writer.sample("db_pool_checkout_timeouts_total", timeouts)
+            writer.header("db_pool_checkout_wait_seconds", "histogram", "接続の取得の待ち時間（秒）")
+            writer.histogram("db_pool_checkout_wait_seconds", WAIT_BUCKETS, buckets, total, count)
+
+    # キャッシュ
+    stats = {name: cache.stats() for name, cache in CACHES.items()}
+    for metric, key, metric_type, help_text in (
+        ("cache_hits_total", "hits", "counter", "キャッシュのヒット数"),
+        ("cache_misses_total", "misses", "counter", "キャッシュのミス数"),
+        ("cache_hit_ratio", "hit_ratio", "gauge", "キャッシュのヒット率（起動からの累計）"),
+        ("cache_entries", "size", "gauge", "キャッシュの件数"),
+        ("cache_evictions_total", "evictions", "counter", "上限を超えて追い出した件数"),
+    ):
+        writer.header(metric, metric_type, help_text)
+        for name, cache_stats in stats.items():
+            writer.sample(metric, cache_stats[key], {"cache": name})
+
+    # パスワードハッシュ用ワーカー
+    hasher = password_hasher.stats()
+    for metric, key, metric_type, help_text in (
+        ("password_hasher_workers", "workers", "gauge", "パスワードハッシュ用のワーカー数"),
+        ("password_hasher_in_flight", "in_flight", "gauge", "実行中・待機中のハッシュ処理の数"),
+        ("password_hasher_queued", "queued", "gauge", "ワーカーの空きを待っているハッシュ処理の数"),
+        ("password_hasher_rejected_total", "rejected", "counter", "待機数の上限を超えて拒否した数"),
+    ):
+        writer.header(metric, metric_type, help_text)
+        writer.sample(metric, hasher[key])
+
+    # ダッシュボードのストリーム（SSE）
+    stream = dashboard_broker.stats()
+    for metric, key, metric_type, help_text in (
+        ("dashboard_stream_subscribers", "subscribers", "gauge", "接続中のダッシュボードのストリーム数"),
+        ("dashboard_stream_events_total", "published", "counter", "配信したイベント数"),
+        ("dashboard_stream_dropped_total", "dropped", "counter", "キューがあふれてスナップショットを送り直した回数"),
+    ):
+        writer.header(metric, metric_type, help_text)
+        writer.sample(metric, stream[key])
+
+    return writer.text()
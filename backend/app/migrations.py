@@ -0,0 +1,175 @@
+from datetime import datetime
+from sqlalchemy import bindparam, func, insert, inspect, select, text, update
+from sqlalchemy.engine import Engine
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from .models import Base, SchemaVersion
+from .timestamps import utcnow
+
+# 現在のスキーマのバージョン（スキーマを変更したら1増やし、upgrade_schemaに移行処理を追加する）
+# 1: 日時型への移行・降順の複合インデックス・集計テーブル・日次タイムライン
+SCHEMA_VERSION = 1
+
+# PostgreSQL: 複数のプロセスが同時に移行しないようにするアドバイザリロックのキー
+MIGRATION_LOCK_KEY = 727100001
+
+logger = logging.getLogger(__name__)
+
+# 文字列（ISO 8601）から日時型に移行するカラム
+TIMESTAMP_COLUMNS: List[Tuple[str, str]] = [
+    ("projects", "created_at"),
+    ("members", "created_at"),
+    ("scores", "created_at"),
+    ("member_latest_scores", "created_at"),
+    ("project_rollups", "last_updated"),
+]
+
+# 日時型への移行で置き換えたインデックス
+OBSOLETE_INDEXES = ("idx_scores_member_id_created_at", "idx_projects_user_id_created_at")
+
+# SQLiteで1回に書き換える行数
+SQLITE_MIGRATION_BATCH_SIZE = 5000
+
+
+def _migrate_postgresql_column(conn, table: str, column: str) -> int:
+    """PostgreSQL: 文字列カラムを TIMESTAMP WITH TIME ZONE に変更する（変更した場合は1）"""
+    data_type = conn.execute(
+        text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"
+        ),
+        {"table": table, "column": column}
+    ).scalar()
+    if data_type not in ("character varying", "text"):
+        return 0
+
+    # 既存の値はタイムゾーンなしのUTCとして保存されている
+    conn.execute(text(
+        f"ALTER TABLE {table} ALTER COLUMN {column} TYPE TIMESTAMP WITH TIME ZONE "
+        f"USING NULLIF({column}, '')::timestamp AT TIME ZONE 'UTC'"
+    ))
+    return 1
+
+
+def _migrate_sqlite_column(conn, table: str, column: str) -> int:
+    """
+    SQLite: ISO 8601の文字列（"2024-11-08T12:34:56"）をSQLAlchemyの日時形式に書き換える
+
+    SQLiteのカラムには型がないため、値だけを書き換える。書き換えた行数を返す。
+    """
+    table_obj = Base.metadata.tables[table]
+    primary_key = list(table_obj.primary_key.columns)[0]
+    stmt = update(table_obj)\
+        .where(primary_key == bindparam("_pk"))\
+        .values({column: bindparam("_value")})
+
+    migrated = 0
+    last_pk = None
+    while True:
+        # 主キーの範囲で少しずつ読む（書き換え済みの行を読み直さない）
+        rows = conn.execute(
+            text(
+                f"SELECT {primary_key.name}, {column} FROM {table} "
+                + ("" if last_pk is None else f"WHERE {primary_key.name} > :last_pk ")
+                + f"ORDER BY {primary_key.name} LIMIT :limit"
+            ),
+            {"last_pk": last_pk, "limit": SQLITE_MIGRATION_BATCH_SIZE}
+        ).all()
+        if not rows:
+            return migrated
+        last_pk = rows[-1][0]
+
+        values = [
+            {"_pk": pk, "_value": datetime.fromisoformat(value)}
+            for pk, value in rows
+            if isinstance(value, str) and "T" in value
+        ]
+        if values:
+            conn.execute(stmt, values)
+            migrated += len(values)
+
+
+def _migrate_timestamp_columns(conn) -> Dict[str, int]:
+    existing_tables = set(inspect(conn).get_table_names())
+    results = {}
+    for table, column in TIMESTAMP_COLUMNS:
+        if table not in existing_tables:
+            continue
+        if conn.dialect.name == "postgresql":
+            results[f"{table}.{column}"] = _migrate_postgresql_column(conn, table, column)
+        else:
+            results[f"{table}.{column}"] = _migrate_sqlite_column(conn, table, column)
+
+    for index_name in OBSOLETE_INDEXES:
+        conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+    return results
+
+
+def migrate_timestamp_columns(engine: Engine) -> Dict[str, int]:
+    """
+    created_at / last_updated を文字列から日時型に移行する
+
+    移行済みのカラムは何もしないため、何度実行してもよい。
+    戻り値は "テーブル.カラム" -> 移行した行数（PostgreSQLでは型を変更した場合に1）。
+    """
+    with engine.begin() as conn:
+        return _migrate_timestamp_columns(conn)
+
+
+def create_missing_indexes(bind):
+    """既存のテーブルに後から追加したインデックスを作成する（create_allは既存テーブルのインデックスを作らない）"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
+def _get_schema_version(conn) -> Optional[int]:
+    if not inspect(conn).has_table(SchemaVersion.__tablename__):
+        return None
+    return conn.execute(select(func.max(SchemaVersion.version))).scalar()
+
+
+def get_schema_version(engine: Engine) -> Optional[int]:
+    """適用済みのスキーマのバージョン（schema_versionテーブルがない・空の場合はNone）"""
+    with engine.connect() as conn:
+        return _get_schema_version(conn)
+
+
+def upgrade_schema(engine: Engine, reset: bool = False) -> Dict:
+    """
+    データベースを現在のスキーマ（SCHEMA_VERSION）にそろえる
+
+    テーブルの作成・日時型への移行・インデックスの追加を1つのトランザクションで行い、schema_versionに記録する。
+    最新のバージョンが記録済みの場合は何もしない。何度実行してもよい。
+    同時に複数のプロセスが実行した場合は、ロック（PostgreSQLはアドバイザリロック、
+    SQLiteは BEGIN IMMEDIATE）で1つずつ実行し、後のプロセスは移行済みであることを確認して終わる。
+    reset=True の場合は全テーブルを削除して作り直す（データは全て消える）。
+    """
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        elif engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+        from_version = _get_schema_version(conn)
+        result = {"from_version": from_version, "to_version": from_version, "timestamp_columns": {}}
+        if from_version is not None and from_version >= SCHEMA_VERSION and not reset:
+            conn.rollback()
+            return result
+
+        if reset:
+            logger.warning("全テーブルを削除して作り直します")
+            Base.metadata.drop_all(bind=conn)
+            from_version = result["from_version"] = None
+
+        Base.metadata.create_all(bind=conn)
+        result["timestamp_columns"] = _migrate_timestamp_columns(conn)
+        create_missing_indexes(conn)
+        conn.execute(insert(SchemaVersion.__table__), {"version": SCHEMA_VERSION, "applied_at": utcnow()})
+        conn.commit()
+
+    result["to_version"] = SCHEMA_VERSION
+    logger.info("スキーマを移行しました", extra={"from_version": from_version, "to_version": SCHEMA_VERSION})
+    return result
@@ -1,8 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, CheckConstraint, Index, DateTime
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, CheckConstraint, Index, DateTime
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
+from .timestamps import UTCDateTime, utcnow
+
+# 役職の重み（加重平均の計算に使用）
+ROLE_WEIGHTS = {
+    "PL": 3,
+    "PM": 2,
+    "Member": 1
+}
 
 
 class User(Base):
@@ -24,7 +32,12 @@ class Project(Base):
     name = Column(String, nullable=False)
     document_url = Column(String, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
-    created_at = Column(String, default=lambda: datetime.utcnow().isoformat())
+    created_at = Column(UTCDateTime, default=utcnow)
+
+    # 一覧（新しい順）・キーセットページネーション用
+    __table_args__ = (
+        Index("idx_projects_user_id_created_at_desc", "user_id", created_at.desc(), id.desc()),
+    )
 
     # リレーション
     user = relationship("User", back_populates="projects")
@@ -39,7 +52,7 @@ class Member(Base):
     name = Column(String, nullable=False)
     role = Column(String, nullable=False)
     email = Column(String, nullable=True)
-    created_at = Column(String, default=lambda: datetime.utcnow().isoformat())
+    created_at = Column(UTCDateTime, default=utcnow)
 
     # Check制約
     __table_args__ = (
@@ -59,14 +72,64 @@ class Score(Base):
     member_id = Column(Integer, ForeignKey("members.id", ondelete="CASCADE"), nullable=False)
     score = Column(Integer, nullable=False)
     comment = Column(Text, nullable=True)
-    created_at = Column(String, default=lambda: datetime.utcnow().isoformat())
+    created_at = Column(UTCDateTime, default=utcnow)
 
     # Check制約
     __table_args__ = (
         CheckConstraint("score >= 0 AND score <= 100", name="check_score_range"),
         Index("idx_scores_member_id", "member_id"),
+        # 最新スコアの取得・履歴（新しい順）のキーセットページネーション用
+        Index("idx_scores_member_id_created_at_desc", "member_id", created_at.desc(), id.desc()),
         Index("idx_scores_created_at", "created_at"),
     )
 
     # リレーション
     member = relationship("Member", back_populates="scores")
+
+
+class MemberLatestScore(Base):
+    """メンバーごとの最新スコア（scoresの非正規化）"""
+    __tablename__ = "member_latest_scores"
+
+    member_id = Column(Integer, ForeignKey("members.id", ondelete="CASCADE"), primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    score_id = Column(Integer, ForeignKey("scores.id", ondelete="CASCADE"), nullable=False)
+    score = Column(Integer, nullable=False)
+    comment = Column(Text, nullable=True)
+    created_at = Column(UTCDateTime, nullable=False)
+
+    __table_args__ = (
+        Index("idx_member_latest_scores_project_id", "project_id"),
+    )
+
+
+class ProjectRollup(Base):
+    """プロジェクトごとの集計値（スコア登録時に更新）"""
+    __tablename__ = "project_rollups"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    weighted_sum = Column(Integer, nullable=False, default=0)
+    total_weight = Column(Integer, nullable=False, default=0)
+    member_count = Column(Integer, nullable=False, default=0)
+    last_updated = Column(UTCDateTime, nullable=True)
+    version = Column(Integer, nullable=False)
+
+    # 同時更新の検出用（楽観的ロック）
+    __mapper_args__ = {"version_id_col": version}
+
+
+class TimelineSnapshot(Base):
+    """プロジェクトの日次タイムライン（その日の終わり時点の加重平均）"""
+    __tablename__ = "timeline_snapshots"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(String, primary_key=True)  # "2024-11-08"形式
+    weighted_average = Column(Float, nullable=False)
+
+
+class SchemaVersion(Base):
+    """適用済みのスキーマのバージョン（migrate_db.py・起動時の確認で使う）"""
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    applied_at = Column(UTCDateTime, nullable=False, default=utcnow)
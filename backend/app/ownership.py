@@ -0,0 +1,80 @@
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+from typing import Dict, Hashable
+
+from . import models
+
+# 確認済みの所有権を保持するSession.infoのキー
+OWNERSHIP_INFO_KEY = "verified_ownership"
+
+
+def _verified(db: Session) -> Dict[Hashable, object]:
+    """
+    このリクエストで確認済みの (種類, ID, ユーザーID) -> オブジェクト
+
+    セッションはリクエストごとに作られるため、保持するのはそのリクエストの間だけ
+    （非同期モードのAsyncSession.infoも同じ辞書を返す）。
+    """
+    return db.info.setdefault(OWNERSHIP_INFO_KEY, {})
+
+
+def remember_project(db: Session, project: models.Project, user_id: int):
+    """所有権を確認したプロジェクトを記録する（同じリクエストで再び確認しない）"""
+    _verified(db)[("project", project.id, user_id)] = project
+
+
+def is_project_verified(db: Session, project_id: int, user_id: int) -> bool:
+    """このリクエストでプロジェクトの所有権を確認済みか"""
+    return ("project", project_id, user_id) in _verified(db)
+
+
+def verify_project_ownership(project_id: int, user_id: int, db: Session) -> models.Project:
+    """
+    プロジェクトの所有権を確認する
+
+    存在しなければ404、他のユーザーのプロジェクトなら403。確認済みならSQLを実行しない。
+    """
+    project = _verified(db).get(("project", project_id, user_id))
+    if project is not None:
+        return project
+
+    project = db.get(models.Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if project.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="このプロジェクトにアクセスする権限がありません"
+        )
+    remember_project(db, project, user_id)
+    return project
+
+
+def verify_member_ownership(member_id: int, user_id: int, db: Session) -> models.Member:
+    """
+    メンバーの所有権を確認する（プロジェクト経由）
+
+    メンバーとプロジェクトを1回のクエリ（JOIN）で取得する。存在しなければ404、
+    他のユーザーのプロジェクトのメンバーなら403。プロジェクトの所有権も確認済みとして記録する。
+    """
+    verified = _verified(db)
+    member = verified.get(("member", member_id, user_id))
+    if member is not None:
+        return member
+
+    row = db.query(models.Member, models.Project)\
+        .outerjoin(models.Project, models.Project.id == models.Member.project_id)\
+        .filter(models.Member.id == member_id)\
+        .first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Member not found")
+
+    member, project = row
+    if project is None or project.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="このメンバーにアクセスする権限がありません"
+        )
+    verified[("member", member_id, user_id)] = member
+    remember_project(db, project, user_id)
+    return member
@@ -0,0 +1,69 @@
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+import base64
+import json
+
+from .timestamps import as_utc
+
+# 1ページあたりの件数（limitの既定値と上限）
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """(created_at, id) を不透明なカーソル文字列にする"""
+    raw = json.dumps([as_utc(created_at).isoformat(), id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """カーソル文字列を (created_at, id) に戻す（不正な場合は400）"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        if not isinstance(created_at, str) or not isinstance(id, int):
+            raise ValueError(cursor)
+        created_at = as_utc(datetime.fromisoformat(created_at))
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cursorが正しくありません"
+        )
+    return created_at, id
+
+
+def keyset_after(created_at_column, id_column, cursor: str):
+    """
+    カーソルより後ろ（新しい順で次のページ）の行を絞り込む条件
+
+    (created_at, id) の行値比較にすることで、複合インデックスの範囲スキャンになる。
+    """
+    created_at, id = decode_cursor(cursor)
+    return tuple_(created_at_column, id_column) < tuple_(created_at, id)
+
+
+def page_size(limit: Optional[int], cursor: Optional[str]) -> Optional[int]:
+    """
+    1ページの件数を決める
+
+    limit・cursorのどちらも指定がない場合はNone（全件を返す。ページ分割を導入する前のクライアント向け）。
+    cursorだけの場合は DEFAULT_PAGE_SIZE。
+    """
+    if limit is None and cursor is None:
+        return None
+    return limit if limit is not None else DEFAULT_PAGE_SIZE
+
+
+def build_page(rows: List[Any], limit: Optional[int]) -> Tuple[List[Any], Optional[str]]:
+    """
+    limit + 1件取得した行を1ページ分と次のページのカーソルに分ける
+
+    最後のページ（limitがNoneで全件を取得した場合も）の場合、カーソルはNone。
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
@@ -0,0 +1,42 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable
+from . import models
+
+
+def get_latest_scores(db: Session, project_ids: Iterable[int]) -> Dict[int, models.Score]:
+    """
+    プロジェクトに所属する全メンバーの最新スコアを1回のクエリで取得する
+
+    戻り値は member_id -> 最新のScore。スコアのないメンバーは含まれない。
+    PostgreSQLではDISTINCT ON、それ以外（SQLite）ではROW_NUMBER()ウィンドウ関数を使う。
+    """
+    project_ids = list(project_ids)
+    if not project_ids:
+        return {}
+
+    if db.get_bind().dialect.name == "postgresql":
+        latest_scores = db.query(models.Score)\
+            .join(models.Member, models.Member.id == models.Score.member_id)\
+            .filter(models.Member.project_id.in_(project_ids))\
+            .distinct(models.Score.member_id)\
+            .order_by(models.Score.member_id, models.Score.created_at.desc(), models.Score.id.desc())\
+            .all()
+    else:
+        ranked = db.query(
+            models.Score.id.label("score_id"),
+            func.row_number().over(
+                partition_by=models.Score.member_id,
+                order_by=(models.Score.created_at.desc(), models.Score.id.desc())
+            ).label("row_number")
+        )\
+            .join(models.Member, models.Member.id == models.Score.member_id)\
+            .filter(models.Member.project_id.in_(project_ids))\
+            .subquery()
+
+        latest_scores = db.query(models.Score)\
+            .join(ranked, ranked.c.score_id == models.Score.id)\
+            .filter(ranked.c.row_number == 1)\
+            .all()
+
+    return {score.member_id: score for score in latest_scores}
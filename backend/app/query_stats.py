@@ -0,0 +1,143 @@
+from contextvars import ContextVar
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from typing import Dict, List, Optional
+import heapq
+import logging
+import os
+import time
+
+# リクエストごとのSQLの計測（Server-Timingヘッダー・ログ）を行うか
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "true").lower() == "true"
+# この時間（ミリ秒）以上かかったリクエストは、遅いSQLと一緒に警告として記録する
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+# 遅いリクエストで記録するSQLの数（遅い順）
+SLOW_QUERY_LOG_LIMIT = int(os.getenv("SLOW_QUERY_LOG_LIMIT", "5"))
+# ログに出すSQL文の最大文字数
+STATEMENT_LOG_LENGTH = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """
+    1リクエストで実行されたSQLの回数・合計時間
+
+    遅いSQLは上位 SLOW_QUERY_LOG_LIMIT 件だけ保持する（実行回数が多くてもメモリは一定）。
+    SQL文はパラメーターを含めない（個人情報をログに残さない）。
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self._slowest = []  # (秒, 実行順, SQL文) の最小ヒープ
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        item = (duration, self.count, statement)
+        if len(self._slowest) < SLOW_QUERY_LOG_LIMIT:
+            heapq.heappush(self._slowest, item)
+        elif self._slowest and duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def slowest(self) -> List[Dict]:
+        """遅いSQL（遅い順）"""
+        return [
+            {"ms": round(duration * 1000, 3), "statement": statement[:STATEMENT_LOG_LENGTH]}
+            for duration, _, statement in sorted(self._slowest, reverse=True)
+        ]
+
+    def server_timing(self, total: float) -> str:
+        """Server-Timingヘッダーの値（db: SQLの合計時間と回数、total: レスポンス開始までの時間）"""
+        return (
+            f'db;dur={self.duration * 1000:.1f};desc="queries={self.count}", '
+            f"total;dur={total * 1000:.1f}"
+        )
+
+
+# 処理中のリクエストの計測結果（リクエスト外の処理ではNone）
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_stats_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started = conn.info.pop("query_stats_started", None)
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def instrument_engine(engine):
+    """エンジンで実行されたSQLを処理中のリクエストの計測結果に記録する（AsyncEngineはsync_engineを渡す）"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """
+    リクエストごとにSQLの実行回数・DB時間を数え、Server-Timingヘッダーとログに出力する
+
+    ヘッダーはレスポンスの開始時点の値（ストリーミングの送信中に実行したSQLは含まない）、
+    ログはレスポンスの送信完了後の値。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        status_code = None
+        event_stream = False
+
+        async def send_with_timing(message):
+            nonlocal status_code, event_stream
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+                event_stream = headers.get("content-type", "").startswith("text/event-stream")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            _log_request(scope, status_code, stats, time.perf_counter() - started, event_stream)
+
+
+def _log_request(scope, status_code: Optional[int], stats: QueryStats, duration: float, event_stream: bool = False):
+    """
+    1リクエスト1行でログに出力する（遅いリクエストは遅いSQLを含めて警告にする）
+
+    Server-Sent Eventsは接続している間ずっと続くため、時間がかかっても遅いリクエストとしない。
+    """
+    slow = duration * 1000 >= SLOW_REQUEST_MS and not event_stream
+    if not logger.isEnabledFor(logging.WARNING if slow else logging.INFO):
+        return
+
+    fields = {
+        "event": "slow_request" if slow else "request",
+        "method": scope["method"],
+        "path": scope["path"],
+        "status": status_code,
+        "duration_ms": round(duration * 1000, 1),
+        "db_ms": round(stats.duration * 1000, 1),
+        "db_queries": stats.count
+    }
+    message = "%s %s %s (%.1fms, DB %.1fms / %d queries)"
+    args = (scope["method"], scope["path"], status_code, fields["duration_ms"], fields["db_ms"], stats.count)
+    if slow:
+        fields["slowest_queries"] = stats.slowest()
+        logger.warning(message, *args, extra=fields)
+    else:
+        logger.info(message, *args, extra=fields)
@@ -0,0 +1,26 @@
+from fastapi.responses import ORJSONResponse, Response
+from typing import Any, Mapping, Optional
+import orjson
+
+# アプリ全体の既定のレスポンス（標準のjsonより速いorjsonでエンコードする）
+DefaultResponse = ORJSONResponse
+
+
+def dump_json(payload: Any) -> bytes:
+    """
+    組み立て済みのレスポンスをJSONにエンコードする
+
+    payloadはそのままJSONにできる値（日時は to_api_timestamp で文字列にしたもの）にすること。
+    response_modelによる検証・変換を通さないため、スキーマと同じ形で組み立てる。
+    """
+    return orjson.dumps(payload)
+
+
+def json_body_response(body: bytes, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """エンコード済みのJSONをそのまま返すレスポンス（ダッシュボードのキャッシュ等）"""
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def prebuilt_json_response(payload: Any, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """組み立て済みのレスポンスを、response_modelの検証を通さずにJSONで返す"""
+    return json_body_response(dump_json(payload), headers)
@@ -0,0 +1,326 @@
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Callable, Dict, List, Optional, TypeVar
+import os
+import time
+from . import models
+from .models import ROLE_WEIGHTS
+from .queries import get_latest_scores
+from .timeline import rebuild_project_timelines, record_timeline_day, reflected_from
+
+# ドリフト検出の対象となる集計値
+ROLLUP_FIELDS = ("weighted_sum", "total_weight", "member_count", "last_updated")
+
+# 楽観的ロックが競合した場合のやり直し回数
+# （PostgreSQLは行ロック、SQLiteは BEGIN IMMEDIATE で直列化するため、通常は発生しない）
+ROLLUP_WRITE_ATTEMPTS = int(os.getenv("ROLLUP_WRITE_ATTEMPTS", "5"))
+# SQLiteで書き込みロックを待つ最大の秒数（超えた場合は503）
+ROLLUP_WRITE_TIMEOUT = float(os.getenv("ROLLUP_WRITE_TIMEOUT", "30"))
+
+T = TypeVar("T")
+
+
+def calculate_rollups(db: Session, project_ids: List[int]) -> Dict[int, Dict]:
+    """
+    scoresテーブルからプロジェクトごとの集計値を計算する
+
+    戻り値は project_id -> {集計値, "latest_scores": {member_id: Score}}
+    """
+    rollups = {
+        project_id: {
+            "weighted_sum": 0,
+            "total_weight": 0,
+            "member_count": 0,
+            "last_updated": None,
+            "latest_scores": {}
+        }
+        for project_id in project_ids
+    }
+    if not project_ids:
+        return rollups
+
+    members = db.query(models.Member.id, models.Member.project_id, models.Member.role)\
+        .filter(models.Member.project_id.in_(project_ids))\
+        .all()
+    latest_scores = get_latest_scores(db, project_ids)
+
+    for member_id, project_id, role in members:
+        rollup = rollups[project_id]
+        rollup["member_count"] += 1
+
+        latest_score = latest_scores.get(member_id)
+        if latest_score is None:
+            continue
+
+        weight = ROLE_WEIGHTS.get(role, 1)
+        rollup["weighted_sum"] += latest_score.score * weight
+        rollup["total_weight"] += weight
+        rollup["latest_scores"][member_id] = latest_score
+        if rollup["last_updated"] is None or latest_score.created_at > rollup["last_updated"]:
+            rollup["last_updated"] = latest_score.created_at
+
+    return rollups
+
+
+def _write_latest_scores(db: Session, project_id: int, latest_scores: Dict[int, models.Score]):
+    """プロジェクトのmember_latest_scoresを作り直す"""
+    db.query(models.MemberLatestScore)\
+        .filter(models.MemberLatestScore.project_id == project_id)\
+        .delete(synchronize_session=False)
+    for member_id, score in latest_scores.items():
+        db.add(models.MemberLatestScore(
+            member_id=member_id,
+            project_id=project_id,
+            score_id=score.id,
+            score=score.score,
+            comment=score.comment,
+            created_at=score.created_at
+        ))
+
+
+def get_project_rollup(db: Session, project_id: int, for_update: bool = False) -> models.ProjectRollup:
+    """
+    プロジェクトの集計値を主キーで取得する
+
+    for_update=Trueの場合は行ロック（SELECT ... FOR UPDATE）を取得する。
+    集計行がまだない場合はscoresから計算して作成する。
+    """
+    query = db.query(models.ProjectRollup).filter(models.ProjectRollup.project_id == project_id)
+    if for_update:
+        query = query.with_for_update()
+    rollup = query.first()
+    if rollup is not None:
+        return rollup
+
+    values = calculate_rollups(db, [project_id])[project_id]
+    try:
+        # 同じプロジェクトの集計行を別のリクエストが同時に作成した場合に備えてSAVEPOINTを使う
+        with db.begin_nested():
+            rollup = models.ProjectRollup(
+                project_id=project_id,
+                **{field: values[field] for field in ROLLUP_FIELDS}
+            )
+            db.add(rollup)
+            _write_latest_scores(db, project_id, values["latest_scores"])
+            rebuild_project_timelines(db, [project_id])
+    except IntegrityError:
+        rollup = query.populate_existing().one()
+
+    return rollup
+
+
+def read_project_rollup(db: Session, project_id: int) -> models.ProjectRollup:
+    """読み取り用に集計値を取得する（集計行がない場合は作成してコミットする）"""
+    rollup = db.get(models.ProjectRollup, project_id)
+    if rollup is None:
+        rollup = get_project_rollup(db, project_id)
+        db.commit()
+    return rollup
+
+
+def begin_write(db: Session):
+    """
+    SQLite: 書き込みトランザクションを BEGIN IMMEDIATE で始める
+
+    SQLiteには行ロック（FOR UPDATE）がないため、集計行を読む前にデータベースの書き込みロックを取り、
+    読み込みから書き込みまでを他の書き込み（別のプロセスを含む）と直列化する。
+    ロックは busy_timeout ごとに取り直し、ROLLUP_WRITE_TIMEOUT 秒待っても取れない場合は503を返す。
+    PostgreSQLでは何もしない（行ロックで直列化される）。
+    """
+    connection = db.connection()
+    if connection.dialect.name != "sqlite":
+        return
+    if connection.connection.driver_connection.in_transaction:
+        return
+
+    deadline = time.monotonic() + ROLLUP_WRITE_TIMEOUT
+    while True:
+        try:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            return
+        except OperationalError as e:
+            if "locked" not in str(e.orig):
+                raise
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="混雑しているため登録できませんでした。再度お試しください"
+                )
+
+
+def commit_rollup_write(db: Session, write: Callable[[], T]) -> T:
+    """
+    集計行を更新する書き込みを実行してコミットする
+
+    SQLiteでは書き込みロックを取ってから実行するため、同時の書き込みは待ち合わせて順に登録される。
+    それでも別のリクエストが同じ集計行を先に更新していた場合（StaleDataError）は
+    ロールバックして最初からやり直し、それでも競合する場合は409を返す。
+    """
+    for _ in range(ROLLUP_WRITE_ATTEMPTS):
+        try:
+            begin_write(db)
+            result = write()
+            db.commit()
+            return result
+        except StaleDataError:
+            db.rollback()
+
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="同時に更新されたため登録できませんでした。再度お試しください"
+    )
+
+
+def bump_rollup_version(rollup: models.ProjectRollup):
+    """
+    集計値が変わらない場合でもversionを進める
+
+    versionはダッシュボードのETag・キャッシュキーとして使うため、
+    プロジェクトのデータが書き換わったら必ず進める。
+    """
+    flag_modified(rollup, "last_updated")
+
+
+def apply_score(db: Session, rollup: models.ProjectRollup, member: models.Member, score: models.Score):
+    """登録されたスコアを集計値・メンバーの最新スコア・日次タイムラインに反映する"""
+    apply_scores(db, rollup, {member.id: member.role}, [score])
+
+
+def apply_scores(db: Session, rollup: models.ProjectRollup, member_roles: Dict[int, str], scores: List[models.Score]):
+    """
+    登録された複数のスコアをまとめて集計値・メンバーの最新スコア・日次タイムラインに反映する
+
+    member_rolesは member_id -> 役職。scoresは登録順（created_at, idの昇順）で渡すこと。
+    """
+    if not scores:
+        return
+    bump_rollup_version(rollup)
+
+    dates = {score.created_at.date().isoformat() for score in scores}
+    if rollup.last_updated is not None and min(score.created_at for score in scores) < rollup.last_updated:
+        # 過去の日付のスコアはそれ以降の日次タイムラインにも影響するため作り直す
+        rebuild_project_timelines(db, [rollup.project_id])
+        timeline_rebuilt = True
+    else:
+        timeline_rebuilt = False
+
+    # 対象メンバーの最新スコアを1回のクエリで取得
+    latest_by_member = {
+        latest.member_id: latest
+        for latest in db.query(models.MemberLatestScore)
+            .filter(models.MemberLatestScore.member_id.in_({score.member_id for score in scores}))
+    }
+
+    for score in scores:
+        latest = latest_by_member.get(score.member_id)
+        if latest is not None and latest.created_at > score.created_at:
+            # 既存の最新スコアより古いスコアは集計値に影響しない
+            continue
+
+        weight = ROLE_WEIGHTS.get(member_roles[score.member_id], 1)
+        if latest is None:
+            latest = models.MemberLatestScore(member_id=score.member_id, project_id=rollup.project_id)
+            db.add(latest)
+            latest_by_member[score.member_id] = latest
+            rollup.total_weight += weight
+        else:
+            rollup.weighted_sum -= latest.score * weight
+
+        rollup.weighted_sum += score.score * weight
+        latest.score_id = score.id
+        latest.score = score.score
+        latest.comment = score.comment
+        latest.created_at = score.created_at
+
+        if rollup.last_updated is None or score.created_at > rollup.last_updated:
+            rollup.last_updated = score.created_at
+
+    if timeline_rebuilt:
+        return
+    if len(dates) == 1 and all(reflected_from(score.created_at) == score.created_at.date() for score in scores):
+        # 最新のスコアだけの場合は、その日付のタイムラインだけを更新すればよい
+        # （23:59:59を過ぎたスコアはその日の値に含めないため、作り直す）
+        record_timeline_day(db, rollup, dates.pop())
+    else:
+        rebuild_project_timelines(db, [rollup.project_id])
+
+
+def apply_member(rollup: models.ProjectRollup, count: int = 1):
+    """追加されたメンバーを集計値に反映する"""
+    rollup.member_count += count
+
+
+def rollup_weighted_average(rollup: models.ProjectRollup) -> Optional[float]:
+    """集計値から加重平均を求める（メンバーがいない場合はNone）"""
+    if rollup.member_count == 0:
+        return None
+    if rollup.total_weight == 0:
+        return 0.0
+    return round(rollup.weighted_sum / rollup.total_weight, 1)
+
+
+def rebuild_rollups(db: Session, batch_size: int = 500, project_ids: Optional[List[int]] = None) -> List[Dict]:
+    """
+    全プロジェクト（project_idsを指定した場合はそのプロジェクトのみ）の集計値をscoresから再計算する
+
+    保存済みの値とずれていたプロジェクトの一覧（ドリフト）を返す。
+    コミットは呼び出し側で行う。
+    """
+    drifts = []
+    if project_ids is None:
+        project_ids = [project_id for (project_id,) in db.query(models.Project.id).order_by(models.Project.id)]
+
+    for start in range(0, len(project_ids), batch_size):
+        batch = project_ids[start:start + batch_size]
+        calculated = calculate_rollups(db, batch)
+        existing = {
+            rollup.project_id: rollup
+            for rollup in db.query(models.ProjectRollup)
+                .filter(models.ProjectRollup.project_id.in_(batch))
+                .with_for_update()
+        }
+        existing_latest = {project_id: {} for project_id in batch}
+        for project_id, member_id, score_id in db.query(
+            models.MemberLatestScore.project_id,
+            models.MemberLatestScore.member_id,
+            models.MemberLatestScore.score_id
+        ).filter(models.MemberLatestScore.project_id.in_(batch)):
+            existing_latest[project_id][member_id] = score_id
+
+        for project_id in batch:
+            values = calculated[project_id]
+            rollup = existing.get(project_id)
+            if rollup is None:
+                rollup = models.ProjectRollup(project_id=project_id)
+                db.add(rollup)
+            else:
+                changed = {
+                    field: {"stored": getattr(rollup, field), "actual": values[field]}
+                    for field in ROLLUP_FIELDS
+                    if getattr(rollup, field) != values[field]
+                }
+                actual_latest = {
+                    member_id: score.id for member_id, score in values["latest_scores"].items()
+                }
+                stored_latest = existing_latest[project_id]
+                stale_members = sorted(
+                    member_id for member_id in set(actual_latest) | set(stored_latest)
+                    if actual_latest.get(member_id) != stored_latest.get(member_id)
+                )
+                if changed or stale_members:
+                    drifts.append({
+                        "project_id": project_id,
+                        "fields": changed,
+                        "stale_members": stale_members
+                    })
+
+            for field in ROLLUP_FIELDS:
+                setattr(rollup, field, values[field])
+            _write_latest_scores(db, project_id, values["latest_scores"])
+
+        db.flush()
+
+    return drifts
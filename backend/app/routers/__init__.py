@@ -0,0 +1,4 @@
+# 同期版のルーター（main.py で DB_ASYNC に応じて aio と切り替える）
+from . import auth, dashboard, members, projects, scores
+
+__all__ = ["auth", "dashboard", "members", "projects", "scores"]
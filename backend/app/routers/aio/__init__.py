@@ -0,0 +1,5 @@
+# 非同期モード（DB_ASYNC=true）用のルーター
+# 各ルーターは同期版と同じパス・レスポンスを返し、DBアクセスにAsyncSessionを使う
+from . import auth, dashboard, members, projects, scores
+
+__all__ = ["auth", "dashboard", "members", "projects", "scores"]
@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import logging
+
+from ...database import get_async_db
+from ...models import User
+from ...schemas import UserCreate, UserLogin, UserResponse, Token
+from ...auth import (
+    create_access_token,
+    get_current_user_async,
+    password_needs_rehash,
+    CurrentUser
+)
+from ...hashing import hash_password_async, verify_password_async
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    """
+    ユーザー認証を行う
+
+    コストが変更されたハッシュは新しいコストで再ハッシュして保存する。
+    """
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+    if user is not None:
+        db.expunge(user)
+    # bcryptの計算中にDB接続を保持しないよう、トランザクションを終えておく
+    await db.rollback()
+    if not user:
+        return None
+    if not await verify_password_async(password, user.hashed_password):
+        return None
+
+    if password_needs_rehash(user.hashed_password):
+        new_hash = await hash_password_async(password)
+        await db.execute(update(User).where(User.id == user.id).values(hashed_password=new_hash))
+        await db.commit()
+    return user
+
+
+@router.post("/auth/register", response_model=Token, status_code=status.HTTP_201_CREATED)
+async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    新規ユーザー登録
+
+    パスワードのハッシュ化は専用ワーカーで実行する（混雑時は503）
+    """
+    # メールアドレスの重複チェック
+    existing_user = (await db.execute(select(User.id).where(User.email == user_data.email))).first()
+    # bcryptの計算中にDB接続を保持しないよう、トランザクションを終えておく
+    await db.rollback()
+    if existing_user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="このメールアドレスは既に登録されています"
+        )
+
+    # パスワードをハッシュ化してユーザーを作成
+    hashed_password = await hash_password_async(user_data.password)
+    new_user = User(
+        email=user_data.email,
+        hashed_password=hashed_password,
+        name=user_data.name
+    )
+
+    db.add(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    logger.info("ユーザーを登録しました", extra={"user_id": new_user.id})
+
+    # JWTトークンを生成して返す（subは文字列である必要がある）
+    access_token = create_access_token(data={"sub": str(new_user.id)})
+    return Token(access_token=access_token, token_type="bearer")
+
+
+@router.post("/auth/login", response_model=Token)
+async def login_user(login_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    """
+    ユーザーログイン
+
+    パスワードの検証は専用ワーカーで実行する（混雑時は503）
+    """
+    # 認証
+    user = await authenticate_user(db, login_data.email, login_data.password)
+    if not user:
+        # メールアドレスは個人情報のため記録しない
+        logger.info("ログインに失敗しました")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="メールアドレスまたはパスワードが間違っています",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # JWTトークンを生成して返す（subは文字列である必要がある）
+    access_token = create_access_token(data={"sub": str(user.id)})
+    return Token(access_token=access_token, token_type="bearer")
+
+
+@router.get("/auth/me", response_model=UserResponse)
+async def get_me(current_user: CurrentUser = Depends(get_current_user_async)):
+    """
+    現在のログインユーザー情報を取得
+    """
+    return current_user
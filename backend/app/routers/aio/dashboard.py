@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict
+from ... import schemas
+from ...database import get_async_db, AsyncSessionLocal
+from ...auth import CurrentUser, get_current_user_async
+from ...cache import dashboard_cache
+from ...responses import dump_json, json_body_response
+from ...rollups import read_project_rollup
+from ..dashboard import (
+    build_dashboard, build_overview, dashboard_cache_key, dashboard_stream_response, etag_matches,
+    load_dashboard_snapshot, timeline_params
+)
+from .members import verify_project_ownership
+
+router = APIRouter()
+
+
+@router.get("/dashboard/overview", response_model=schemas.DashboardOverviewResponse)
+async def get_dashboard_overview(
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """自分の全プロジェクトの加重平均・メンバー数・最終更新日時・30日間の推移を一覧で取得"""
+    return await db.run_sync(lambda session: build_overview(session, current_user.id))
+
+
+@router.get("/projects/{project_id}/dashboard", response_model=schemas.DashboardResponse)
+async def get_dashboard(
+    project_id: int,
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    timeline: Dict = Depends(timeline_params)
+):
+    """プロジェクトのダッシュボードデータを取得（タイムラインは granularity・from・to で集計単位と期間を指定できる）"""
+    # プロジェクトの存在確認と所有権チェック
+    project = await verify_project_ownership(project_id, current_user.id, db)
+
+    # 集計行のversionをETagとキャッシュキーに使う（同期版と同じ）
+    rollup = await db.run_sync(lambda session: read_project_rollup(session, project_id))
+    version = rollup.version
+    etag = f'"dashboard-{project_id}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    # 変更がなければスコアを集計せずに304を返す
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # キャッシュにはエンコード済みのJSONを保持する（同期版と同じ）
+    cache_key = dashboard_cache_key(project_id, timeline)
+    body = dashboard_cache.get(cache_key, version=version)
+    if body is None:
+        dashboard = await db.run_sync(lambda session: build_dashboard(session, project, rollup, **timeline))
+        body = dump_json(dashboard)
+        dashboard_cache.set(cache_key, body, version=version)
+
+    return json_body_response(body, headers)
+
+
+@router.get("/projects/{project_id}/dashboard/stream")
+async def stream_dashboard(
+    project_id: int,
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """ダッシュボードをServer-Sent Eventsで受け取る（同期版と同じ）"""
+    # プロジェクトの所有権チェック
+    await verify_project_ownership(project_id, current_user.id, db)
+    # ストリームの間はリクエストのセッション（DB接続）を持たない
+    await db.close()
+
+    async def load():
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(lambda sync_session: load_dashboard_snapshot(sync_session, project_id))
+
+    return dashboard_stream_response(project_id, load)
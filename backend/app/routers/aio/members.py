@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from ... import models, ownership, schemas
+from ...database import get_async_db, SessionLocal
+from ...auth import CurrentUser, get_current_user_async
+from ...imports import detect_format, import_members, open_stream
+from ...responses import prebuilt_json_response
+from ..members import add_member, list_members
+
+router = APIRouter()
+
+
+async def verify_project_ownership(project_id: int, user_id: int, db: AsyncSession) -> models.Project:
+    """プロジェクトの所有権を確認する（同期版と共通。確認済みならSQLを実行しない）"""
+    return await db.run_sync(lambda session: ownership.verify_project_ownership(project_id, user_id, session))
+
+
+@router.post("/projects/{project_id}/members", response_model=schemas.MemberResponse, status_code=201)
+async def create_member(
+    project_id: int,
+    member: schemas.MemberCreate,
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """プロジェクトにメンバーを追加"""
+    # プロジェクトの所有権チェック
+    await verify_project_ownership(project_id, current_user.id, db)
+
+    # 集計値の更新を含む登録処理は同期版と共通
+    return await db.run_sync(lambda session: add_member(session, project_id, member))
+
+
+@router.post("/projects/{project_id}/members:import", response_model=schemas.MemberImportResponse)
+async def import_project_members(
+    project_id: int,
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="csv または ndjson（省略時はContent-Typeから判定）"),
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """CSV / NDJSONのリクエストボディからメンバーを一括登録"""
+    # プロジェクトの所有権チェック
+    await verify_project_ownership(project_id, current_user.id, db)
+    await db.close()
+
+    file_format = format or detect_format(request.headers.get("content-type"))
+
+    def run():
+        # ボディを少しずつ読みながら登録するため、同期セッションでワーカースレッドから実行する
+        with SessionLocal() as session:
+            return import_members(session, project_id, open_stream(request.stream()), file_format)
+
+    return await run_in_threadpool(run)
+
+
+@router.get("/projects/{project_id}/members", response_model=schemas.MemberListResponse)
+async def get_members(
+    project_id: int,
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """プロジェクトのメンバー一覧を取得（最新スコア付き）"""
+    # プロジェクトの所有権チェック
+    await verify_project_ownership(project_id, current_user.id, db)
+
+    # 組み立てたレスポンスをそのままエンコードする（同期版と同じ）
+    members = await db.run_sync(lambda session: list_members(session, project_id))
+    return prebuilt_json_response(members)
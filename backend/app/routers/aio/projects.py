@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import logging
+from ... import models, schemas
+from ...database import get_async_db
+from ...auth import CurrentUser, get_current_user_async
+from ...pagination import MAX_PAGE_SIZE, build_page, keyset_after, page_size
+from .members import verify_project_ownership
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/projects", response_model=schemas.ProjectListResponse)
+async def get_projects(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="1ページの件数（limit・cursorとも省略時は全件）"),
+    cursor: Optional[str] = Query(None, description="前のページのnext_cursor"),
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """プロジェクト一覧を取得（自分のプロジェクトのみ、新しい順にページ分割）"""
+    query = select(models.Project).where(models.Project.user_id == current_user.id)
+    if cursor:
+        query = query.where(keyset_after(models.Project.created_at, models.Project.id, cursor))
+
+    query = query.order_by(models.Project.created_at.desc(), models.Project.id.desc())
+    size = page_size(limit, cursor)
+    if size is not None:
+        query = query.limit(size + 1)
+
+    result = await db.execute(query)
+    projects, next_cursor = build_page(result.scalars().all(), size)
+    return {"projects": projects, "next_cursor": next_cursor}
+
+
+@router.post("/projects", response_model=schemas.ProjectResponse, status_code=201)
+async def create_project(
+    project: schemas.ProjectCreate,
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """プロジェクトを作成"""
+    db_project = models.Project(
+        name=project.name,
+        document_url=project.document_url,
+        user_id=current_user.id
+    )
+    db.add(db_project)
+    await db.commit()
+    await db.refresh(db_project)
+    logger.info("プロジェクトを作成しました", extra={"project_id": db_project.id, "user_id": current_user.id})
+    return db_project
+
+
+@router.get("/projects/{project_id}", response_model=schemas.ProjectDetailResponse)
+async def get_project(
+    project_id: int,
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """プロジェクト詳細を取得（メンバー含む）"""
+    # プロジェクトの存在確認と所有権チェック
+    project = await verify_project_ownership(project_id, current_user.id, db)
+    # メンバーは確認後に読み込む（非同期では属性アクセスで遅延読み込みできないため、run_syncの中で読み込む）
+    await db.run_sync(lambda session: project.members)
+    return project
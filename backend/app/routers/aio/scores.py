@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from ... import models, ownership, schemas
+from ...database import get_async_db
+from ...auth import CurrentUser, get_current_user_async
+from ...pagination import MAX_PAGE_SIZE, build_page, keyset_after, page_size
+from ...responses import prebuilt_json_response
+from ..scores import SCORE_HISTORY_COLUMNS, add_score, add_scores, export_response, score_history
+from .members import verify_project_ownership
+
+router = APIRouter()
+
+
+async def verify_member_ownership(member_id: int, user_id: int, db: AsyncSession) -> models.Member:
+    """メンバーの所有権を確認する（同期版と共通。メンバーとプロジェクトを1回のクエリで取得する）"""
+    return await db.run_sync(lambda session: ownership.verify_member_ownership(member_id, user_id, session))
+
+
+@router.post("/members/{member_id}/scores", response_model=schemas.ScoreResponse, status_code=201)
+async def create_score(
+    member_id: int,
+    score: schemas.ScoreCreate,
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """メンバーのスコアを登録（履歴として追加）"""
+    # メンバーの所有権チェック
+    member = await verify_member_ownership(member_id, current_user.id, db)
+
+    # 集計値の更新を含む登録処理は同期版と共通
+    return await db.run_sync(lambda session: add_score(session, member, score))
+
+
+@router.post("/projects/{project_id}/scores:batch", response_model=schemas.ScoreBatchResponse)
+async def create_scores_batch(
+    project_id: int,
+    items: schemas.ScoreBatchCreate,
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """プロジェクトのメンバーのスコアを一括登録（メンバーごとの結果を返す）"""
+    # 所有権の確認・一括登録・集計値の更新は同期版と共通
+    return await db.run_sync(lambda session: add_scores(session, project_id, current_user.id, items))
+
+
+@router.get("/members/{member_id}/scores", response_model=schemas.ScoreHistoryResponse)
+async def get_scores(
+    member_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="1ページの件数（limit・cursorとも省略時は全件）"),
+    cursor: Optional[str] = Query(None, description="前のページのnext_cursor"),
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """メンバーのスコア履歴を取得（新しい順にページ分割）"""
+    # メンバーの所有権チェック
+    member = await verify_member_ownership(member_id, current_user.id, db)
+
+    # スコア履歴を取得（新しい順）
+    query = select(*SCORE_HISTORY_COLUMNS).where(models.Score.member_id == member_id)
+    if cursor:
+        query = query.where(keyset_after(models.Score.created_at, models.Score.id, cursor))
+
+    query = query.order_by(models.Score.created_at.desc(), models.Score.id.desc())
+    size = page_size(limit, cursor)
+    if size is not None:
+        query = query.limit(size + 1)
+
+    result = await db.execute(query)
+    scores, next_cursor = build_page(result.all(), size)
+    return prebuilt_json_response(score_history(member, scores, next_cursor))
+
+
+@router.get("/projects/{project_id}/scores/export")
+async def export_scores(
+    project_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson または csv"),
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """プロジェクトの全スコア履歴をメンバー名・役職付きでエクスポート（ストリーミング）"""
+    # プロジェクトの所有権チェック
+    await verify_project_ownership(project_id, current_user.id, db)
+
+    # 行の読み出しは同期版と共通（同期セッションでワーカースレッドから少しずつ送る）
+    return export_response(project_id, format)
@@ -1,26 +1,37 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+import logging
 
 from ..database import get_db
 from ..models import User
 from ..schemas import UserCreate, UserLogin, UserResponse, Token
 from ..auth import (
-    get_password_hash,
-    authenticate_user,
     create_access_token,
-    get_current_user
+    get_current_user,
+    CurrentUser
 )
+from ..hashing import authenticate_user, hash_password_async
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 @router.post("/auth/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
     """
     新規ユーザー登録
+
+    パスワードのハッシュ化は専用ワーカーで実行する（混雑時は503）
     """
     # メールアドレスの重複チェック
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    def find_existing_user():
+        existing_user = db.query(User.id).filter(User.email == user_data.email).first()
+        # bcryptの計算中にDB接続を保持しないよう、トランザクションを終えておく
+        db.rollback()
+        return existing_user
+
+    existing_user = await run_in_threadpool(find_existing_user)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -28,16 +39,20 @@ def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
     # パスワードをハッシュ化してユーザーを作成
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password_async(user_data.password)
     new_user = User(
         email=user_data.email,
         hashed_password=hashed_password,
         name=user_data.name
     )
 
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    def save_user():
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+
+    await run_in_threadpool(save_user)
+    logger.info("ユーザーを登録しました", extra={"user_id": new_user.id})
 
     # JWTトークンを生成して返す（subは文字列である必要がある）
     access_token = create_access_token(data={"sub": str(new_user.id)})
@@ -45,13 +60,17 @@ def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/auth/login", response_model=Token)
-def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
+async def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
     """
     ユーザーログイン
+
+    パスワードの検証は専用ワーカーで実行する（混雑時は503）
     """
     # 認証
-    user = authenticate_user(db, login_data.email, login_data.password)
+    user = await authenticate_user(db, login_data.email, login_data.password)
     if not user:
+        # メールアドレスは個人情報のため記録しない
+        logger.info("ログインに失敗しました")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="メールアドレスまたはパスワードが間違っています",
@@ -64,7 +83,7 @@ def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.get("/auth/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: CurrentUser = Depends(get_current_user)):
     """
     現在のログインユーザー情報を取得
     """
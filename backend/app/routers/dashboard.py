@@ -1,53 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Dict
-from datetime import datetime
-from collections import defaultdict
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import asyncio
+import logging
 from .. import models, schemas
-from ..database import get_db
-from ..auth import get_current_user
+from ..database import get_db, SessionLocal
+from ..auth import CurrentUser, get_current_user
+from ..cache import dashboard_cache
+from ..events import DASHBOARD_STREAM_HEARTBEAT, DASHBOARD_STREAM_RETRY_MS, RESYNC, dashboard_broker
+from ..models import ROLE_WEIGHTS
+from ..ownership import verify_project_ownership
+from ..queries import get_latest_scores
+from ..responses import dump_json, json_body_response
+from ..rollups import get_project_rollup, read_project_rollup, rollup_weighted_average
+from ..timeline import TIMELINE_GRANULARITIES, get_timeline, has_timeline, rebuild_project_timelines
+from ..timestamps import to_api_timestamp, utcnow
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# 役職の重み
-ROLE_WEIGHTS = {
-    "PL": 3,
-    "PM": 2,
-    "Member": 1
-}
+# 一覧（/dashboard/overview）の推移を比較する日数
+OVERVIEW_TREND_DAYS = 30
 
 
-def calculate_weighted_average(members_with_scores: List[Dict]) -> float:
-    """加重平均スコアを計算"""
-    weighted_sum = 0
-    total_weight = 0
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-MatchヘッダーがETagと一致するか判定する"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
 
-    for member in members_with_scores:
-        if member["latest_score"] is not None:
-            weight = ROLE_WEIGHTS.get(member["role"], 1)
-            weighted_sum += member["latest_score"] * weight
-            total_weight += weight
 
-    return round(weighted_sum / total_weight, 1) if total_weight > 0 else 0
-
-
-@router.get("/projects/{project_id}/dashboard", response_model=schemas.DashboardResponse)
-def get_dashboard(
-    project_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """プロジェクトのダッシュボードデータを取得"""
-    # プロジェクトの存在確認と所有権チェック
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    if project.user_id != current_user.id:
+def timeline_params(
+    granularity: str = Query("day", pattern=f"^({'|'.join(TIMELINE_GRANULARITIES)})$",
+                             description="タイムラインの集計単位（day / week / month）"),
+    date_from: Optional[date] = Query(None, alias="from", description="タイムラインの開始日（YYYY-MM-DD、この日を含む）"),
+    date_to: Optional[date] = Query(None, alias="to", description="タイムラインの終了日（YYYY-MM-DD、この日を含む）")
+) -> Dict:
+    """タイムラインの集計単位と期間（クエリパラメーター）"""
+    if date_from is not None and date_to is not None and date_from > date_to:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="このプロジェクトにアクセスする権限がありません"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="fromにはto以前の日付を指定してください"
         )
+    return {"granularity": granularity, "date_from": date_from, "date_to": date_to}
+
+
+def dashboard_cache_key(project_id: int, timeline: Dict) -> Hashable:
+    """
+    ダッシュボードのキャッシュキー
+
+    既定の表示（日次・全期間）はproject_id（スコア・メンバーの登録でinvalidateされる）。
+    それ以外は条件ごとに保持し、集計行のversionが変わると使われなくなる。
+    """
+    if timeline["granularity"] == "day" and timeline["date_from"] is None and timeline["date_to"] is None:
+        return project_id
+    return (project_id, timeline["granularity"], timeline["date_from"], timeline["date_to"])
+
+
+def build_dashboard(
+    db: Session,
+    project: models.Project,
+    rollup: models.ProjectRollup,
+    granularity: str = "day",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+) -> Dict:
+    """
+    ダッシュボードのレスポンスを組み立てる（タイムラインは指定した集計単位・期間）
+
+    日時はAPIの文字列にしておき、DashboardResponseと同じ形のままJSONにエンコードできるようにする。
+    """
+    project_id = project.id
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("ダッシュボードを集計します（キャッシュなし）", extra={"project_id": project_id, "version": rollup.version})
 
     # プロジェクト情報
     project_info = {
@@ -59,15 +89,13 @@ def get_dashboard(
     # メンバー一覧を取得
     members = db.query(models.Member).filter(models.Member.project_id == project_id).all()
 
-    # 各メンバーの最新スコアを取得
+    # 各メンバーの最新スコアを一括取得
+    latest_scores = get_latest_scores(db, [project_id])
+
     members_summary = []
-    last_updated = None
 
     for member in members:
-        latest_score = db.query(models.Score)\
-            .filter(models.Score.member_id == member.id)\
-            .order_by(models.Score.created_at.desc())\
-            .first()
+        latest_score = latest_scores.get(member.id)
 
         members_summary.append({
             "id": member.id,
@@ -76,73 +104,253 @@ def get_dashboard(
             "weight": ROLE_WEIGHTS.get(member.role, 1),
             "latest_score": latest_score.score if latest_score else None,
             "latest_comment": latest_score.comment if latest_score else None,
-            "latest_score_at": latest_score.created_at if latest_score else None
+            "latest_score_at": to_api_timestamp(latest_score.created_at) if latest_score else None
         })
 
-        # 最終更新日時を取得
-        if latest_score and (last_updated is None or latest_score.created_at > last_updated):
-            last_updated = latest_score.created_at
-
-    # 加重平均スコアを計算
-    weighted_average = calculate_weighted_average(members_summary)
-
-    # タイムラインの生成（日付ごとの加重平均）
-    timeline = []
-
-    # 全てのスコアを取得（プロジェクトのメンバーのスコア）
-    member_ids = [m.id for m in members]
-    if member_ids:
-        all_scores = db.query(models.Score)\
-            .filter(models.Score.member_id.in_(member_ids))\
-            .order_by(models.Score.created_at.asc())\
-            .all()
-
-        # 日付ごとにグループ化
-        scores_by_date = defaultdict(list)
-        for score in all_scores:
-            # ISO形式の日付から日付部分のみを抽出
-            date_str = score.created_at[:10]  # "2024-11-08"
-            scores_by_date[date_str].append(score)
-
-        # 各日付での最新スコアで加重平均を計算
-        for date_str in sorted(scores_by_date.keys()):
-            # その日付までの各メンバーの最新スコアを取得
-            member_scores_at_date = {}
-            for member in members:
-                # その日付までのスコアを取得
-                scores_until_date = db.query(models.Score)\
-                    .filter(
-                        models.Score.member_id == member.id,
-                        models.Score.created_at <= date_str + "T23:59:59"
-                    )\
-                    .order_by(models.Score.created_at.desc())\
-                    .first()
-
-                if scores_until_date:
-                    member_scores_at_date[member.id] = {
-                        "role": member.role,
-                        "latest_score": scores_until_date.score
-                    }
-
-            # その日付での加重平均を計算
-            if member_scores_at_date:
-                weighted_sum = 0
-                total_weight = 0
-                for member_id, data in member_scores_at_date.items():
-                    weight = ROLE_WEIGHTS.get(data["role"], 1)
-                    weighted_sum += data["latest_score"] * weight
-                    total_weight += weight
-
-                avg = round(weighted_sum / total_weight, 1) if total_weight > 0 else 0
-                timeline.append({
-                    "date": date_str,
-                    "weighted_average": avg
-                })
+    # タイムラインは保存済みの日次スナップショットを読むだけ（週・月はデータベースで集計単位ごとに1行にする）
+    timeline = get_timeline(db, project_id, granularity, date_from, date_to)
+    if not timeline and rollup.total_weight > 0 and not has_timeline(db, project_id):
+        # スナップショット導入前のプロジェクトはここで作成する
+        rebuild_project_timelines(db, [project_id])
+        db.commit()
+        timeline = get_timeline(db, project_id, granularity, date_from, date_to)
 
     return {
         "project": project_info,
-        "weighted_average": weighted_average if members_summary else None,
-        "last_updated": last_updated,
+        "weighted_average": rollup_weighted_average(rollup),
+        "last_updated": to_api_timestamp(rollup.last_updated),
         "members_summary": members_summary,
         "timeline": timeline
     }
+
+
+def query_overview(db: Session, user_id: int) -> List:
+    """
+    ユーザーの全プロジェクトの集計値を1回のクエリで取得する
+
+    メンバーごとの最新スコア（member_latest_scores）を役職の重み（ROLE_WEIGHTS）を付けて
+    プロジェクトごとに集計し、OVERVIEW_TREND_DAYS 日前の日次タイムラインと一緒に返す。
+    """
+    latest = models.MemberLatestScore
+    snapshot = models.TimelineSnapshot
+    weight = case(ROLE_WEIGHTS, value=models.Member.role, else_=1)
+
+    aggregates = db.query(
+        models.Member.project_id.label("project_id"),
+        func.count(models.Member.id).label("member_count"),
+        func.sum(weight * latest.score).label("weighted_sum"),
+        func.sum(case((latest.member_id.isnot(None), weight), else_=0)).label("total_weight"),
+        func.max(latest.created_at).label("last_updated")
+    )\
+        .join(models.Project, models.Project.id == models.Member.project_id)\
+        .outerjoin(latest, latest.member_id == models.Member.id)\
+        .filter(models.Project.user_id == user_id)\
+        .group_by(models.Member.project_id)\
+        .subquery()
+
+    # 比較の基準: 期間の初日以前の最後のスナップショット（なければ期間内の最初のスナップショット）
+    since = (utcnow().date() - timedelta(days=OVERVIEW_TREND_DAYS)).isoformat()
+    baseline_before = db.query(snapshot.weighted_average)\
+        .filter(snapshot.project_id == models.Project.id, snapshot.date <= since)\
+        .order_by(snapshot.date.desc())\
+        .limit(1)\
+        .scalar_subquery()
+    baseline_after = db.query(snapshot.weighted_average)\
+        .filter(snapshot.project_id == models.Project.id, snapshot.date > since)\
+        .order_by(snapshot.date.asc())\
+        .limit(1)\
+        .scalar_subquery()
+
+    return db.query(
+        models.Project.id,
+        models.Project.name,
+        models.Project.document_url,
+        func.coalesce(aggregates.c.member_count, 0).label("member_count"),
+        func.coalesce(aggregates.c.weighted_sum, 0).label("weighted_sum"),
+        func.coalesce(aggregates.c.total_weight, 0).label("total_weight"),
+        aggregates.c.last_updated,
+        models.ProjectRollup.project_id.label("rollup_project_id"),
+        func.coalesce(baseline_before, baseline_after).label("baseline")
+    )\
+        .outerjoin(aggregates, aggregates.c.project_id == models.Project.id)\
+        .outerjoin(models.ProjectRollup, models.ProjectRollup.project_id == models.Project.id)\
+        .filter(models.Project.user_id == user_id)\
+        .order_by(models.Project.created_at.desc(), models.Project.id.desc())\
+        .all()
+
+
+def build_overview(db: Session, user_id: int) -> Dict:
+    """全プロジェクトの加重平均・メンバー数・最終更新日時・30日間の推移を組み立てる"""
+    rows = query_overview(db, user_id)
+
+    # 集計テーブル導入前のプロジェクトは最新スコアがないため、ここで作成して集計し直す
+    missing = [row.id for row in rows if row.rollup_project_id is None and row.member_count > 0]
+    if missing:
+        for project_id in missing:
+            get_project_rollup(db, project_id)
+        db.commit()
+        rows = query_overview(db, user_id)
+
+    projects = []
+    for row in rows:
+        weighted_average = rollup_weighted_average(row)
+        trend = None
+        if weighted_average is not None and row.total_weight > 0 and row.baseline is not None:
+            trend = round(weighted_average - row.baseline, 1)
+        projects.append({
+            "id": row.id,
+            "name": row.name,
+            "document_url": row.document_url,
+            "weighted_average": weighted_average,
+            "member_count": row.member_count,
+            "last_updated": row.last_updated,
+            "trend_30d": trend
+        })
+    return {"projects": projects}
+
+
+@router.get("/dashboard/overview", response_model=schemas.DashboardOverviewResponse)
+def get_dashboard_overview(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """自分の全プロジェクトの加重平均・メンバー数・最終更新日時・30日間の推移を一覧で取得"""
+    return build_overview(db, current_user.id)
+
+
+@router.get("/projects/{project_id}/dashboard", response_model=schemas.DashboardResponse)
+def get_dashboard(
+    project_id: int,
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    timeline: Dict = Depends(timeline_params)
+):
+    """プロジェクトのダッシュボードデータを取得（タイムラインは granularity・from・to で集計単位と期間を指定できる）"""
+    # プロジェクトの存在確認と所有権チェック
+    project = verify_project_ownership(project_id, current_user.id, db)
+
+    # 加重平均スコアと最終更新日時は集計テーブルから主キーで取得
+    # versionはスコア・メンバーの登録で必ず進むため、ETagとキャッシュキーに使う
+    rollup = read_project_rollup(db, project_id)
+    version = rollup.version
+    etag = f'"dashboard-{project_id}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    # 変更がなければスコアを集計せずに304を返す
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # キャッシュにはエンコード済みのJSONを保持する（ヒット時は検証もエンコードもしない）
+    cache_key = dashboard_cache_key(project_id, timeline)
+    body = dashboard_cache.get(cache_key, version=version)
+    if body is None:
+        body = dump_json(build_dashboard(db, project, rollup, **timeline))
+        dashboard_cache.set(cache_key, body, version=version)
+
+    return json_body_response(body, headers)
+
+
+def load_dashboard_snapshot(db: Session, project_id: int) -> Optional[Tuple[int, bytes]]:
+    """ストリームで送るダッシュボード（既定の表示、エンコード済み）と集計行のversionを返す（プロジェクトが削除されていればNone）"""
+    project = db.get(models.Project, project_id)
+    if project is None:
+        return None
+    rollup = read_project_rollup(db, project_id)
+    version = rollup.version
+    body = dashboard_cache.get(project_id, version=version)
+    if body is None:
+        body = dump_json(build_dashboard(db, project, rollup))
+        dashboard_cache.set(project_id, body, version=version)
+    return version, body
+
+
+def sse_event(name: str, data: str, event_id: int) -> str:
+    """Server-Sent Eventsの1イベント"""
+    return f"id: {event_id}\nevent: {name}\ndata: {data}\n\n"
+
+
+async def iter_dashboard_stream(
+    project_id: int,
+    load_snapshot: Callable[[], Awaitable[Optional[Tuple[int, bytes]]]]
+) -> AsyncIterator[str]:
+    """
+    ダッシュボードのスナップショットを送り、その後は変更の差分を送り続ける
+
+    購読を始めてからスナップショットを読むため、その間の変更も取りこぼさない
+    （スナップショットに含まれる変更の差分はversionで判定して送らない）。
+    待っている間はDB接続を持たず、HEARTBEAT秒ごとにコメントを送って接続を維持する。
+    """
+    subscription = dashboard_broker.subscribe(project_id)
+    try:
+        yield f"retry: {DASHBOARD_STREAM_RETRY_MS}\n\n"
+        snapshot_version = version = None
+        resync = True
+        while True:
+            if resync:
+                resync = False
+                snapshot = await load_snapshot()
+                if snapshot is None:
+                    return
+                snapshot_version = version = snapshot[0]
+                yield sse_event("snapshot", snapshot[1].decode(), version)
+
+            try:
+                event_version, name, data = await asyncio.wait_for(
+                    subscription.queue.get(), DASHBOARD_STREAM_HEARTBEAT
+                )
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+
+            if name == RESYNC:
+                resync = True
+            elif event_version <= snapshot_version:
+                # スナップショットに含まれている変更
+                continue
+            elif event_version <= version:
+                # 同時に登録された変更の配信が前後した場合は、スナップショットを送り直す
+                resync = True
+            else:
+                version = event_version
+                yield sse_event(name, data, version)
+    finally:
+        dashboard_broker.unsubscribe(subscription)
+
+
+def dashboard_stream_response(
+    project_id: int,
+    load_snapshot: Callable[[], Awaitable[Optional[Tuple[int, bytes]]]]
+) -> StreamingResponse:
+    """ダッシュボードのストリーム（text/event-stream）のレスポンス"""
+    logger.info("ダッシュボードのストリームを開始します", extra={"project_id": project_id})
+    return StreamingResponse(
+        iter_dashboard_stream(project_id, load_snapshot),
+        media_type="text/event-stream",
+        # プロキシ（nginx等）でバッファリング・キャッシュさせない
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/projects/{project_id}/dashboard/stream")
+async def stream_dashboard(
+    project_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    ダッシュボードをServer-Sent Eventsで受け取る
+
+    最初にsnapshot（GET /dashboardと同じ内容）、その後はスコア・メンバーの登録ごとにdelta
+    （加重平均・最終更新日時・変更があったメンバー・その日のタイムライン）を送る。
+    """
+    # プロジェクトの所有権チェック（DBアクセスはワーカースレッドで行う）
+    await run_in_threadpool(verify_project_ownership, project_id, current_user.id, db)
+    # ストリームの間はリクエストのセッション（DB接続）を持たない
+    await run_in_threadpool(db.close)
+
+    def load():
+        with SessionLocal() as session:
+            return load_dashboard_snapshot(session, project_id)
+
+    return dashboard_stream_response(project_id, lambda: run_in_threadpool(load))
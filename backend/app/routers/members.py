@@ -1,71 +1,104 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+import logging
 from .. import models, schemas
 from ..database import get_db
-from ..auth import get_current_user
+from ..auth import CurrentUser, get_current_user
+from ..cache import dashboard_cache
+from ..events import publish_member
+from ..imports import detect_format, import_members, open_stream
+from ..ownership import verify_project_ownership
+from ..queries import get_latest_scores
+from ..responses import prebuilt_json_response
+from ..rollups import get_project_rollup, apply_member, commit_rollup_write
+from ..timestamps import to_api_timestamp
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
-def verify_project_ownership(project_id: int, user_id: int, db: Session):
-    """プロジェクトの所有権を確認する"""
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    if project.user_id != user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="このプロジェクトにアクセスする権限がありません"
+def add_member(db: Session, project_id: int, member: schemas.MemberCreate) -> models.Member:
+    """メンバーを追加し、プロジェクトの集計値を同じトランザクションで更新する"""
+    def write():
+        # 同じプロジェクトへの同時登録に備えて集計行をロック
+        rollup = get_project_rollup(db, project_id, for_update=True)
+
+        # メンバーの作成
+        db_member = models.Member(
+            project_id=project_id,
+            name=member.name,
+            role=member.role,
+            email=member.email
         )
-    return project
+        db.add(db_member)
+        apply_member(rollup)
+        return db_member
+
+    db_member = commit_rollup_write(db, write)
+
+    # このプロセスのダッシュボードキャッシュを破棄（他のプロセスはversionの不一致で検出する）
+    dashboard_cache.invalidate(project_id)
+    db.refresh(db_member)
+    # ダッシュボードのストリームに差分を配信（購読がなければ何もしない）
+    publish_member(db, db_member)
+    logger.info("メンバーを追加しました", extra={"project_id": project_id, "member_id": db_member.id})
+    return db_member
 
 
 @router.post("/projects/{project_id}/members", response_model=schemas.MemberResponse, status_code=201)
 def create_member(
     project_id: int,
     member: schemas.MemberCreate,
-    current_user: models.User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """プロジェクトにメンバーを追加"""
     # プロジェクトの所有権チェック
     verify_project_ownership(project_id, current_user.id, db)
 
-    # メンバーの作成
-    db_member = models.Member(
-        project_id=project_id,
-        name=member.name,
-        role=member.role,
-        email=member.email
-    )
-    db.add(db_member)
-    db.commit()
-    db.refresh(db_member)
-    return db_member
+    return add_member(db, project_id, member)
 
 
-@router.get("/projects/{project_id}/members", response_model=schemas.MemberListResponse)
-def get_members(
+@router.post("/projects/{project_id}/members:import", response_model=schemas.MemberImportResponse)
+async def import_project_members(
     project_id: int,
-    current_user: models.User = Depends(get_current_user),
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="csv または ndjson（省略時はContent-Typeから判定）"),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """プロジェクトのメンバー一覧を取得（最新スコア付き）"""
-    # プロジェクトの所有権チェック
-    verify_project_ownership(project_id, current_user.id, db)
+    """
+    CSV / NDJSONのリクエストボディからメンバーを一括登録
+
+    ボディは1行ずつ読み込み、一定の行数ごとにまとめて登録する。不正な行は行番号付きのエラーとして返す。
+    """
+    file_format = format or detect_format(request.headers.get("content-type"))
+
+    def run():
+        # プロジェクトの所有権チェック
+        verify_project_ownership(project_id, current_user.id, db)
+        return import_members(db, project_id, open_stream(request.stream()), file_format)
 
-    # メンバーを取得
-    members = db.query(models.Member).filter(models.Member.project_id == project_id).all()
+    # DBアクセスとCSVの解析はワーカースレッドで行う
+    return await run_in_threadpool(run)
+
+
+def list_members(db: Session, project_id: int) -> dict:
+    """メンバー一覧を最新スコア付きで組み立てる（MemberListResponseと同じ形。日時はAPIの文字列）"""
+    # メンバーを取得（レスポンスに使う列のみ）
+    members = db.query(models.Member.id, models.Member.name, models.Member.role, models.Member.email)\
+        .filter(models.Member.project_id == project_id)\
+        .all()
+
+    # 各メンバーの最新スコアを一括取得
+    latest_scores = get_latest_scores(db, [project_id])
 
-    # 各メンバーの最新スコアを取得
     result = []
     for member in members:
-        latest_score = db.query(models.Score)\
-            .filter(models.Score.member_id == member.id)\
-            .order_by(models.Score.created_at.desc())\
-            .first()
+        latest_score = latest_scores.get(member.id)
 
         result.append({
             "id": member.id,
@@ -73,7 +106,21 @@ def get_members(
             "role": member.role,
             "email": member.email,
             "latest_score": latest_score.score if latest_score else None,
-            "latest_score_at": latest_score.created_at if latest_score else None
+            "latest_score_at": to_api_timestamp(latest_score.created_at) if latest_score else None
         })
 
     return {"members": result}
+
+
+@router.get("/projects/{project_id}/members", response_model=schemas.MemberListResponse)
+def get_members(
+    project_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """プロジェクトのメンバー一覧を取得（最新スコア付き）"""
+    # プロジェクトの所有権チェック
+    verify_project_ownership(project_id, current_user.id, db)
+
+    # 組み立てたレスポンスをそのままエンコードする（メンバー数が多くても検証し直さない）
+    return prebuilt_json_response(list_members(db, project_id))
@@ -1,30 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+import logging
 from .. import models, schemas
 from ..database import get_db
-from ..auth import get_current_user
+from ..auth import CurrentUser, get_current_user
+from ..ownership import verify_project_ownership
+from ..pagination import MAX_PAGE_SIZE, build_page, keyset_after, page_size
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 @router.get("/projects", response_model=schemas.ProjectListResponse)
 def get_projects(
-    current_user: models.User = Depends(get_current_user),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="1ページの件数（limit・cursorとも省略時は全件）"),
+    cursor: Optional[str] = Query(None, description="前のページのnext_cursor"),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """プロジェクト一覧を取得（自分のプロジェクトのみ）"""
-    projects = db.query(models.Project)\
-        .filter(models.Project.user_id == current_user.id)\
-        .order_by(models.Project.created_at.desc())\
-        .all()
-    return {"projects": projects}
+    """プロジェクト一覧を取得（自分のプロジェクトのみ、新しい順にページ分割）"""
+    query = db.query(models.Project)\
+        .filter(models.Project.user_id == current_user.id)
+    if cursor:
+        query = query.filter(keyset_after(models.Project.created_at, models.Project.id, cursor))
+
+    query = query.order_by(models.Project.created_at.desc(), models.Project.id.desc())
+    size = page_size(limit, cursor)
+    if size is not None:
+        query = query.limit(size + 1)
+
+    projects, next_cursor = build_page(query.all(), size)
+    return {"projects": projects, "next_cursor": next_cursor}
 
 
 @router.post("/projects", response_model=schemas.ProjectResponse, status_code=201)
 def create_project(
     project: schemas.ProjectCreate,
-    current_user: models.User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """プロジェクトを作成"""
@@ -36,25 +49,16 @@ def create_project(
     db.add(db_project)
     db.commit()
     db.refresh(db_project)
+    logger.info("プロジェクトを作成しました", extra={"project_id": db_project.id, "user_id": current_user.id})
     return db_project
 
 
 @router.get("/projects/{project_id}", response_model=schemas.ProjectDetailResponse)
 def get_project(
     project_id: int,
-    current_user: models.User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """プロジェクト詳細を取得（メンバー含む）"""
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    # 所有権チェック
-    if project.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="このプロジェクトにアクセスする権限がありません"
-        )
-
-    return project
+    # プロジェクトの存在確認と所有権チェック
+    return verify_project_ownership(project_id, current_user.id, db)
@@ -1,72 +1,266 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, insert
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, Optional
+import logging
 from .. import models, schemas
 from ..database import get_db
-from ..auth import get_current_user
+from ..auth import CurrentUser, get_current_user
+from ..cache import dashboard_cache
+from ..events import publish_scores
+from ..exports import EXPORT_MEDIA_TYPES, iter_score_export
+from ..ownership import is_project_verified, remember_project, verify_member_ownership, verify_project_ownership
+from ..pagination import MAX_PAGE_SIZE, build_page, keyset_after, page_size
+from ..responses import prebuilt_json_response
+from ..timestamps import to_api_timestamp, utcnow
+from ..rollups import get_project_rollup, apply_score, apply_scores, commit_rollup_write
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
-def verify_member_ownership(member_id: int, user_id: int, db: Session):
-    """メンバーの所有権を確認する（プロジェクト経由）"""
-    member = db.query(models.Member).filter(models.Member.id == member_id).first()
-    if not member:
-        raise HTTPException(status_code=404, detail="Member not found")
+def add_score(db: Session, member: models.Member, score: schemas.ScoreCreate) -> models.Score:
+    """スコアを追加し、プロジェクトの集計値を同じトランザクションで更新する"""
+    project_id = member.project_id
+    member_id = member.id
 
-    project = db.query(models.Project).filter(models.Project.id == member.project_id).first()
-    if not project or project.user_id != user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="このメンバーにアクセスする権限がありません"
+    def write():
+        # 同じプロジェクトへの同時登録に備えて集計行をロック
+        rollup = get_project_rollup(db, project_id, for_update=True)
+
+        # スコアの作成
+        db_score = models.Score(
+            member_id=member_id,
+            score=score.score,
+            comment=score.comment
         )
-    return member
+        db.add(db_score)
+        db.flush()
+
+        # 集計値を同じトランザクションで更新
+        apply_score(db, rollup, member, db_score)
+        return db_score
+
+    db_score = commit_rollup_write(db, write)
+
+    # このプロセスのダッシュボードキャッシュを破棄（他のプロセスはversionの不一致で検出する）
+    dashboard_cache.invalidate(project_id)
+    db.refresh(db_score)
+    # ダッシュボードのストリームに差分を配信（購読がなければ何もしない）
+    publish_scores(db, project_id, [{
+        "member_id": member_id, "score": db_score.score, "comment": db_score.comment, "created_at": db_score.created_at
+    }])
+    # スコアの登録は件数が多いためDEBUG（無効な場合はextraも作らない）
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("スコアを登録しました", extra={"project_id": project_id, "member_id": member_id, "score_id": db_score.id})
+    return db_score
 
 
 @router.post("/members/{member_id}/scores", response_model=schemas.ScoreResponse, status_code=201)
 def create_score(
     member_id: int,
     score: schemas.ScoreCreate,
-    current_user: models.User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """メンバーのスコアを登録（履歴として追加）"""
     # メンバーの所有権チェック
-    verify_member_ownership(member_id, current_user.id, db)
+    member = verify_member_ownership(member_id, current_user.id, db)
+
+    return add_score(db, member, score)
+
+
+def verify_batch_ownership(project_id: int, member_ids: List[int], user_id: int, db: Session) -> Dict[int, str]:
+    """
+    プロジェクトの所有権と、メンバーがそのプロジェクトに所属しているかを1回のクエリで確認する
 
-    # スコアの作成
-    db_score = models.Score(
-        member_id=member_id,
-        score=score.score,
-        comment=score.comment
+    戻り値はプロジェクトに所属するメンバーの member_id -> 役職。
+    このリクエストでプロジェクトの所有権を確認済みなら、メンバーの所属のみ確認する。
+    """
+    if is_project_verified(db, project_id, user_id):
+        rows = db.query(models.Member.id, models.Member.role)\
+            .filter(models.Member.project_id == project_id, models.Member.id.in_(set(member_ids)))\
+            .all()
+        return {member_id: role for member_id, role in rows}
+
+    rows = db.query(models.Project, models.Member.id, models.Member.role)\
+        .outerjoin(models.Member, and_(
+            models.Member.project_id == models.Project.id,
+            models.Member.id.in_(set(member_ids))
+        ))\
+        .filter(models.Project.id == project_id)\
+        .all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Project not found")
+    project = rows[0][0]
+    if project.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="このプロジェクトにアクセスする権限がありません"
+        )
+    remember_project(db, project, user_id)
+    return {member_id: role for _, member_id, role in rows if member_id is not None}
+
+
+def add_scores(db: Session, project_id: int, user_id: int, items: List[schemas.ScoreBatchItem]) -> dict:
+    """
+    プロジェクトのメンバーのスコアをまとめて登録する
+
+    所有権の確認は1回、登録は1回のINSERT（executemany）で行い、集計値も同じトランザクションで更新する。
+    プロジェクトに所属しないメンバーの行は登録せず、結果に404として返す。
+    """
+    member_roles = verify_batch_ownership(project_id, [item.member_id for item in items], user_id, db)
+
+    # 同じ回の評価として、全ての行に同じ登録日時を付ける
+    created_at = utcnow()
+    rows = [
+        {
+            "member_id": item.member_id,
+            "score": item.score,
+            "comment": item.comment,
+            "created_at": created_at
+        }
+        for item in items
+        if item.member_id in member_roles
+    ]
+
+    def write():
+        # 同じプロジェクトへの同時登録に備えて集計行をロック
+        rollup = get_project_rollup(db, project_id, for_update=True)
+
+        # INSERT ... RETURNINGでまとめて登録する（sort_by_parameter_orderで返る行を入力順にそろえる。
+        # PostgreSQLは複数行で1回、RETURNINGの順序を保証できないSQLiteはSQLAlchemyが1行ずつ実行する）
+        db_scores = db.scalars(
+            insert(models.Score).returning(models.Score, sort_by_parameter_order=True),
+            rows
+        ).all()
+
+        # 集計値を同じトランザクションで更新
+        apply_scores(db, rollup, member_roles, db_scores)
+
+        # コミット後に再読み込みしないよう、レスポンス用の値を取り出しておく
+        return [
+            schemas.ScoreResponse.model_validate(db_score)
+            for db_score in db_scores
+        ]
+
+    created = []
+    if rows:
+        created = commit_rollup_write(db, write)
+        # このプロセスのダッシュボードキャッシュを破棄（他のプロセスはversionの不一致で検出する）
+        dashboard_cache.invalidate(project_id)
+        publish_scores(db, project_id, rows)
+
+    results = []
+    created_iter = iter(created)
+    for index, item in enumerate(items):
+        if item.member_id in member_roles:
+            results.append({"index": index, "member_id": item.member_id, "status": 201, "score": next(created_iter)})
+        else:
+            results.append({
+                "index": index,
+                "member_id": item.member_id,
+                "status": 404,
+                "detail": "このプロジェクトにメンバーが見つかりません"
+            })
+
+    logger.info(
+        "スコアを一括登録しました",
+        extra={"project_id": project_id, "scores_created": len(created), "scores_failed": len(items) - len(created)}
     )
-    db.add(db_score)
-    db.commit()
-    db.refresh(db_score)
-    return db_score
+    return {
+        "created": len(created),
+        "failed": len(items) - len(created),
+        "results": results
+    }
 
 
-@router.get("/members/{member_id}/scores", response_model=schemas.ScoreHistoryResponse)
-def get_scores(
-    member_id: int,
-    current_user: models.User = Depends(get_current_user),
+@router.post("/projects/{project_id}/scores:batch", response_model=schemas.ScoreBatchResponse)
+def create_scores_batch(
+    project_id: int,
+    items: schemas.ScoreBatchCreate,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """メンバーのスコア履歴を取得"""
-    # メンバーの所有権チェック
-    member = verify_member_ownership(member_id, current_user.id, db)
+    """プロジェクトのメンバーのスコアを一括登録（メンバーごとの結果を返す）"""
+    return add_scores(db, project_id, current_user.id, items)
 
-    # スコア履歴を取得（新しい順）
-    scores = db.query(models.Score)\
-        .filter(models.Score.member_id == member_id)\
-        .order_by(models.Score.created_at.desc())\
-        .all()
 
+# スコア履歴で取得する列（ORMのオブジェクトを作らずに、そのままレスポンスにする）
+SCORE_HISTORY_COLUMNS = (
+    models.Score.id, models.Score.member_id, models.Score.score, models.Score.comment, models.Score.created_at
+)
+
+
+def score_history(member: models.Member, scores: List, next_cursor: Optional[str]) -> Dict:
+    """スコア履歴のレスポンスを組み立てる（ScoreHistoryResponseと同じ形。日時はAPIの文字列）"""
     return {
         "member": {
             "id": member.id,
             "name": member.name,
             "role": member.role
         },
-        "scores": scores
+        "scores": [
+            {
+                "id": score.id,
+                "member_id": score.member_id,
+                "score": score.score,
+                "comment": score.comment,
+                "created_at": to_api_timestamp(score.created_at)
+            }
+            for score in scores
+        ],
+        "next_cursor": next_cursor
     }
+
+
+@router.get("/members/{member_id}/scores", response_model=schemas.ScoreHistoryResponse)
+def get_scores(
+    member_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="1ページの件数（limit・cursorとも省略時は全件）"),
+    cursor: Optional[str] = Query(None, description="前のページのnext_cursor"),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """メンバーのスコア履歴を取得（新しい順にページ分割）"""
+    # メンバーの所有権チェック
+    member = verify_member_ownership(member_id, current_user.id, db)
+
+    # スコア履歴を取得（新しい順）
+    query = db.query(*SCORE_HISTORY_COLUMNS)\
+        .filter(models.Score.member_id == member_id)
+    if cursor:
+        query = query.filter(keyset_after(models.Score.created_at, models.Score.id, cursor))
+
+    query = query.order_by(models.Score.created_at.desc(), models.Score.id.desc())
+    size = page_size(limit, cursor)
+    if size is not None:
+        query = query.limit(size + 1)
+
+    scores, next_cursor = build_page(query.all(), size)
+    return prebuilt_json_response(score_history(member, scores, next_cursor))
+
+
+def export_response(project_id: int, format: str) -> StreamingResponse:
+    """スコア履歴のエクスポートをストリーミングで返すレスポンス"""
+    logger.info("スコア履歴をエクスポートします", extra={"project_id": project_id, "format": format})
+    return StreamingResponse(
+        iter_score_export(project_id, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="project-{project_id}-scores.{format}"'}
+    )
+
+
+@router.get("/projects/{project_id}/scores/export")
+def export_scores(
+    project_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson または csv"),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """プロジェクトの全スコア履歴をメンバー名・役職付きでエクスポート（ストリーミング）"""
+    # プロジェクトの所有権チェック
+    verify_project_ownership(project_id, current_user.id, db)
+
+    return export_response(project_id, format)
@@ -1,7 +1,12 @@
-from pydantic import BaseModel, Field, field_validator, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, BeforeValidator, Field, field_validator, EmailStr
+from typing import Annotated, Optional, List
 from datetime import datetime
 
+from .timestamps import to_api_timestamp
+
+# DBの日時（UTC）をAPIの日時文字列（"2024-11-08T12:34:56.123456"形式）にする
+Timestamp = Annotated[str, BeforeValidator(to_api_timestamp)]
+
 # ========== User/Auth Schemas ==========
 
 class UserCreate(BaseModel):
@@ -32,6 +37,8 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     user_id: Optional[int] = None
+    # 有効期限（UNIX時刻、JWTのexp）
+    expires_at: Optional[float] = None
 
 # ========== Project Schemas ==========
 
@@ -44,7 +51,7 @@ class ProjectResponse(BaseModel):
     id: int
     name: str
     document_url: str
-    created_at: str
+    created_at: Timestamp
 
     class Config:
         from_attributes = True
@@ -52,6 +59,7 @@ class ProjectResponse(BaseModel):
 
 class ProjectListResponse(BaseModel):
     projects: List[ProjectResponse]
+    next_cursor: Optional[str] = None
 
 
 # ========== Member Schemas ==========
@@ -74,19 +82,33 @@ class MemberResponse(BaseModel):
     name: str
     role: str
     email: Optional[str]
-    created_at: str
+    created_at: Timestamp
 
     class Config:
         from_attributes = True
 
 
+class MemberImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class MemberImportResponse(BaseModel):
+    imported: int
+    failed: int
+    # 読み込めない行で中断した場合はTrue（importedは中断までに登録した行数）
+    aborted: bool = False
+    errors: List[MemberImportError]
+    errors_truncated: bool
+
+
 class MemberWithLatestScore(BaseModel):
     id: int
     name: str
     role: str
     email: Optional[str]
     latest_score: Optional[int] = None
-    latest_score_at: Optional[str] = None
+    latest_score_at: Optional[Timestamp] = None
 
 
 class MemberListResponse(BaseModel):
@@ -105,12 +127,36 @@ class ScoreResponse(BaseModel):
     member_id: int
     score: int
     comment: Optional[str]
-    created_at: str
+    created_at: Timestamp
 
     class Config:
         from_attributes = True
 
 
+class ScoreBatchItem(BaseModel):
+    member_id: int = Field(..., description="メンバーID")
+    score: int = Field(..., ge=0, le=100, description="スコア (0-100)")
+    comment: Optional[str] = Field(None, description="コメント（任意）")
+
+
+# 一括登録は1リクエストあたり1000件まで
+ScoreBatchCreate = Annotated[List[ScoreBatchItem], Field(min_length=1, max_length=1000)]
+
+
+class ScoreBatchResult(BaseModel):
+    index: int
+    member_id: int
+    status: int
+    score: Optional[ScoreResponse] = None
+    detail: Optional[str] = None
+
+
+class ScoreBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[ScoreBatchResult]
+
+
 class MemberInfo(BaseModel):
     id: int
     name: str
@@ -120,6 +166,7 @@ class MemberInfo(BaseModel):
 class ScoreHistoryResponse(BaseModel):
     member: MemberInfo
     scores: List[ScoreResponse]
+    next_cursor: Optional[str] = None
 
 
 # ========== Dashboard Schemas ==========
@@ -137,7 +184,7 @@ class MemberSummary(BaseModel):
     weight: int
     latest_score: Optional[int]
     latest_comment: Optional[str]
-    latest_score_at: Optional[str]
+    latest_score_at: Optional[Timestamp]
 
 
 class TimelinePoint(BaseModel):
@@ -148,18 +195,40 @@ class TimelinePoint(BaseModel):
 class DashboardResponse(BaseModel):
     project: ProjectInfo
     weighted_average: Optional[float]
-    last_updated: Optional[str]
+    last_updated: Optional[Timestamp]
     members_summary: List[MemberSummary]
     timeline: List[TimelinePoint]
 
 
+class DashboardDelta(BaseModel):
+    """ダッシュボードのストリーム（SSE）で送る差分（変更があったメンバーと、その日のタイムライン）"""
+    weighted_average: Optional[float]
+    last_updated: Optional[Timestamp]
+    members: List[MemberSummary]
+    timeline: List[TimelinePoint]
+
+
+class ProjectOverview(BaseModel):
+    id: int
+    name: str
+    document_url: str
+    weighted_average: Optional[float]
+    member_count: int
+    last_updated: Optional[Timestamp]
+    trend_30d: Optional[float] = Field(None, description="30日前からの加重平均の変化（ポイント）")
+
+
+class DashboardOverviewResponse(BaseModel):
+    projects: List[ProjectOverview]
+
+
 # ========== Project Detail Schema ==========
 
 class ProjectDetailResponse(BaseModel):
     id: int
     name: str
     document_url: str
-    created_at: str
+    created_at: Timestamp
     members: List[MemberResponse]
 
     class Config:
@@ -0,0 +1,192 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import Date, cast, func
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+from . import models
+from .models import ROLE_WEIGHTS
+
+# タイムラインの集計単位（week は月曜日始まり）
+TIMELINE_GRANULARITIES = ("day", "week", "month")
+
+
+def reflected_from(created_at: datetime) -> date:
+    """
+    スコアがタイムラインに反映され始める日付（UTC）
+
+    以前の文字列カラムでの比較（created_at <= "YYYY-MM-DDT23:59:59"）に合わせ、
+    23:59:59を過ぎた（小数秒のある）スコアは登録日ではなく翌日以降の値に反映する。
+    """
+    return (created_at + timedelta(microseconds=999999)).date()
+
+
+def build_timeline(members: List[models.Member], scores: List[models.Score]) -> List[Dict]:
+    """
+    日付ごとの加重平均タイムラインを生成する
+
+    scoresはcreated_atの昇順で渡すこと。スコアを1回走査しながら
+    各メンバーの最新スコアと加重合計を更新するため、計算量はO(スコア数)。
+    """
+    member_roles = {member.id: member.role for member in members}
+
+    # スコアが存在する日付（UTC）
+    dates = sorted({score.created_at.date() for score in scores})
+
+    latest_by_member = {}  # member_id -> その時点での最新スコア
+    weighted_sum = 0
+    total_weight = 0
+    timeline = []
+    index = 0
+
+    for day in dates:
+        # その日付の23:59:59までに登録されたスコアを反映
+        while index < len(scores) and reflected_from(scores[index].created_at) <= day:
+            score = scores[index]
+            index += 1
+            weight = ROLE_WEIGHTS.get(member_roles[score.member_id], 1)
+            previous = latest_by_member.get(score.member_id)
+            if previous is None:
+                total_weight += weight
+            else:
+                weighted_sum -= previous * weight
+            weighted_sum += score.score * weight
+            latest_by_member[score.member_id] = score.score
+
+        # その日付での加重平均を計算
+        if total_weight > 0:
+            timeline.append({
+                "date": day.isoformat(),
+                "weighted_average": round(weighted_sum / total_weight, 1)
+            })
+
+    return timeline
+
+
+def rebuild_project_timelines(db: Session, project_ids: List[int]) -> int:
+    """
+    プロジェクトの日次タイムラインをscoresから作り直す
+
+    書き込んだ行数を返す。コミットは呼び出し側で行う。
+    """
+    if not project_ids:
+        return 0
+
+    members_by_project = {project_id: [] for project_id in project_ids}
+    for member in db.query(models.Member.id, models.Member.project_id, models.Member.role)\
+            .filter(models.Member.project_id.in_(project_ids)):
+        members_by_project[member.project_id].append(member)
+
+    scores_by_project = {project_id: [] for project_id in project_ids}
+    scores = db.query(models.Score.member_id, models.Score.score, models.Score.created_at, models.Member.project_id)\
+        .join(models.Member, models.Member.id == models.Score.member_id)\
+        .filter(models.Member.project_id.in_(project_ids))\
+        .order_by(models.Score.created_at.asc(), models.Score.id.asc())
+    for score in scores:
+        scores_by_project[score.project_id].append(score)
+
+    db.query(models.TimelineSnapshot)\
+        .filter(models.TimelineSnapshot.project_id.in_(project_ids))\
+        .delete(synchronize_session=False)
+
+    rows = []
+    for project_id in project_ids:
+        for point in build_timeline(members_by_project[project_id], scores_by_project[project_id]):
+            rows.append({"project_id": project_id, **point})
+    if rows:
+        db.bulk_insert_mappings(models.TimelineSnapshot, rows)
+
+    return len(rows)
+
+
+def rebuild_timelines(db: Session, batch_size: int = 500, project_ids: Optional[List[int]] = None) -> int:
+    """全プロジェクト（project_idsを指定した場合はそのプロジェクトのみ）の日次タイムラインを作り直す（既存データのバックフィル用）"""
+    if project_ids is None:
+        project_ids = [project_id for (project_id,) in db.query(models.Project.id).order_by(models.Project.id)]
+
+    total = 0
+    for start in range(0, len(project_ids), batch_size):
+        total += rebuild_project_timelines(db, project_ids[start:start + batch_size])
+        db.flush()
+    return total
+
+
+def record_timeline_day(db: Session, rollup: models.ProjectRollup, date_str: str):
+    """集計値の現在の加重平均をその日付のタイムラインとして保存する"""
+    snapshot = db.get(models.TimelineSnapshot, (rollup.project_id, date_str))
+    if rollup.total_weight == 0:
+        if snapshot is not None:
+            db.delete(snapshot)
+        return
+
+    weighted_average = round(rollup.weighted_sum / rollup.total_weight, 1)
+    if snapshot is None:
+        db.add(models.TimelineSnapshot(
+            project_id=rollup.project_id,
+            date=date_str,
+            weighted_average=weighted_average
+        ))
+    else:
+        snapshot.weighted_average = weighted_average
+
+
+def _bucket_start(db: Session, granularity: str):
+    """日次スナップショットの日付（"YYYY-MM-DD"）を集計単位の初日（"YYYY-MM-DD"）にする式"""
+    snapshot_date = models.TimelineSnapshot.date
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(func.date_trunc(granularity, cast(snapshot_date, Date)), "YYYY-MM-DD")
+    if granularity == "week":
+        # 同じ週の日曜日（日曜日はその日）に進めて6日戻すと月曜日になる
+        return func.date(snapshot_date, "weekday 0", "-6 days")
+    return func.strftime("%Y-%m-01", snapshot_date)
+
+
+def get_timeline(
+    db: Session,
+    project_id: int,
+    granularity: str = "day",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+) -> List[Dict]:
+    """
+    保存済みの日次タイムラインを日付順に取得する（主キーの範囲スキャン）
+
+    week / month の場合は集計単位ごとに最後の日のスナップショット（その時点の各メンバーの最新スコアによる加重平均）を
+    ウィンドウ関数で1行だけ選び、集計単位の初日を date として返す。
+    date_from / date_to を指定した場合はその期間（両端を含む）のスナップショットだけを使う。
+    """
+    snapshot = models.TimelineSnapshot
+    filters = [snapshot.project_id == project_id]
+    if date_from is not None:
+        filters.append(snapshot.date >= date_from.isoformat())
+    if date_to is not None:
+        filters.append(snapshot.date <= date_to.isoformat())
+
+    if granularity == "day":
+        rows = db.query(snapshot.date, snapshot.weighted_average)\
+            .filter(*filters)\
+            .order_by(snapshot.date.asc())\
+            .all()
+    else:
+        bucket = _bucket_start(db, granularity)
+        ranked = db.query(
+            bucket.label("bucket"),
+            snapshot.weighted_average,
+            func.row_number().over(partition_by=bucket, order_by=snapshot.date.desc()).label("row_number")
+        )\
+            .filter(*filters)\
+            .subquery()
+        rows = db.query(ranked.c.bucket, ranked.c.weighted_average)\
+            .filter(ranked.c.row_number == 1)\
+            .order_by(ranked.c.bucket.asc())\
+            .all()
+
+    return [
+        {"date": date_str, "weighted_average": weighted_average}
+        for date_str, weighted_average in rows
+    ]
+
+
+def has_timeline(db: Session, project_id: int) -> bool:
+    """日次タイムラインが1行でも保存されているか"""
+    return db.query(models.TimelineSnapshot.project_id)\
+        .filter(models.TimelineSnapshot.project_id == project_id)\
+        .first() is not None
@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+from sqlalchemy import DateTime
+from sqlalchemy.types import TypeDecorator
+from typing import Optional, Union
+
+
+def utcnow() -> datetime:
+    """現在時刻（UTC、タイムゾーン付き）"""
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value: datetime) -> datetime:
+    """UTCのタイムゾーン付きdatetimeにそろえる（タイムゾーンなしはUTCとみなす）"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def to_api_timestamp(value: Optional[Union[datetime, str]]) -> Optional[str]:
+    """
+    APIで返す日時の文字列にする
+
+    以前の文字列カラムと同じ形式（UTC、タイムゾーン表記なしのISO 8601）にそろえる。
+    例: "2024-11-08T12:34:56.123456"
+    """
+    if value is None or isinstance(value, str):
+        return value
+    return as_utc(value).replace(tzinfo=None).isoformat()
+
+
+class UTCDateTime(TypeDecorator):
+    """
+    タイムゾーン付きの日時カラム（常にUTCで保存・取得する）
+
+    PostgreSQLでは TIMESTAMP WITH TIME ZONE。タイムゾーンを保存できないSQLiteでは
+    UTCの値をそのまま保存し、取得時にUTCのタイムゾーンを付け直す。
+    """
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return as_utc(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return as_utc(value)
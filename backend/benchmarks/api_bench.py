@@ -0,0 +1,332 @@
+"""
+APIの主要な処理のベンチマーク
+
+データ量の異なる合成データセットを作り、ダッシュボード・メンバー一覧・スコア履歴・
+スコア登録・ログインをプロセス内（ASGI）で実行して、遅延（p50/p95/p99）・スループット・
+1リクエストあたりのSQL実行回数・CPU時間をJSONに記録します。
+ベースラインと比較して性能が悪化していた場合は終了コード1で終了します。
+
+使い方:
+    # 計測してベースラインとして保存
+    python benchmarks/api_bench.py --save-baseline
+
+    # 計測してベースラインと比較（悪化していれば終了コード1）
+    python benchmarks/api_bench.py
+
+    # データ量を指定（small / medium / large / deep）
+    python benchmarks/api_bench.py --sizes small,deep --requests 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from common import StatementCounter, summarize
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.join(BACKEND_DIR, "benchmarks")
+
+# データセットの大きさ（1プロジェクトあたりのメンバー数・1メンバーあたりのスコア数）
+SIZES = {
+    "small": {"members": 10, "scores_per_member": 10},
+    "medium": {"members": 100, "scores_per_member": 100},
+    "large": {"members": 1000, "scores_per_member": 100},
+    "deep": {"members": 10, "scores_per_member": 100000},
+}
+DEFAULT_SIZES = "small,medium,large"
+
+SCENARIOS = ("dashboard", "dashboard_uncached", "members", "scores", "create_score", "login")
+
+# 1件ずつ順に実行するシナリオ。同時に実行するとキャッシュの削除や楽観ロックの再試行が
+# タイミング次第で増減し、SQL実行回数を比較できないため
+SEQUENTIAL_SCENARIOS = ("dashboard_uncached", "create_score")
+
+# 生成するユーザーのパスワード
+PASSWORD = "benchmark-password"
+
+# 比較時に無視する遅延の差（ミリ秒）。小さな値の揺らぎで失敗しないようにする
+LATENCY_NOISE_MS = 1.0
+
+
+async def run_requests(send, count: int, concurrency: int):
+    """sendをcount回（同時にconcurrency件まで）実行し、遅延・エラー数・経過時間を返す"""
+    latencies = []
+    errors = {}  # ステータスコード -> 件数
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await send(index)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if response.status_code >= 400:
+                errors[response.status_code] = errors.get(response.status_code, 0) + 1
+            else:
+                latencies.append(elapsed_ms)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(index) for index in range(count)])
+    return latencies, errors, time.perf_counter() - started
+
+
+async def run_size(size: dict, requests: int, login_requests: int, concurrency: int) -> dict:
+    """1つのデータセットを作り、全シナリオを計測する"""
+    import httpx
+    from app.main import app
+    from app.cache import dashboard_cache
+    from app import models
+    from app.database import SessionLocal, engine, async_engine
+    from app.datagen import generate_data
+    from app.migrations import upgrade_schema
+
+    # 非同期モード（DB_ASYNC=true）ではAsyncEngineのSQLも数える
+    counter = StatementCounter(engine, *([async_engine.sync_engine] if async_engine is not None else []))
+
+    # 1ユーザー・1プロジェクトにメンバーとスコア履歴を一括登録する
+    setup_started = time.perf_counter()
+    upgrade_schema(engine)
+    generated = generate_data(
+        engine, users=1, projects_per_user=1,
+        members_per_project=size["members"], scores_per_member=size["scores_per_member"],
+        drift="random_walk", password=PASSWORD
+    )
+    setup_seconds = time.perf_counter() - setup_started
+    project_id = generated["project_ids"][0]
+    credentials = {"email": f"datagen{generated['user_ids'][0]}@example.com", "password": PASSWORD}
+    with SessionLocal() as db:
+        member_ids = [
+            member_id for (member_id,) in
+            db.query(models.Member.id).filter(models.Member.project_id == project_id).order_by(models.Member.id)
+        ]
+
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransportはlifespanを実行しないため、サーバーと同じ起動・終了処理をここで行う
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/api/auth/login", json=credentials)
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        def dashboard(index):
+            return client.get(f"/api/projects/{project_id}/dashboard", headers=headers)
+
+        def dashboard_uncached(index):
+            dashboard_cache.clear()
+            return client.get(f"/api/projects/{project_id}/dashboard", headers=headers)
+
+        def members(index):
+            return client.get(f"/api/projects/{project_id}/members", headers=headers)
+
+        def scores(index):
+            return client.get(f"/api/members/{member_ids[0]}/scores", headers=headers)
+
+        def create_score(index):
+            member_id = member_ids[index % len(member_ids)]
+            return client.post(f"/api/members/{member_id}/scores", json={"score": index % 101}, headers=headers)
+
+        def login(index):
+            return client.post("/api/auth/login", json=credentials)
+
+        scenarios = {
+            "dashboard": (dashboard, requests),
+            "dashboard_uncached": (dashboard_uncached, requests),
+            "members": (members, requests),
+            "scores": (scores, requests),
+            "create_score": (create_score, requests),
+            "login": (login, login_requests),
+        }
+
+        results = {}
+        for name, (send, count) in scenarios.items():
+            # ウォームアップ（計測しない）
+            await run_requests(send, min(10, count), 1)
+
+            counter.count = 0
+            # CPU時間はプロセス全体（スレッドプールで実行した処理を含む）
+            cpu_started = time.process_time()
+            latencies, errors, elapsed = await run_requests(
+                send, count, 1 if name in SEQUENTIAL_SCENARIOS else concurrency
+            )
+            cpu_seconds = time.process_time() - cpu_started
+            results[name] = {
+                "requests": count,
+                "errors": sum(errors.values()),
+                "errors_by_status": {str(code): n for code, n in sorted(errors.items())},
+                **summarize(latencies, elapsed),
+                "sql_per_request": round(counter.count / count, 2),
+                "cpu_ms_per_request": round(cpu_seconds * 1000 / count, 3),
+            }
+
+    return {
+        "members": size["members"],
+        "scores_per_member": size["scores_per_member"],
+        "setup_seconds": round(setup_seconds, 2),
+        "scenarios": results,
+    }
+
+
+def run_child(size_name: str, args) -> dict:
+    """データセットごとに、空のSQLiteデータベースを使う別プロセスで計測する"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+            BCRYPT_ROUNDS=str(args.rounds),
+        )
+        command = [
+            sys.executable, os.path.abspath(__file__), "--child", size_name,
+            "--requests", str(args.requests),
+            "--login-requests", str(args.login_requests),
+            "--concurrency", str(args.concurrency),
+        ]
+        output = subprocess.run(command, env=env, cwd=BACKEND_DIR, capture_output=True, text=True)
+        if output.returncode != 0:
+            print(output.stderr, file=sys.stderr)
+            raise SystemExit(f"{size_name} の計測に失敗しました")
+        return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def git_commit() -> str:
+    """計測したコードのコミット（取得できない場合は空文字）"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    ベースラインと比較して悪化した項目を返す
+
+    - SQL実行回数: 1回でも増えたら悪化
+    - p95遅延: tolerance（割合）を超えて遅くなったら悪化
+    - スループット: tolerance（割合）を超えて下がったら悪化
+    - CPU時間: tolerance（割合）を超えて増えたら悪化
+    """
+    regressions = []
+    for size_name, size in results["sizes"].items():
+        baseline_size = baseline.get("sizes", {}).get(size_name)
+        if baseline_size is None:
+            continue
+        for name, current in size["scenarios"].items():
+            before = baseline_size["scenarios"].get(name)
+            if before is None:
+                continue
+            label = f"{size_name}/{name}"
+            if current["sql_per_request"] > before["sql_per_request"]:
+                regressions.append(
+                    f"{label}: SQL実行回数 {before['sql_per_request']} -> {current['sql_per_request']}"
+                )
+            if current["p95_ms"] is not None and before["p95_ms"] is not None:
+                if current["p95_ms"] > before["p95_ms"] * (1 + tolerance) \
+                        and current["p95_ms"] - before["p95_ms"] > LATENCY_NOISE_MS:
+                    regressions.append(f"{label}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+            if current["throughput_rps"] is not None and before["throughput_rps"] is not None:
+                if current["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+                    regressions.append(
+                        f"{label}: スループット {before['throughput_rps']}rps -> {current['throughput_rps']}rps"
+                    )
+            if current.get("cpu_ms_per_request") is not None and before.get("cpu_ms_per_request") is not None:
+                if current["cpu_ms_per_request"] > before["cpu_ms_per_request"] * (1 + tolerance) \
+                        and current["cpu_ms_per_request"] - before["cpu_ms_per_request"] > LATENCY_NOISE_MS:
+                    regressions.append(
+                        f"{label}: CPU時間 {before['cpu_ms_per_request']}ms -> {current['cpu_ms_per_request']}ms"
+                    )
+    return regressions
+
+
+def print_table(results: dict):
+    """結果を表形式で表示する"""
+    print(f"{'size/scenario':32} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>9} {'sql/req':>8} {'cpu/req':>8} {'err':>4}")
+    for size_name, size in results["sizes"].items():
+        for name, r in size["scenarios"].items():
+            print(
+                f"{size_name + '/' + name:32} {r['p50_ms'] or 0:9.2f} {r['p95_ms'] or 0:9.2f} {r['p99_ms'] or 0:9.2f} "
+                f"{r['throughput_rps'] or 0:9.1f} {r['sql_per_request']:8.2f} {r.get('cpu_ms_per_request') or 0:8.2f} "
+                f"{r['errors']:4d}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="APIの主要な処理のベンチマーク")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"データセット（{', '.join(SIZES)}）")
+    parser.add_argument("--requests", type=int, default=200, help="シナリオごとのリクエスト数")
+    parser.add_argument("--login-requests", type=int, default=20, help="ログインのリクエスト数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時リクエスト数（書き込みなどは1件ずつ）")
+    parser.add_argument("--rounds", type=int, default=12, help="bcryptのコスト")
+    parser.add_argument("--output", default=os.path.join(BENCHMARKS_DIR, "results", "api_bench.json"), help="結果の出力先")
+    parser.add_argument("--baseline", default=os.path.join(BENCHMARKS_DIR, "baseline.json"), help="比較するベースライン")
+    parser.add_argument("--save-baseline", action="store_true", help="結果をベースラインとして保存する（比較しない）")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="遅延・スループット・CPU時間の許容する悪化の割合（SQL実行回数は1回でも増えたら悪化）")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, BACKEND_DIR)
+        result = asyncio.run(run_size(SIZES[args.child], args.requests, args.login_requests, args.concurrency))
+        print(json.dumps(result))
+        return 0
+
+    size_names = [name.strip() for name in args.sizes.split(",") if name.strip()]
+    unknown = [name for name in size_names if name not in SIZES]
+    if unknown:
+        parser.error(f"不明なデータセット: {', '.join(unknown)}")
+
+    results = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "login_requests": args.login_requests,
+            "concurrency": args.concurrency,
+            "bcrypt_rounds": args.rounds,
+        },
+        "sizes": {},
+    }
+    for size_name in size_names:
+        print(f"{size_name} を計測しています...", file=sys.stderr)
+        results["sizes"][size_name] = run_child(size_name, args)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print_table(results)
+    print(f"\n結果を保存しました: {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"ベースラインを保存しました: {args.baseline}")
+        return 0
+
+    failed = [
+        f"{size_name}/{name}: エラー {r['errors']}件 {r['errors_by_status']}"
+        for size_name, size in results["sizes"].items()
+        for name, r in size["scenarios"].items()
+        if r["errors"]
+    ]
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            failed += compare(results, json.load(f), args.tolerance)
+    else:
+        print(f"ベースラインがないため比較しません（--save-baselineで作成）: {args.baseline}")
+
+    if failed:
+        print("\n!!! 性能が悪化しています !!!", file=sys.stderr)
+        for line in failed:
+            print(f"  - {line}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+ベンチマーク共通の処理（集計・SQLの実行回数の計測）
+"""
+from typing import Dict, List, Optional
+from sqlalchemy import event
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """p%点を求める（valuesはソート済み）"""
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(latencies_ms: List[float], elapsed: float) -> Dict[str, Optional[float]]:
+    """遅延（ミリ秒）の一覧からパーセンタイルとスループットを求める"""
+    latencies_ms = sorted(latencies_ms)
+    return {
+        "p50_ms": round(percentile(latencies_ms, 50), 3) if latencies_ms else None,
+        "p95_ms": round(percentile(latencies_ms, 95), 3) if latencies_ms else None,
+        "p99_ms": round(percentile(latencies_ms, 99), 3) if latencies_ms else None,
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else None,
+        "throughput_rps": round(len(latencies_ms) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+class StatementCounter:
+    """エンジンで実行されたSQL文の数を数える（executemanyは1回）"""
+
+    def __init__(self, *engines):
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
@@ -0,0 +1,124 @@
+"""
+ログイン集中時のダッシュボード遅延ベンチマーク
+
+同時ログイン中にダッシュボードを取得し続け、その遅延（p50/p95/p99）を計測します。
+bcryptを通常のスレッドプールで実行する従来の方式（PASSWORD_HASH_WORKERS=0）と、
+専用ワーカーで実行する方式を別プロセスで比較します。
+
+使い方:
+    python benchmarks/login_storm.py --duration 10 --logins 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def run_storm(duration: float, logins: int, pollers: int) -> dict:
+    """アプリをプロセス内で起動し、ログインとダッシュボード取得を同時に実行する"""
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = {"email": "bench@example.com", "password": "benchmark-password"}
+        response = await client.post("/api/auth/register", json={**credentials, "name": "Bench"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        project = (await client.post(
+            "/api/projects", json={"name": "Bench", "document_url": "https://example.com"}, headers=headers
+        )).json()
+        for i, role in enumerate(["PL", "PM", "Member", "Member", "Member"]):
+            member = (await client.post(
+                f"/api/projects/{project['id']}/members", json={"name": f"m{i}", "role": role}, headers=headers
+            )).json()
+            await client.post(f"/api/members/{member['id']}/scores", json={"score": 60 + i}, headers=headers)
+
+        deadline = time.perf_counter() + duration
+        dashboard_latencies = []
+        dashboard_errors = []
+        login_status = {}
+
+        async def login_loop():
+            while time.perf_counter() < deadline:
+                response = await client.post("/api/auth/login", json=credentials)
+                login_status[response.status_code] = login_status.get(response.status_code, 0) + 1
+
+        async def dashboard_loop():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(f"/api/projects/{project['id']}/dashboard", headers=headers)
+                if response.status_code == 200:
+                    dashboard_latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    dashboard_errors.append(response.status_code)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(
+            *[login_loop() for _ in range(logins)],
+            *[dashboard_loop() for _ in range(pollers)]
+        )
+
+    dashboard_latencies.sort()
+    return {
+        "dashboard_requests": len(dashboard_latencies),
+        "dashboard_errors": len(dashboard_errors),
+        "dashboard_p50_ms": percentile(dashboard_latencies, 50),
+        "dashboard_p95_ms": percentile(dashboard_latencies, 95),
+        "dashboard_p99_ms": percentile(dashboard_latencies, 99),
+        "login_status": login_status,
+        "logins_per_second": round(sum(login_status.values()) / duration, 1)
+    }
+
+
+def run_mode(args, workers: int) -> dict:
+    """設定を変えた別プロセスでベンチマークを実行する"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+            PASSWORD_HASH_WORKERS=str(workers),
+            BCRYPT_ROUNDS=str(args.rounds),
+        )
+        command = [
+            sys.executable, os.path.abspath(__file__), "--child",
+            "--duration", str(args.duration), "--logins", str(args.logins), "--pollers", str(args.pollers)
+        ]
+        output = subprocess.run(command, env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+        return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ログイン集中時のダッシュボード遅延ベンチマーク")
+    parser.add_argument("--duration", type=float, default=10, help="計測時間（秒）")
+    parser.add_argument("--logins", type=int, default=64, help="同時にログインし続けるクライアント数")
+    parser.add_argument("--pollers", type=int, default=4, help="ダッシュボードを取得し続けるクライアント数")
+    parser.add_argument("--rounds", type=int, default=12, help="bcryptのコスト")
+    parser.add_argument("--workers", type=int, default=2, help="専用ワーカー数（比較対象）")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, BACKEND_DIR)
+        result = asyncio.run(run_storm(args.duration, args.logins, args.pollers))
+        print(json.dumps(result))
+        return
+
+    results = {
+        "before (thread pool)": run_mode(args, workers=0),
+        f"after ({args.workers} hash workers)": run_mode(args, workers=args.workers),
+    }
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
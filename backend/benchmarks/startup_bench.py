@@ -0,0 +1,138 @@
+"""
+起動時間のベンチマーク（ワーカーごとの最初のリクエストまでの時間）
+
+複数のワーカープロセスを同時に起動し、それぞれがアプリのimport・起動処理（lifespan）を行って
+最初のリクエストに応答するまでの時間を計測します。
+スキーマが最新のデータベース（通常の再起動）と、空のデータベース（初回の起動）の両方を計測します。
+
+使い方:
+    python benchmarks/startup_bench.py --workers 4 --runs 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import StatementCounter, percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 計測する状態（current: 移行済みのデータベース、fresh: 空のデータベース）
+SCENARIOS = ("current", "fresh")
+
+# ワーカーごとに記録する時間（ミリ秒）
+PHASES = ("import_ms", "startup_ms", "first_request_ms", "time_to_first_request_ms")
+
+
+async def run_worker(spawned_at: float) -> dict:
+    """アプリをimportして起動処理を行い、最初のリクエストに応答するまでの時間を計測する"""
+    started = time.perf_counter()
+    import httpx
+    from app.main import app
+    from app.database import engine
+    imported = time.perf_counter()
+
+    counter = StatementCounter(engine)
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        startup_sql = counter.count
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/")
+        responded = time.perf_counter()
+        responded_at = time.time()
+
+    return {
+        "status": response.status_code,
+        "import_ms": round((imported - started) * 1000, 1),
+        "startup_ms": round((ready - imported) * 1000, 1),
+        "first_request_ms": round((responded - ready) * 1000, 1),
+        # プロセスの起動（インタープリターの起動を含む）から最初の応答まで
+        "time_to_first_request_ms": round((responded_at - spawned_at) * 1000, 1),
+        "startup_sql": startup_sql,
+    }
+
+
+def start_workers(workers: int, env: dict) -> list:
+    """ワーカーを同時に起動し、全ての結果を返す（失敗したワーカーはNone）"""
+    processes = []
+    for _ in range(workers):
+        spawned_at = time.time()
+        command = [sys.executable, os.path.abspath(__file__), "--child", repr(spawned_at)]
+        processes.append(subprocess.Popen(
+            command, env=env, cwd=BACKEND_DIR, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        ))
+
+    results = []
+    for process in processes:
+        stdout, stderr = process.communicate()
+        if process.returncode != 0:
+            print(stderr, file=sys.stderr)
+            results.append(None)
+        else:
+            results.append(json.loads(stdout.strip().splitlines()[-1]))
+    return results
+
+
+def run_scenario(scenario: str, workers: int, runs: int) -> dict:
+    """1つの状態で runs 回、workers 個のワーカーを同時に起動する"""
+    samples = []
+    failures = 0
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmpdir, 'bench.db')}")
+            if scenario == "current":
+                subprocess.run(
+                    [sys.executable, "migrate_db.py"], env=env, cwd=BACKEND_DIR, capture_output=True, check=True
+                )
+            for result in start_workers(workers, env):
+                if result is None or result["status"] != 200:
+                    failures += 1
+                else:
+                    samples.append(result)
+
+    summary = {"workers": workers, "runs": runs, "failures": failures}
+    for phase in PHASES:
+        values = sorted(sample[phase] for sample in samples)
+        summary[phase] = {"p50": percentile(values, 50), "p95": percentile(values, 95), "max": max(values, default=None)}
+    summary["startup_sql"] = max((sample["startup_sql"] for sample in samples), default=None)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="起動時間のベンチマーク")
+    parser.add_argument("--workers", type=int, default=4, help="同時に起動するワーカー数")
+    parser.add_argument("--runs", type=int, default=5, help="計測の回数")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="計測する状態（current / fresh、カンマ区切り）")
+    parser.add_argument("--child", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        sys.path.insert(0, BACKEND_DIR)
+        print(json.dumps(asyncio.run(run_worker(args.child))))
+        return 0
+
+    results = {}
+    for scenario in args.scenarios.split(","):
+        if scenario not in SCENARIOS:
+            raise SystemExit(f"不明な状態: {scenario}")
+        results[scenario] = run_scenario(scenario, args.workers, args.runs)
+
+    for scenario, summary in results.items():
+        print(
+            f"{scenario}: ワーカー {summary['workers']} / 失敗 {summary['failures']} / "
+            f"import {summary['import_ms']['p50']}ms / 起動処理 {summary['startup_ms']['p50']}ms / "
+            f"最初のリクエストまで p50 {summary['time_to_first_request_ms']['p50']}ms "
+            f"p95 {summary['time_to_first_request_ms']['p95']}ms / 起動時のSQL {summary['startup_sql']}"
+        )
+    print()
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    return 1 if any(summary["failures"] for summary in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+合成データ生成スクリプト
+ユーザー・プロジェクト・メンバー・スコア履歴を指定した件数だけ一括登録します。
+本番規模のデータ量で起きる問題をローカルで再現するためのものです
+（SQLiteはINSERTの一括実行、PostgreSQLはCOPYで書き込みます）
+"""
+import sys
+import os
+import argparse
+import time
+from datetime import datetime
+
+# プロジェクトのルートディレクトリをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from app.database import engine
+from app.datagen import DATAGEN_BATCH_SIZE, DEFAULT_PASSWORD, DRIFT_PATTERNS, generate_data
+from app.migrations import upgrade_schema
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成データを一括登録します")
+    parser.add_argument("--users", type=int, default=10, help="ユーザー数")
+    parser.add_argument("--projects", type=int, default=10, help="1ユーザーあたりのプロジェクト数")
+    parser.add_argument("--members", type=int, default=20, help="1プロジェクトあたりのメンバー数")
+    parser.add_argument("--scores", type=int, default=100, help="1メンバーあたりのスコア数")
+    parser.add_argument("--days", type=float, default=90, help="スコアを登録する期間（日数）")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="期間の終わり（ISO 8601、省略時は現在時刻。タイムゾーンなしはUTC）")
+    parser.add_argument("--drift", choices=DRIFT_PATTERNS, default="mixed", help="スコアの推移のパターン")
+    parser.add_argument("--noise", type=float, default=3.0, help="スコアのばらつき（標準偏差）")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="生成するユーザーのパスワード")
+    parser.add_argument("--batch-size", type=int, default=DATAGEN_BATCH_SIZE, help="1回の一括登録の行数")
+    parser.add_argument("--defer-indexes", action="store_true", help="scoresのインデックスを登録後に作成する（大量データ向け）")
+    parser.add_argument("--skip-rebuild", action="store_true", help="集計テーブル・日次タイムラインを作り直さない")
+    args = parser.parse_args()
+
+    total_projects = args.users * args.projects
+    total_members = total_projects * args.members
+    total_scores = total_members * args.scores
+    print(f"ユーザー: {args.users:,} / プロジェクト: {total_projects:,} / "
+          f"メンバー: {total_members:,} / スコア: {total_scores:,}")
+    print()
+
+    upgrade_schema(engine)
+
+    started = time.perf_counter()
+    totals = {"users": args.users, "projects": total_projects, "members": total_members,
+              "scores": total_scores, "project_rollups": total_projects}
+
+    def progress(table: str, count: int):
+        elapsed = time.perf_counter() - started
+        print(f"\r{table}: {count:,} / {totals[table]:,}（{elapsed:.1f}秒）", end="", flush=True)
+        if count >= totals[table]:
+            print()
+
+    result = generate_data(
+        engine,
+        users=args.users,
+        projects_per_user=args.projects,
+        members_per_project=args.members,
+        scores_per_member=args.scores,
+        days=args.days,
+        drift=args.drift,
+        noise=args.noise,
+        end=args.end,
+        seed=args.seed,
+        password=args.password,
+        batch_size=args.batch_size,
+        defer_indexes=args.defer_indexes,
+        rebuild=not args.skip_rebuild,
+        progress=progress
+    )
+
+    elapsed = time.perf_counter() - started
+    print(f"\n生成が完了しました（{elapsed:.1f}秒、{result['scores'] / elapsed:,.0f}スコア/秒）")
+    print(f"- 日次タイムライン: {result['timeline_rows']:,}行")
+    if result["user_ids"]:
+        print(f"- ログイン: datagen{result['user_ids'][0]}@example.com 〜 "
+              f"datagen{result['user_ids'][-1]}@example.com（パスワード: {args.password}）")
+    return 0
+
+
+if __name__ == "__main__":
+    print("=== 合成データ生成スクリプト ===")
+    print(f"DATABASE_URL: {os.getenv('DATABASE_URL', 'Not set (using SQLite)')}")
+    print()
+
+    sys.exit(main())
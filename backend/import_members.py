@@ -0,0 +1,72 @@
+"""
+メンバー一括登録スクリプト
+CSV（ヘッダー: name,role,email）またはNDJSONのファイルから
+指定したプロジェクトにメンバーを登録します。
+ファイルは1行ずつ読み込むため、大きなファイルでもメモリ使用量は一定です
+"""
+import sys
+import os
+import argparse
+
+# プロジェクトのルートディレクトリをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from app.database import engine, SessionLocal
+from app.imports import IMPORT_FORMATS, MEMBER_IMPORT_CHUNK_SIZE, import_members
+from app.migrations import upgrade_schema
+from app import models
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV / NDJSONからメンバーを一括登録します")
+    parser.add_argument("project_id", type=int, help="登録先のプロジェクトID")
+    parser.add_argument("path", help="CSV / NDJSONファイルのパス（-で標準入力）")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="ファイル形式（省略時は拡張子から判定）")
+    parser.add_argument("--chunk-size", type=int, default=MEMBER_IMPORT_CHUNK_SIZE, help="1トランザクションで登録する行数")
+    args = parser.parse_args()
+
+    file_format = args.format
+    if file_format is None:
+        file_format = "ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv"
+
+    upgrade_schema(engine)
+    db = SessionLocal()
+
+    try:
+        if db.get(models.Project, args.project_id) is None:
+            print(f"プロジェクト {args.project_id} が見つかりません")
+            return 1
+
+        if args.path == "-":
+            sys.stdin.reconfigure(encoding="utf-8-sig", errors="surrogateescape", newline="")
+            result = import_members(db, args.project_id, sys.stdin, file_format, args.chunk_size)
+        else:
+            with open(args.path, encoding="utf-8-sig", errors="surrogateescape", newline="") as f:
+                result = import_members(db, args.project_id, f, file_format, args.chunk_size)
+
+        for error in result["errors"]:
+            print(f"  - {error['line']}行目: {error['detail']}")
+        if result["errors_truncated"]:
+            print(f"  ...（残り{result['failed'] - len(result['errors'])}件のエラーは省略）")
+
+        print(f"\n登録: {result['imported']}件 / エラー: {result['failed']}件")
+        if result["aborted"]:
+            print("読み込めない行があったため、その行以降は登録していません")
+
+        # エラーのある行があった場合は終了コード1
+        return 1 if result["failed"] else 0
+
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("=== メンバー一括登録スクリプト ===")
+    print(f"DATABASE_URL: {os.getenv('DATABASE_URL', 'Not set (using SQLite)')}")
+    print()
+
+    sys.exit(main())
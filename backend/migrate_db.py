@@ -0,0 +1,57 @@
+"""
+データベース移行スクリプト
+テーブルを作成し、created_at / last_updated を文字列から日時型（タイムゾーン付き）に移行し、
+追加されたインデックスを作成して、スキーマのバージョンを記録します。
+移行済みの場合は何もしないため、何度実行しても問題ありません
+（本番環境ではデプロイ時にこのスクリプトを実行し、AUTO_MIGRATE=false で起動してください）
+"""
+import sys
+import os
+import argparse
+
+# プロジェクトのルートディレクトリをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from app.database import engine
+from app.migrations import SCHEMA_VERSION, get_schema_version, upgrade_schema
+
+
+def main():
+    parser = argparse.ArgumentParser(description="データベースを現在のスキーマに移行します")
+    parser.add_argument("--check", action="store_true", help="確認のみ（移行が必要なら終了コード1）")
+    parser.add_argument("--reset", action="store_true", help="全テーブルを削除して作り直す（データは全て消えます）")
+    args = parser.parse_args()
+
+    version = get_schema_version(engine)
+    print(f"スキーマのバージョン: {version if version is not None else 'なし'}（最新: {SCHEMA_VERSION}）")
+
+    if args.check:
+        if version is None or version < SCHEMA_VERSION:
+            print("移行が必要です")
+            return 1
+        print("最新です")
+        return 0
+
+    if args.reset:
+        answer = input("全テーブルを削除して作り直します。よろしいですか？ (yes/no): ")
+        if answer.lower() != "yes":
+            print("中止しました")
+            return 1
+
+    result = upgrade_schema(engine, reset=args.reset)
+    if result["from_version"] == result["to_version"] and not args.reset:
+        print("\n最新のため、移行は不要です")
+        return 0
+
+    for column, count in result["timestamp_columns"].items():
+        print(f"  - {column}: {count}")
+    print(f"\n移行が完了しました（バージョン {result['to_version']}）")
+    return 0
+
+
+if __name__ == "__main__":
+    print("=== データベース移行スクリプト ===")
+    print(f"DATABASE_URL: {os.getenv('DATABASE_URL', 'Not set (using SQLite)')}")
+    print()
+
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+集計テーブル再構築スクリプト
+project_rollups / member_latest_scores をscoresテーブルから再計算し、
+保存済みの値とのずれ（ドリフト）を報告します。
+timeline_snapshots（日次タイムライン）も作り直します
+"""
+import sys
+import os
+import argparse
+
+# プロジェクトのルートディレクトリをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from app.database import engine, SessionLocal
+from app.migrations import upgrade_schema
+from app.rollups import rebuild_rollups
+from app.timeline import rebuild_timelines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="集計テーブルをscoresから再構築します")
+    parser.add_argument("--dry-run", action="store_true", help="ドリフトの報告のみ行い、変更を保存しない")
+    parser.add_argument("--skip-timeline", action="store_true", help="日次タイムラインの再構築を行わない")
+    args = parser.parse_args()
+
+    upgrade_schema(engine)
+    db = SessionLocal()
+
+    try:
+        drifts = rebuild_rollups(db)
+
+        for drift in drifts:
+            print(f"プロジェクト {drift['project_id']}:")
+            for field, values in drift["fields"].items():
+                print(f"  - {field}: 保存値={values['stored']} 再計算値={values['actual']}")
+            if drift["stale_members"]:
+                print(f"  - 最新スコアがずれているメンバー: {drift['stale_members']}")
+
+        if not args.skip_timeline:
+            timeline_rows = rebuild_timelines(db)
+            print(f"日次タイムライン: {timeline_rows}行を作成しました")
+
+        if args.dry_run:
+            db.rollback()
+            print(f"\nドリフトのあるプロジェクト: {len(drifts)}件（--dry-runのため保存していません）")
+        else:
+            db.commit()
+            print(f"\n再構築が完了しました（ドリフトのあったプロジェクト: {len(drifts)}件）")
+
+        # --dry-runでドリフトがあった場合は終了コード1（監視用）
+        return 1 if args.dry_run and drifts else 0
+
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("=== 集計テーブル再構築スクリプト ===")
+    print(f"DATABASE_URL: {os.getenv('DATABASE_URL', 'Not set (using SQLite)')}")
+    print()
+
+    sys.exit(main())
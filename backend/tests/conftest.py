@@ -0,0 +1,95 @@
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+# app をimportする前に、開発用のDBを使わないようにテスト用の一時DBを設定する
+TEST_DB_DIR = tempfile.mkdtemp(prefix="project-transparency-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DB_DIR, 'test.db')}"
+os.environ.setdefault("DB_ASYNC", "false")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+# backend/ をパスに追加（app パッケージをimportするため）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_user_numbers = itertools.count(1)
+
+
+def pytest_configure(config):
+    # python-joseがトークンの検証で使う datetime.utcnow() の警告（ライブラリ側の問題）は表示しない
+    config.addinivalue_line("filterwarnings", "ignore:datetime.datetime.utcnow:DeprecationWarning:jose.jwt")
+
+
+class StatementCounter:
+    """エンジンで実行されたSQL文を数える（executemanyは1回。benchmarks/common.py と同じ）"""
+
+    def __init__(self, *engines):
+        self.count = 0
+        self.statements = []
+        self.engines = engines
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    def reset(self):
+        self.count = 0
+        self.statements = []
+
+    def matching(self, prefix: str) -> int:
+        """prefixで始まるSQL文の数"""
+        return sum(1 for statement in self.statements if statement.lstrip().upper().startswith(prefix.upper()))
+
+    def close(self):
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self._on_execute)
+
+
+@pytest.fixture
+def statement_counter():
+    """アプリのエンジン（非同期モードではその同期エンジンも）で実行されたSQL文を数える"""
+    from app.database import async_engine, engine
+
+    counter = StatementCounter(engine, *([async_engine.sync_engine] if async_engine is not None else []))
+    yield counter
+    counter.close()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """起動・終了処理（lifespan）を実行したアプリのテストクライアント"""
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def auth_headers(client):
+    """新しいユーザーを登録し、そのユーザーの認証ヘッダーを返す"""
+    number = next(_user_numbers)
+    response = client.post("/api/auth/register", json={
+        "email": f"test{number}@example.com",
+        "password": "password123",
+        "name": f"テストユーザー{number}"
+    })
+    assert response.status_code == 201
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def project_id(client, auth_headers):
+    """認証ユーザーのプロジェクトを作成し、そのIDを返す"""
+    response = client.post(
+        "/api/projects",
+        json={"name": "テストプロジェクト", "document_url": "https://example.com"},
+        headers=auth_headers
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
@@ -0,0 +1,67 @@
+"""
+認証済みユーザーのキャッシュ（トークンをキーにしたキャッシュ）のテスト
+"""
+import time
+from datetime import timedelta
+
+from app import models
+from app.auth import CurrentUser, create_access_token, user_cache
+from app.database import SessionLocal
+
+
+def register(client, email: str) -> str:
+    response = client.post("/api/auth/register", json={"email": email, "password": "password123", "name": "認証テスト"})
+    assert response.status_code == 201
+    return response.json()["access_token"]
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_cached_token_skips_users_table(client, statement_counter):
+    token = register(client, "auth-cache@example.com")
+    assert client.get("/api/auth/me", headers=bearer(token)).status_code == 200
+    assert user_cache.get(token) is not None
+
+    statement_counter.count = 0
+    response = client.get("/api/auth/me", headers=bearer(token))
+
+    assert response.status_code == 200
+    assert response.json()["email"] == "auth-cache@example.com"
+    assert statement_counter.count == 0
+
+
+def test_user_change_invalidates_all_tokens_of_user(client):
+    first = register(client, "auth-change@example.com")
+    response = client.post("/api/auth/login", json={"email": "auth-change@example.com", "password": "password123"})
+    second = response.json()["access_token"]
+    other = register(client, "auth-other@example.com")
+    for token in (first, second, other):
+        client.get("/api/auth/me", headers=bearer(token))
+
+    with SessionLocal() as db:
+        user = db.query(models.User).filter(models.User.email == "auth-change@example.com").one()
+        user.name = "変更後"
+        db.commit()
+
+    assert user_cache.get(first) is None
+    assert user_cache.get(second) is None
+    assert user_cache.get(other) is not None
+    assert client.get("/api/auth/me", headers=bearer(first)).json()["name"] == "変更後"
+
+
+def test_expired_token_is_not_served_from_cache(client):
+    token = register(client, "auth-expired@example.com")
+    client.get("/api/auth/me", headers=bearer(token))
+    _, current_user = user_cache.get(token)
+    assert isinstance(current_user, CurrentUser)
+
+    # キャッシュに残っていても、有効期限の過ぎたトークンは使わない
+    expired = create_access_token({"sub": str(current_user.id)}, expires_delta=timedelta(seconds=-10))
+    user_cache.set(expired, (time.time() - 10, current_user))
+
+    response = client.get("/api/auth/me", headers=bearer(expired))
+
+    assert response.status_code == 401
+    assert user_cache.get(expired) is None
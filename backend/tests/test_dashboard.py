@@ -0,0 +1,89 @@
+"""
+ダッシュボードのJSON（orjsonで組み立て済みのレスポンス）・ETag・キャッシュのテスト
+"""
+from app.cache import dashboard_cache
+
+
+def get_dashboard(client, project_id, auth_headers):
+    response = client.get(f"/api/projects/{project_id}/dashboard", headers=auth_headers)
+    assert response.status_code == 200
+    return response
+
+
+def test_empty_project_has_no_weighted_average(client, auth_headers, project_id):
+    body = get_dashboard(client, project_id, auth_headers).json()
+
+    assert body["weighted_average"] is None
+    assert body["members_summary"] == []
+    assert body["timeline"] == []
+
+
+def test_zero_weight_project_weighted_average_is_float(client, auth_headers, project_id):
+    response = client.post(
+        f"/api/projects/{project_id}/members",
+        json={"name": "山田太郎", "role": "PM"},
+        headers=auth_headers
+    )
+    assert response.status_code == 201
+
+    # スコアのないメンバーだけのプロジェクトは 0 ではなく 0.0（キャッシュから返す2回目も同じ）
+    for _ in range(2):
+        response = get_dashboard(client, project_id, auth_headers)
+        assert b'"weighted_average":0.0' in response.content
+        assert isinstance(response.json()["weighted_average"], float)
+
+    overview = client.get("/api/dashboard/overview", headers=auth_headers).json()
+    assert overview["projects"][0]["weighted_average"] == 0.0
+    assert isinstance(overview["projects"][0]["weighted_average"], float)
+
+
+def test_unchanged_dashboard_returns_304(client, auth_headers, project_id):
+    etag = get_dashboard(client, project_id, auth_headers).headers["etag"]
+
+    response = client.get(
+        f"/api/projects/{project_id}/dashboard",
+        headers={**auth_headers, "If-None-Match": etag}
+    )
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_writes_change_etag_and_invalidate_cache(client, auth_headers, project_id):
+    etag = get_dashboard(client, project_id, auth_headers).headers["etag"]
+    assert project_id in dashboard_cache._entries
+
+    # メンバーの追加
+    response = client.post(
+        f"/api/projects/{project_id}/members",
+        json={"name": "山田太郎", "role": "PL"},
+        headers=auth_headers
+    )
+    member_id = response.json()["id"]
+    assert project_id not in dashboard_cache._entries
+
+    response = client.get(
+        f"/api/projects/{project_id}/dashboard",
+        headers={**auth_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [member["name"] for member in response.json()["members_summary"]] == ["山田太郎"]
+    etag = response.headers["etag"]
+
+    # スコアの登録
+    client.post(f"/api/members/{member_id}/scores", json={"score": 80}, headers=auth_headers)
+    assert project_id not in dashboard_cache._entries
+
+    response = client.get(
+        f"/api/projects/{project_id}/dashboard",
+        headers={**auth_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["weighted_average"] == 80.0
+
+
+def test_stats_is_disabled_by_default(client, auth_headers):
+    assert client.get("/stats", headers=auth_headers).status_code == 404
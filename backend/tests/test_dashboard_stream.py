@@ -0,0 +1,114 @@
+"""
+ダッシュボードのストリーム（SSE）と配信（DashboardBroker）のテスト
+"""
+import asyncio
+import json
+
+from app.events import RESYNC, DashboardBroker, dashboard_broker, publish_resync
+from app.routers.dashboard import iter_dashboard_stream
+
+
+def add_member(client, project_id, auth_headers) -> int:
+    response = client.post(
+        f"/api/projects/{project_id}/members",
+        json={"name": "ストリーム", "role": "PL"},
+        headers=auth_headers
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_score_post_reaches_subscriber(client, auth_headers, project_id):
+    member_id = add_member(client, project_id, auth_headers)
+
+    async def run():
+        subscription = dashboard_broker.subscribe(project_id)
+        try:
+            # 同期版のルーターはワーカースレッドから、このイベントループに渡して配信する
+            response = await asyncio.to_thread(
+                client.post, f"/api/members/{member_id}/scores", json={"score": 73, "comment": "配信"},
+                headers=auth_headers
+            )
+            assert response.status_code == 201
+            return response.json(), await asyncio.wait_for(subscription.queue.get(), 5)
+        finally:
+            dashboard_broker.unsubscribe(subscription)
+
+    score, (version, name, data) = asyncio.run(run())
+
+    assert name == "delta"
+    delta = json.loads(data)
+    assert delta["weighted_average"] == 73.0
+    assert [(member["id"], member["latest_score"], member["latest_comment"]) for member in delta["members"]] == [
+        (member_id, 73, "配信")
+    ]
+    assert delta["timeline"] == [{"date": score["created_at"][:10], "weighted_average": 73.0}]
+    assert not dashboard_broker.has_subscribers(project_id)
+
+
+def test_queue_overflow_is_replaced_with_resync():
+    broker = DashboardBroker(queue_size=3)
+
+    async def run():
+        subscription = broker.subscribe(1)
+        other = broker.subscribe(2)
+        for version in range(1, 5):
+            broker.publish(1, (version, "delta", "{}"))
+        events = []
+        while not subscription.queue.empty():
+            events.append(subscription.queue.get_nowait())
+        return events, other.queue.qsize()
+
+    events, other_size = asyncio.run(run())
+
+    # 溜まった差分は捨て、スナップショットを送り直させる
+    assert events == [(0, RESYNC, None)]
+    assert other_size == 0
+    assert broker.stats()["dropped"] == 1
+    assert broker.stats()["published"] == 4
+
+
+def test_stream_sends_snapshot_then_deltas_and_resyncs():
+    project_id = 10 ** 9
+    snapshots = iter([(1, b'{"snapshot": 1}'), (5, b'{"snapshot": 2}')])
+
+    async def load():
+        return next(snapshots)
+
+    async def run():
+        stream = iter_dashboard_stream(project_id, load)
+        events = [await stream.__anext__(), await stream.__anext__()]
+        # スナップショットに含まれる変更（version 1以前）は送らない
+        dashboard_broker.publish(project_id, (1, "delta", '{"old": true}'))
+        dashboard_broker.publish(project_id, (2, "delta", '{"new": true}'))
+        events.append(await stream.__anext__())
+        publish_resync(project_id)
+        events.append(await stream.__anext__())
+        await stream.aclose()
+        return events
+
+    events = asyncio.run(run())
+
+    assert events[0].startswith("retry: ")
+    assert events[1] == 'id: 1\nevent: snapshot\ndata: {"snapshot": 1}\n\n'
+    assert events[2] == 'id: 2\nevent: delta\ndata: {"new": true}\n\n'
+    assert events[3] == 'id: 5\nevent: snapshot\ndata: {"snapshot": 2}\n\n'
+    assert not dashboard_broker.has_subscribers(project_id)
+
+
+def test_other_users_project_stream_is_rejected(client, auth_headers, project_id):
+    response = client.post(
+        "/api/auth/register",
+        json={"email": "stream-other@example.com", "password": "password123", "name": "別のユーザー"}
+    )
+    other_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = client.get(f"/api/projects/{project_id}/dashboard/stream", headers=other_headers)
+    assert response.status_code == 403
+    assert not dashboard_broker.has_subscribers(project_id)
+
+    response = client.get("/api/projects/999999/dashboard/stream", headers=auth_headers)
+    assert response.status_code == 404
+
+    response = client.get(f"/api/projects/{project_id}/dashboard/stream")
+    assert response.status_code == 403
@@ -0,0 +1,43 @@
+"""
+管理用APIのデモデータ（generate_demo_data）のテスト
+"""
+from sqlalchemy import func
+
+from app import models
+from app.database import SessionLocal
+from app.datagen import generate_demo_data
+
+
+def test_demo_data_ids_are_assigned_by_database(client, project_id):
+    # 既存の行があっても、主キーはデータベースが採番する
+    with SessionLocal() as db:
+        result = generate_demo_data(db, users=1, projects_per_user=2, members_per_project=3, scores_per_member=4)
+        db.commit()
+
+        assert result["projects"] == 2
+        assert result["members"] == 6
+        assert result["scores"] == 24
+        assert min(result["project_ids"]) > project_id
+
+        user = db.get(models.User, result["user_ids"][0])
+        assert user.email == f"datagen{user.id}@example.com"
+        rollups = db.query(models.ProjectRollup)\
+            .filter(models.ProjectRollup.project_id.in_(result["project_ids"]))\
+            .all()
+        assert sorted(rollup.member_count for rollup in rollups) == [3, 3]
+        snapshots = db.query(func.count(models.TimelineSnapshot.date))\
+            .filter(models.TimelineSnapshot.project_id.in_(result["project_ids"]))\
+            .scalar()
+        assert snapshots == result["timeline_rows"] > 0
+
+
+def test_demo_user_can_log_in(client):
+    with SessionLocal() as db:
+        result = generate_demo_data(db, users=1, projects_per_user=1, members_per_project=2, scores_per_member=1)
+        db.commit()
+
+    response = client.post("/api/auth/login", json={
+        "email": f"datagen{result['user_ids'][0]}@example.com",
+        "password": "password123"
+    })
+    assert response.status_code == 200
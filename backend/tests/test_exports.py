@@ -0,0 +1,125 @@
+"""
+スコア履歴のエクスポート（CSV / NDJSONのストリーミング）のテスト
+"""
+import csv
+import io
+import json
+
+import pytest
+
+from app import exports
+from app.exports import EXPORT_COLUMNS, iter_score_export
+
+# 1回に読む行数より多く、割り切れない件数にする
+BATCH_SIZE = 3
+COMMENTS = [
+    "普通のコメント",
+    "カンマ, を含む",
+    'ダブルクォート"を含む"',
+    "改行を\n含む",
+    None,
+    "",
+    "\"先頭\",\n\"すべて\"",
+]
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(exports, "SCORE_EXPORT_BATCH_SIZE", BATCH_SIZE)
+
+
+@pytest.fixture
+def history(client, auth_headers, project_id):
+    """名前・コメントに区切り文字を含むメンバーとスコア履歴（登録した順の行）"""
+    members = []
+    for name, role in [('山田, "太郎"', "PL"), ("佐藤\n花子", "Member")]:
+        response = client.post(
+            f"/api/projects/{project_id}/members", json={"name": name, "role": role}, headers=auth_headers
+        )
+        members.append(response.json())
+
+    rows = []
+    for member in members:
+        for index, comment in enumerate(COMMENTS):
+            response = client.post(
+                f"/api/members/{member['id']}/scores",
+                json={"score": index * 10, "comment": comment},
+                headers=auth_headers
+            )
+            score = response.json()
+            rows.append({
+                "score_id": score["id"],
+                "member_id": member["id"],
+                "member_name": member["name"],
+                "member_role": member["role"],
+                "score": score["score"],
+                "comment": score["comment"],
+                "created_at": score["created_at"]
+            })
+    return rows
+
+
+def export(client, project_id, auth_headers, file_format):
+    response = client.get(
+        f"/api/projects/{project_id}/scores/export", params={"format": file_format}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    return response
+
+
+def test_ndjson_contains_every_score(client, auth_headers, project_id, history, small_batches):
+    response = export(client, project_id, auth_headers, "ndjson")
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.split("\n")
+    assert lines[-1] == ""
+    assert [json.loads(line) for line in lines[:-1]] == history
+
+
+def test_csv_contains_every_score_with_header_and_escaping(client, auth_headers, project_id, history, small_batches):
+    response = export(client, project_id, auth_headers, "csv")
+
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert response.headers["content-disposition"] == f'attachment; filename="project-{project_id}-scores.csv"'
+    rows = list(csv.reader(io.StringIO(response.text, newline="")))
+    assert rows[0] == list(EXPORT_COLUMNS)
+    # CSVでは値はすべて文字列、コメントのNoneは空文字列になる
+    assert rows[1:] == [
+        [str(row[column]) if row[column] is not None else "" for column in EXPORT_COLUMNS]
+        for row in history
+    ]
+
+
+@pytest.mark.parametrize("file_format", ["csv", "ndjson"])
+def test_export_is_sent_in_batches(project_id, history, small_batches, file_format):
+    chunks = list(iter_score_export(project_id, file_format))
+
+    # CSVは先頭行を最初に送り、その後は読んだ行数ごとに送る
+    if file_format == "csv":
+        assert chunks[0] == ",".join(EXPORT_COLUMNS) + "\r\n"
+        rows_per_chunk = [len(list(csv.reader(io.StringIO(chunk, newline="")))) for chunk in chunks[1:]]
+    else:
+        rows_per_chunk = [chunk.count("\n") for chunk in chunks]
+    full, rest = divmod(len(history), BATCH_SIZE)
+    assert rows_per_chunk == [BATCH_SIZE] * full + ([rest] if rest else [])
+
+
+def test_empty_project_exports_header_only(client, auth_headers, project_id):
+    assert export(client, project_id, auth_headers, "csv").text == ",".join(EXPORT_COLUMNS) + "\r\n"
+    assert export(client, project_id, auth_headers, "ndjson").text == ""
+
+
+def test_export_of_other_users_project_is_forbidden(client, auth_headers, project_id):
+    response = client.post(
+        "/api/auth/register",
+        json={"email": "export-other@example.com", "password": "password123", "name": "別のユーザー"}
+    )
+    other_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = client.get(f"/api/projects/{project_id}/scores/export", headers=other_headers)
+    assert response.status_code == 403
+
+    response = client.get(
+        f"/api/projects/{project_id}/scores/export", params={"format": "xml"}, headers=auth_headers
+    )
+    assert response.status_code == 422
@@ -0,0 +1,43 @@
+import logging
+
+import pytest
+
+from app import logging_config
+
+
+@pytest.fixture
+def debug_logging(monkeypatch):
+    """LOG_LEVEL=DEBUG でログを設定し直す（終了後は元の設定に戻す）"""
+    logging_config.stop_logging()
+    monkeypatch.setattr(logging_config, "LOG_LEVEL", "DEBUG")
+    logging_config.setup_logging()
+    yield
+    logging_config.stop_logging()
+    monkeypatch.undo()
+    logging_config.setup_logging()
+
+
+def test_pool_logger_only_emits_warnings(debug_logging):
+    assert logging.getLogger("app").isEnabledFor(logging.DEBUG)
+    pool_logger = logging.getLogger("app.db_pool")
+    assert not pool_logger.isEnabledFor(logging.INFO)
+    assert pool_logger.isEnabledFor(logging.WARNING)
+
+
+def queue_handlers():
+    return [handler for handler in logging.getLogger("app").handlers if isinstance(handler, logging_config._QueueHandler)]
+
+
+def test_restart_does_not_duplicate_handlers(capsys):
+    for _ in range(3):
+        logging_config.stop_logging()
+        assert queue_handlers() == []
+        logging_config.setup_logging()
+        assert len(queue_handlers()) == 1
+
+    # 1回だけ書き出される
+    logging.getLogger("app.test").warning("再起動後のログ")
+    logging_config.stop_logging()
+    assert capsys.readouterr().err.count("再起動後のログ") == 1
+    with capsys.disabled():
+        logging_config.setup_logging()
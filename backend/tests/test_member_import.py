@@ -0,0 +1,90 @@
+"""
+メンバー一括登録（members:import）で、読み込めない入力が500にならず行のエラーになることのテスト
+"""
+import functools
+import io
+
+import pytest
+
+from app.database import SessionLocal
+from app.imports import import_members
+from app.routers import members as members_router
+from app.routers.aio import members as aio_members_router
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    """途中のチャンクがコミット済みになるよう、2行ごとに登録する"""
+    for router in (members_router, aio_members_router):
+        monkeypatch.setattr(router, "import_members", functools.partial(import_members, chunk_size=2))
+
+
+def post_import(client, project_id, auth_headers, body: bytes, file_format: str):
+    return client.post(
+        f"/api/projects/{project_id}/members:import",
+        params={"format": file_format},
+        content=body,
+        headers=auth_headers
+    )
+
+
+def member_names(client, project_id, auth_headers):
+    response = client.get(f"/api/projects/{project_id}/members", headers=auth_headers)
+    return sorted(member["name"] for member in response.json()["members"])
+
+
+def test_csv_invalid_utf8_row_is_line_error(client, auth_headers, project_id):
+    body = "name,role,email\nA,Member,\nB,PM,\n".encode() + b"\xff\xfe,Member,\n" + "D,PL,\nE,Member,\n".encode()
+
+    response = post_import(client, project_id, auth_headers, body, "csv")
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 4
+    assert result["failed"] == 1
+    assert result["aborted"] is False
+    assert result["errors"] == [{"line": 4, "detail": "UTF-8として読み込めません"}]
+    assert member_names(client, project_id, auth_headers) == ["A", "B", "D", "E"]
+
+
+def test_ndjson_invalid_utf8_line_is_line_error(client, auth_headers, project_id):
+    body = b'{"name": "A", "role": "Member"}\n{"name": "\xc3", "role": "PM"}\n{"name": "C", "role": "PL"}\n'
+
+    response = post_import(client, project_id, auth_headers, body, "ndjson")
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 2
+    assert result["aborted"] is False
+    assert result["errors"] == [{"line": 2, "detail": "UTF-8として読み込めません"}]
+    assert member_names(client, project_id, auth_headers) == ["A", "C"]
+
+
+def test_csv_oversized_field_aborts_with_committed_count(client, auth_headers, project_id):
+    rows = ["name,role,email", "A,Member,", "B,PM,", "C,PL,", "x" * 200000 + ",Member,", "E,Member,"]
+    body = "\n".join(rows).encode() + b"\n"
+
+    response = post_import(client, project_id, auth_headers, body, "csv")
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["aborted"] is True
+    # 中断までの行（2チャンク目の途中まで）は登録済み
+    assert result["imported"] == 3
+    assert result["failed"] == 1
+    assert result["errors"][0]["line"] == 5
+    assert result["errors"][0]["detail"].startswith("CSVとして読み込めません")
+    assert member_names(client, project_id, auth_headers) == ["A", "B", "C"]
+
+
+def test_strictly_decoded_file_aborts_instead_of_raising(project_id):
+    # surrogateescapeで開いていないファイルでは、デコードエラーの時点で中断する
+    data = "name,role,email\nA,Member,\n".encode() + b"\xff,PM,\n"
+    text_file = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", newline="")
+
+    with SessionLocal() as db:
+        result = import_members(db, project_id, text_file, "csv")
+
+    assert result["aborted"] is True
+    assert result["failed"] == 1
+    assert result["errors"][0]["detail"] == "UTF-8として読み込めません"
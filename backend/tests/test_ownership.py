@@ -0,0 +1,97 @@
+"""
+所有権の確認（1回のJOINクエリとリクエスト内の確認済みキャッシュ）のテスト
+"""
+import pytest
+from fastapi import HTTPException
+
+from app.database import SessionLocal
+from app.ownership import OWNERSHIP_INFO_KEY, verify_member_ownership, verify_project_ownership
+
+
+def user_id(client, auth_headers) -> int:
+    return client.get("/api/auth/me", headers=auth_headers).json()["id"]
+
+
+def add_member(client, project_id, auth_headers) -> int:
+    response = client.post(
+        f"/api/projects/{project_id}/members",
+        json={"name": "所有権", "role": "Member"},
+        headers=auth_headers
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+@pytest.fixture
+def other_headers(client):
+    """別のユーザーの認証ヘッダー"""
+    response = client.post(
+        "/api/auth/register",
+        json={"email": "ownership-other@example.com", "password": "password123", "name": "別のユーザー"}
+    )
+    if response.status_code != 201:
+        response = client.post(
+            "/api/auth/login", json={"email": "ownership-other@example.com", "password": "password123"}
+        )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_other_users_member_is_forbidden(client, auth_headers, project_id, other_headers):
+    member_id = add_member(client, project_id, auth_headers)
+
+    response = client.get(f"/api/members/{member_id}/scores", headers=other_headers)
+    assert response.status_code == 403
+    response = client.post(f"/api/members/{member_id}/scores", json={"score": 50}, headers=other_headers)
+    assert response.status_code == 403
+
+    with SessionLocal() as db:
+        with pytest.raises(HTTPException) as error:
+            verify_member_ownership(member_id, user_id(client, other_headers), db)
+        assert error.value.status_code == 403
+        # 確認できなかったものは記録しない
+        assert db.info.get(OWNERSHIP_INFO_KEY, {}) == {}
+
+
+def test_missing_member_is_not_found(client, auth_headers):
+    response = client.get("/api/members/999999/scores", headers=auth_headers)
+    assert response.status_code == 404
+
+    with SessionLocal() as db:
+        with pytest.raises(HTTPException) as error:
+            verify_member_ownership(999999, user_id(client, auth_headers), db)
+        assert error.value.status_code == 404
+
+
+def test_second_check_in_same_session_runs_no_sql(client, auth_headers, project_id, statement_counter):
+    member_id = add_member(client, project_id, auth_headers)
+    owner_id = user_id(client, auth_headers)
+
+    with SessionLocal() as db:
+        statement_counter.reset()
+        member = verify_member_ownership(member_id, owner_id, db)
+        # メンバーとプロジェクトを1回のクエリで取得する
+        assert statement_counter.count == 1
+        assert member.id == member_id
+
+        statement_counter.reset()
+        assert verify_member_ownership(member_id, owner_id, db) is member
+        # メンバーの確認でプロジェクトも確認済みになる
+        assert verify_project_ownership(project_id, owner_id, db).id == project_id
+        assert statement_counter.count == 0
+
+    # 別のセッション（別のリクエスト）では確認し直す
+    with SessionLocal() as db:
+        statement_counter.reset()
+        verify_member_ownership(member_id, owner_id, db)
+        assert statement_counter.count == 1
+
+
+def test_verified_ownership_is_per_user(client, auth_headers, project_id, other_headers):
+    member_id = add_member(client, project_id, auth_headers)
+
+    with SessionLocal() as db:
+        verify_member_ownership(member_id, user_id(client, auth_headers), db)
+        # 同じセッションでも、別のユーザーとしての確認には確認済みの結果を使わない
+        with pytest.raises(HTTPException) as error:
+            verify_member_ownership(member_id, user_id(client, other_headers), db)
+        assert error.value.status_code == 403
@@ -0,0 +1,156 @@
+"""
+プロジェクト一覧・スコア履歴のページ分割（カーソル）のテスト
+"""
+from datetime import timedelta
+
+from app import models
+from app.database import SessionLocal
+from app.timestamps import utcnow
+
+
+def add_member(client, project_id, auth_headers):
+    response = client.post(
+        f"/api/projects/{project_id}/members",
+        json={"name": "ページ分割", "role": "Member"},
+        headers=auth_headers
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def insert_scores(member_id, created_ats):
+    """登録日時を指定してスコアを直接入れる（同じ登録日時の行を作るため）"""
+    with SessionLocal() as db:
+        scores = [
+            models.Score(member_id=member_id, score=index % 101, created_at=created_at)
+            for index, created_at in enumerate(created_ats)
+        ]
+        db.add_all(scores)
+        db.commit()
+        return [score.id for score in scores]
+
+
+def walk_scores(client, member_id, auth_headers, limit):
+    pages = []
+    params = {"limit": limit}
+    while True:
+        response = client.get(f"/api/members/{member_id}/scores", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        body = response.json()
+        pages.append([score["id"] for score in body["scores"]])
+        if body["next_cursor"] is None:
+            return pages
+        params = {"limit": limit, "cursor": body["next_cursor"]}
+
+
+def test_walking_all_pages_returns_every_score_once(client, auth_headers, project_id):
+    member_id = add_member(client, project_id, auth_headers)
+    base = utcnow() - timedelta(days=1)
+    ids = insert_scores(member_id, [base + timedelta(seconds=index) for index in range(7)])
+
+    pages = walk_scores(client, member_id, auth_headers, limit=3)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    walked = [score_id for page in pages for score_id in page]
+    assert walked == list(reversed(ids))
+
+
+def test_last_page_exactly_full_has_no_cursor(client, auth_headers, project_id):
+    member_id = add_member(client, project_id, auth_headers)
+    base = utcnow() - timedelta(days=1)
+    ids = insert_scores(member_id, [base + timedelta(seconds=index) for index in range(6)])
+
+    pages = walk_scores(client, member_id, auth_headers, limit=3)
+
+    # ちょうど割り切れる場合に空のページが続かない
+    assert pages == [list(reversed(ids[3:])), list(reversed(ids[:3]))]
+
+
+def test_equal_created_at_is_ordered_by_id(client, auth_headers, project_id):
+    member_id = add_member(client, project_id, auth_headers)
+    created_at = utcnow() - timedelta(days=1)
+    ids = insert_scores(member_id, [created_at] * 5 + [created_at - timedelta(seconds=1)] * 2)
+
+    pages = walk_scores(client, member_id, auth_headers, limit=2)
+
+    # 同じ登録日時の行はidの降順で、ページの境目をまたいでも重複・欠落しない
+    walked = [score_id for page in pages for score_id in page]
+    assert walked == list(reversed(ids[:5])) + list(reversed(ids[5:]))
+
+
+def test_no_limit_or_cursor_returns_full_history(client, auth_headers, project_id):
+    member_id = add_member(client, project_id, auth_headers)
+    base = utcnow() - timedelta(days=1)
+    ids = insert_scores(member_id, [base + timedelta(seconds=index) for index in range(60)])
+
+    response = client.get(f"/api/members/{member_id}/scores", headers=auth_headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [score["id"] for score in body["scores"]] == list(reversed(ids))
+    assert body["next_cursor"] is None
+
+
+def test_cursor_without_limit_uses_default_page_size(client, auth_headers, project_id):
+    member_id = add_member(client, project_id, auth_headers)
+    base = utcnow() - timedelta(days=1)
+    ids = insert_scores(member_id, [base + timedelta(seconds=index) for index in range(60)])
+
+    first = client.get(f"/api/members/{member_id}/scores", params={"limit": 1}, headers=auth_headers).json()
+    response = client.get(
+        f"/api/members/{member_id}/scores", params={"cursor": first["next_cursor"]}, headers=auth_headers
+    )
+
+    body = response.json()
+    assert [score["id"] for score in body["scores"]] == list(reversed(ids))[1:51]
+    assert body["next_cursor"] is not None
+
+
+def test_invalid_cursor_returns_400(client, auth_headers, project_id):
+    member_id = add_member(client, project_id, auth_headers)
+
+    for cursor in ["not-a-cursor", "eyJ4IjogMX0", "WyJ4IiwxXQ"]:
+        response = client.get(f"/api/members/{member_id}/scores", params={"cursor": cursor}, headers=auth_headers)
+        assert response.status_code == 400, cursor
+
+    response = client.get("/api/projects", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_limit_out_of_range_returns_422(client, auth_headers, project_id):
+    for limit in [0, 201]:
+        response = client.get("/api/projects", params={"limit": limit}, headers=auth_headers)
+        assert response.status_code == 422
+
+
+def test_project_pages(client, auth_headers):
+    ids = []
+    for index in range(5):
+        response = client.post(
+            "/api/projects",
+            json={"name": f"プロジェクト{index}", "document_url": "https://example.com"},
+            headers=auth_headers
+        )
+        ids.append(response.json()["id"])
+    # 同じ作成日時にそろえて、idでの並びを確認する
+    with SessionLocal() as db:
+        created_at = utcnow()
+        db.query(models.Project).filter(models.Project.id.in_(ids)).update(
+            {models.Project.created_at: created_at}, synchronize_session=False
+        )
+        db.commit()
+
+    response = client.get("/api/projects", headers=auth_headers)
+    assert [project["id"] for project in response.json()["projects"]] == list(reversed(ids))
+    assert response.json()["next_cursor"] is None
+
+    walked = []
+    params = {"limit": 2}
+    while True:
+        body = client.get("/api/projects", params=params, headers=auth_headers).json()
+        assert len(body["projects"]) <= 2
+        walked.extend(project["id"] for project in body["projects"])
+        if body["next_cursor"] is None:
+            break
+        params = {"limit": 2, "cursor": body["next_cursor"]}
+    assert walked == list(reversed(ids))
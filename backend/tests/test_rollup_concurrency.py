@@ -0,0 +1,51 @@
+"""
+同じプロジェクトへの同時書き込み（SQLite）で、集計行の競合が409にならないことのテスト
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from app.database import SessionLocal
+from app.rollups import rebuild_rollups
+
+THREADS = 16
+REQUESTS_PER_THREAD = 25
+
+
+def test_concurrent_writes_never_conflict(client, auth_headers, project_id):
+    member_ids = []
+    for index in range(4):
+        response = client.post(
+            f"/api/projects/{project_id}/members",
+            json={"name": f"メンバー{index}", "role": ("PL", "PM", "Member", "Member")[index]},
+            headers=auth_headers
+        )
+        member_ids.append(response.json()["id"])
+
+    def worker(thread_index: int):
+        statuses = []
+        for k in range(REQUESTS_PER_THREAD):
+            if k % 5 == 4:
+                # スコアの登録にメンバーの追加を混ぜる
+                response = client.post(
+                    f"/api/projects/{project_id}/members",
+                    json={"name": f"追加{thread_index}-{k}", "role": "Member"},
+                    headers=auth_headers
+                )
+            else:
+                response = client.post(
+                    f"/api/members/{member_ids[(thread_index + k) % len(member_ids)]}/scores",
+                    json={"score": (thread_index * 7 + k) % 101},
+                    headers=auth_headers
+                )
+            statuses.append(response.status_code)
+        return statuses
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        statuses = [status for result in executor.map(worker, range(THREADS)) for status in result]
+
+    assert len(statuses) == THREADS * REQUESTS_PER_THREAD
+    assert set(statuses) == {201}
+
+    # 保存済みの集計値がscoresから計算し直した値と一致する
+    with SessionLocal() as db:
+        assert rebuild_rollups(db, project_ids=[project_id]) == []
+        db.rollback()
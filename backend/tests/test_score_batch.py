@@ -0,0 +1,146 @@
+"""
+スコアの一括登録（scores:batch）のテスト
+"""
+from datetime import timedelta
+
+from app import models
+from app.database import SessionLocal
+from app.rollups import rebuild_rollups
+from app.routers import scores as scores_router
+from app.timeline import build_timeline
+from app.timestamps import utcnow
+
+
+def add_members(client, project_id, auth_headers, roles):
+    member_ids = []
+    for index, role in enumerate(roles):
+        response = client.post(
+            f"/api/projects/{project_id}/members",
+            json={"name": f"メンバー{index}", "role": role},
+            headers=auth_headers
+        )
+        assert response.status_code == 201
+        member_ids.append(response.json()["id"])
+    return member_ids
+
+
+def post_batch(client, project_id, auth_headers, items):
+    return client.post(f"/api/projects/{project_id}/scores:batch", json=items, headers=auth_headers)
+
+
+def rollup_version(project_id):
+    with SessionLocal() as db:
+        return db.get(models.ProjectRollup, project_id).version
+
+
+def test_batch_over_1000_items_is_rejected(client, auth_headers, project_id):
+    member_id, = add_members(client, project_id, auth_headers, ["Member"])
+
+    response = post_batch(client, project_id, auth_headers, [{"member_id": member_id, "score": 50}] * 1001)
+    assert response.status_code == 422
+
+    response = post_batch(client, project_id, auth_headers, [])
+    assert response.status_code == 422
+
+    response = post_batch(client, project_id, auth_headers, [{"member_id": member_id, "score": 50}] * 1000)
+    assert response.status_code == 200
+    assert response.json()["created"] == 1000
+
+
+def test_results_follow_input_order_with_per_item_status(client, auth_headers, project_id):
+    member_ids = add_members(client, project_id, auth_headers, ["PL", "PM", "Member"])
+    other_project = client.post(
+        "/api/projects", json={"name": "別のプロジェクト", "document_url": "https://example.com"}, headers=auth_headers
+    ).json()["id"]
+    other_member, = add_members(client, other_project, auth_headers, ["Member"])
+
+    items = [
+        {"member_id": member_ids[2], "score": 10, "comment": "1件目"},
+        {"member_id": 999999, "score": 20},
+        {"member_id": member_ids[0], "score": 30},
+        {"member_id": other_member, "score": 40},
+        {"member_id": member_ids[1], "score": 50},
+        {"member_id": member_ids[2], "score": 60},
+    ]
+    response = post_batch(client, project_id, auth_headers, items)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 4
+    assert body["failed"] == 2
+    assert [(result["index"], result["member_id"], result["status"]) for result in body["results"]] == [
+        (index, item["member_id"], 404 if item["member_id"] in (999999, other_member) else 201)
+        for index, item in enumerate(items)
+    ]
+    created = [result["score"] for result in body["results"] if result["status"] == 201]
+    assert [score["score"] for score in created] == [10, 30, 50, 60]
+    assert [score["member_id"] for score in created] == [member_ids[2], member_ids[0], member_ids[1], member_ids[2]]
+    assert created[0]["comment"] == "1件目"
+    # 同じ回の評価として全ての行に同じ登録日時が付く
+    assert len({score["created_at"] for score in created}) == 1
+    for result in body["results"]:
+        if result["status"] == 404:
+            assert result["score"] is None
+            assert result["detail"]
+
+    # 他のプロジェクトのメンバーには登録されない
+    history = client.get(f"/api/members/{other_member}/scores", headers=auth_headers).json()
+    assert history["scores"] == []
+
+
+def test_batch_updates_rollup_and_timeline_once(client, auth_headers, project_id, statement_counter):
+    member_ids = add_members(client, project_id, auth_headers, ["PL", "PM", "Member", "Member"])
+
+    def run_batch(size):
+        version = rollup_version(project_id)
+        items = [{"member_id": member_ids[k % len(member_ids)], "score": (k * 13) % 101} for k in range(size)]
+        statement_counter.reset()
+        response = post_batch(client, project_id, auth_headers, items)
+        assert response.status_code == 200
+        # 集計行の更新（version）は件数に関わらず1回
+        assert rollup_version(project_id) == version + 1
+        assert statement_counter.matching("UPDATE project_rollups") == 1
+        # 登録日時は全て同じ日のため、タイムラインの書き込みも1回まで（値が変わらなければ0回）
+        timeline_writes = statement_counter.matching("INSERT INTO timeline_snapshots") \
+            + statement_counter.matching("UPDATE timeline_snapshots")
+        assert timeline_writes <= 1
+        # それ以外のSQL（スコアのINSERTを除く）の回数は件数によらない
+        return statement_counter.count - statement_counter.matching("INSERT INTO scores") - timeline_writes
+
+    run_batch(4)
+    assert run_batch(4) == run_batch(40)
+
+    with SessionLocal() as db:
+        assert rebuild_rollups(db, project_ids=[project_id]) == []
+        db.rollback()
+
+        members = db.query(models.Member).filter(models.Member.project_id == project_id).all()
+        scores = db.query(models.Score)\
+            .filter(models.Score.member_id.in_(member_ids))\
+            .order_by(models.Score.created_at, models.Score.id)\
+            .all()
+        snapshots = db.query(models.TimelineSnapshot)\
+            .filter(models.TimelineSnapshot.project_id == project_id)\
+            .all()
+        assert [(snapshot.date, snapshot.weighted_average) for snapshot in snapshots] == [
+            (point["date"], point["weighted_average"]) for point in build_timeline(members, scores)
+        ]
+        assert snapshots[-1].date == utcnow().date().isoformat()
+
+
+def test_batch_after_last_second_is_not_counted_in_that_day(client, auth_headers, project_id, monkeypatch):
+    member_id, = add_members(client, project_id, auth_headers, ["Member"])
+    day = (utcnow() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    monkeypatch.setattr(scores_router, "utcnow", lambda: day + timedelta(hours=12))
+    assert post_batch(client, project_id, auth_headers, [{"member_id": member_id, "score": 50}]).status_code == 200
+    monkeypatch.setattr(scores_router, "utcnow", lambda: day + timedelta(seconds=86399, microseconds=900000))
+    assert post_batch(client, project_id, auth_headers, [{"member_id": member_id, "score": 62}]).status_code == 200
+
+    # 以前の "T23:59:59" までの比較と同じく、その日の値には含めない
+    with SessionLocal() as db:
+        snapshots = db.query(models.TimelineSnapshot.date, models.TimelineSnapshot.weighted_average)\
+            .filter(models.TimelineSnapshot.project_id == project_id)\
+            .all()
+        assert [tuple(snapshot) for snapshot in snapshots] == [(day.date().isoformat(), 50.0)]
+        assert db.get(models.ProjectRollup, project_id).weighted_sum == 62
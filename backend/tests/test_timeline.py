@@ -0,0 +1,176 @@
+"""
+日次タイムライン（build_timeline / rebuild_project_timelines）の回帰テスト
+
+以前の実装（日付ごと・メンバーごとにその日の23:59:59までの最新スコアをクエリする方法）と、
+ランダムに過去の日時で登録したスコア履歴で結果が一致することを確認する。
+"""
+from datetime import datetime, timedelta, timezone
+import random
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import Base
+from app.models import ROLE_WEIGHTS
+from app.timeline import build_timeline, rebuild_project_timelines
+from app.timestamps import to_api_timestamp
+
+ROLES = list(ROLE_WEIGHTS)
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def create_history(db: Session, rng: random.Random, project_id: int) -> list:
+    """ランダムなメンバーと、過去の日時（登録順はばらばら）のスコア履歴を作る"""
+    db.add(models.Project(id=project_id, name=f"project {project_id}", document_url="https://example.com", user_id=1))
+    members = [
+        models.Member(project_id=project_id, name=f"member {index}", role=rng.choice(ROLES))
+        for index in range(rng.randint(1, 8))
+    ]
+    db.add_all(members)
+    db.flush()
+
+    # 同じ日に複数のスコアがある日・スコアのない日・スコアのないメンバーができるようにする
+    count = rng.randint(0, 120)
+    seconds = rng.sample(range(60 * 24 * 3600), count)
+    # 日付の境目（23:59:59ちょうど・小数秒付き、0:00:00）のスコアも混ぜる
+    for day in rng.sample(range(60), rng.randint(0, 10)):
+        seconds.extend(second for second in (day * 86400 + 86399, day * 86400) if second not in seconds)
+    scores = [
+        models.Score(
+            member_id=rng.choice(members).id,
+            score=rng.randint(0, 100),
+            created_at=START + timedelta(seconds=second, microseconds=rng.choice([0, rng.randint(1, 999999)]))
+        )
+        for second in seconds
+    ]
+    rng.shuffle(scores)  # IDの順と日時の順を一致させない
+    db.add_all(scores)
+    db.flush()
+    return members
+
+
+def legacy_timeline(db: Session, project_id: int) -> list:
+    """
+    以前の実装: スコアがある日付ごとに、各メンバーの "YYYY-MM-DDT23:59:59" までの最新スコアをクエリする
+
+    以前は created_at を文字列（UTC、タイムゾーン表記なしのISO 8601）で保存していたため、
+    同じ形式の文字列カラムを持つテーブルに写して、以前のクエリ（文字列比較）をそのまま実行する。
+    """
+    members = db.query(models.Member).filter(models.Member.project_id == project_id).all()
+    db.execute(text("CREATE TEMP TABLE IF NOT EXISTS legacy_scores (member_id INTEGER, score INTEGER, created_at VARCHAR)"))
+    db.execute(text("DELETE FROM legacy_scores"))
+    scores = db.query(models.Score)\
+        .filter(models.Score.member_id.in_([member.id for member in members]))\
+        .all()
+    if scores:
+        db.execute(
+            text("INSERT INTO legacy_scores (member_id, score, created_at) VALUES (:member_id, :score, :created_at)"),
+            [
+                {"member_id": score.member_id, "score": score.score, "created_at": to_api_timestamp(score.created_at)}
+                for score in scores
+            ]
+        )
+
+    # ISO形式の日付から日付部分のみを抽出
+    dates = sorted({to_api_timestamp(score.created_at)[:10] for score in scores})
+
+    timeline = []
+    for date_str in dates:
+        weighted_sum = 0
+        total_weight = 0
+        for member in members:
+            latest = db.execute(
+                text(
+                    "SELECT score FROM legacy_scores WHERE member_id = :member_id AND created_at <= :cutoff "
+                    "ORDER BY created_at DESC LIMIT 1"
+                ),
+                {"member_id": member.id, "cutoff": date_str + "T23:59:59"}
+            ).first()
+            if latest:
+                weight = ROLE_WEIGHTS.get(member.role, 1)
+                weighted_sum += latest.score * weight
+                total_weight += weight
+        if total_weight > 0:
+            timeline.append({"date": date_str, "weighted_average": round(weighted_sum / total_weight, 1)})
+    return timeline
+
+
+def sweep_timeline(db: Session, project_id: int) -> list:
+    members = db.query(models.Member).filter(models.Member.project_id == project_id).all()
+    scores = db.query(models.Score)\
+        .filter(models.Score.member_id.in_([member.id for member in members]))\
+        .order_by(models.Score.created_at.asc(), models.Score.id.asc())\
+        .all()
+    return build_timeline(members, scores)
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_build_timeline_matches_legacy(db, seed):
+    rng = random.Random(seed)
+    create_history(db, rng, project_id=1)
+
+    assert sweep_timeline(db, 1) == legacy_timeline(db, 1)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_rebuilt_snapshots_match_legacy(db, seed):
+    rng = random.Random(1000 + seed)
+    project_ids = [1, 2, 3]
+    for project_id in project_ids:
+        create_history(db, rng, project_id)
+
+    rebuild_project_timelines(db, project_ids)
+    db.flush()
+
+    for project_id in project_ids:
+        snapshots = db.query(models.TimelineSnapshot)\
+            .filter(models.TimelineSnapshot.project_id == project_id)\
+            .order_by(models.TimelineSnapshot.date)\
+            .all()
+        stored = [{"date": snapshot.date, "weighted_average": snapshot.weighted_average} for snapshot in snapshots]
+        assert stored == legacy_timeline(db, project_id)
+
+
+def test_rebuild_replaces_existing_snapshots(db):
+    rng = random.Random(42)
+    create_history(db, rng, project_id=1)
+    db.add(models.TimelineSnapshot(project_id=1, date="2000-01-01", weighted_average=1.0))
+    db.flush()
+
+    rebuild_project_timelines(db, [1])
+    db.flush()
+
+    dates = [date for (date,) in db.query(models.TimelineSnapshot.date).filter(models.TimelineSnapshot.project_id == 1)]
+    assert "2000-01-01" not in dates
+
+
+def test_score_after_last_second_counts_from_next_day(db):
+    """23:59:59を過ぎた（小数秒のある）スコアは、以前と同じくその日の値に含めない"""
+    db.add(models.Project(id=1, name="project", document_url="https://example.com", user_id=1))
+    member = models.Member(project_id=1, name="member", role="Member")
+    db.add(member)
+    db.flush()
+    db.add_all([
+        models.Score(member_id=member.id, score=50, created_at=START + timedelta(hours=12)),
+        models.Score(member_id=member.id, score=62, created_at=START + timedelta(seconds=86399, microseconds=900000)),
+        models.Score(member_id=member.id, score=70, created_at=START + timedelta(days=1, hours=12)),
+    ])
+    db.flush()
+
+    expected = [
+        {"date": "2024-01-01", "weighted_average": 50.0},
+        {"date": "2024-01-02", "weighted_average": 70.0},
+    ]
+    assert sweep_timeline(db, 1) == expected
+    assert legacy_timeline(db, 1) == expected
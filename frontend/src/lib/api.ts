@@ -102,9 +102,19 @@ export interface DashboardData {
 // API Functions
 
 // Projects
+// 一覧はページ分割されているため、next_cursorがなくなるまで取得する
 export const getProjects = async (): Promise<Project[]> => {
-  const response = await api.get<{ projects: Project[] }>('/projects');
-  return response.data.projects;
+  const projects: Project[] = [];
+  let cursor: string | null = null;
+  do {
+    const response: { data: { projects: Project[]; next_cursor: string | null } } = await api.get(
+      '/projects',
+      { params: { limit: 200, ...(cursor ? { cursor } : {}) } }
+    );
+    projects.push(...response.data.projects);
+    cursor = response.data.next_cursor;
+  } while (cursor);
+  return projects;
 };
 
 export const createProject = async (data: { name: string; document_url: string }): Promise<Project> => {
@@ -140,11 +150,14 @@ export const createScore = async (
   return response.data;
 };
 
+// 履歴は新しい順にページ分割される（次のページはnext_cursorを渡して取得）
 export const getScores = async (
-  memberId: number
-): Promise<{ member: { id: number; name: string; role: string }; scores: Score[] }> => {
-  const response = await api.get<{ member: { id: number; name: string; role: string }; scores: Score[] }>(
-    `/members/${memberId}/scores`
+  memberId: number,
+  cursor?: string
+): Promise<{ member: { id: number; name: string; role: string }; scores: Score[]; next_cursor: string | null }> => {
+  const response = await api.get<{ member: { id: number; name: string; role: string }; scores: Score[]; next_cursor: string | null }>(
+    `/members/${memberId}/scores`,
+    { params: cursor ? { cursor } : {} }
   );
   return response.data;
 };